@@ -9,5 +9,12 @@ python3 manage.py migrate
 echo "Compiling translations"
 python3 ./manage.py compilemessages
 
+echo "Starting report worker"
+# The worker is started again, when it exits, so the queued jobs keep running.
+while true; do
+    python3 manage.py run_report_worker
+    sleep 5
+done &
+
 echo "Starting server"
 gunicorn investments.wsgi:application -w 2 -b :8001 --access-logfile "-"
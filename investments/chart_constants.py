@@ -26,3 +26,8 @@ COLORS = (
 
 PIE_CHART = "pie"
 BAR_CHART = "bar"
+LINE_CHART = "line"
+
+# The parameter of the pie chart actions, which skips the largest groups when
+# the "Other" slice is opened.
+CHART_OFFSET_VAR = "chart_offset"
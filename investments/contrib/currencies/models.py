@@ -1,17 +1,16 @@
-import uuid
-
 from django.contrib.auth import get_user_model
 from django.core import validators
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from investments.models import TimestampedModel
+from investments.utils.uuid import generate_uuid
 
 UserModel = get_user_model()
 
 
 class Currency(TimestampedModel):
-    uuid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
     name = models.CharField(_("Name"), max_length=254)
     code = models.CharField(_("ISO code"), max_length=3, blank=True, unique=True)
     nominal = models.PositiveSmallIntegerField(_("Nominal"), default=1)
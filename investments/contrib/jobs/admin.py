@@ -0,0 +1,136 @@
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import path, reverse
+from django.utils.translation import gettext_lazy as _
+
+from . import constants
+from .models import ReportJob
+from .utils import insert_csrf_token
+
+
+@admin.register(ReportJob)
+class ReportJobsAdmin(admin.ModelAdmin):
+    list_filter = ("status", "user", "created_at", "finished_at")
+    list_display = (
+        "name",
+        "status",
+        "user",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+    list_per_page = 50
+    ordering = ("-created_at",)
+    date_hierarchy = "created_at"
+    search_fields = ("name", "action")
+    exclude = ("params", "data", "pks", "content")
+    readonly_fields = (
+        "name",
+        "user",
+        "model",
+        "action",
+        "language",
+        "fingerprint",
+        "status",
+        "worker",
+        "started_at",
+        "finished_at",
+        "content_type",
+        "error",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<uuid:object_id>/progress/",
+                self.admin_site.admin_view(self.progress_view),
+                name="jobs_reportjob_progress",
+            ),
+            path(
+                "<uuid:object_id>/status/",
+                self.admin_site.admin_view(self.status_view),
+                name="jobs_reportjob_status",
+            ),
+            path(
+                "<uuid:object_id>/result/",
+                self.admin_site.admin_view(self.result_view),
+                name="jobs_reportjob_result",
+            ),
+            *super().get_urls(),
+        ]
+
+    def get_job(self, request, object_id):
+        job = get_object_or_404(ReportJob, pk=object_id)
+
+        if job.user_id != request.user.pk and not request.user.is_superuser:
+            raise PermissionDenied
+
+        return job
+
+    def progress_view(self, request, object_id):
+        job = self.get_job(request, object_id)
+
+        if job.status == constants.DONE:
+            return redirect("admin:jobs_reportjob_result", job.pk)
+
+        return render(
+            request,
+            "admin/jobs/progress.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "job": job,
+                "status_url": reverse("admin:jobs_reportjob_status", args=(job.pk,)),
+                "result_url": reverse("admin:jobs_reportjob_result", args=(job.pk,)),
+            },
+        )
+
+    def status_view(self, request, object_id):
+        job = self.get_job(request, object_id)
+
+        return JsonResponse(
+            {
+                "status": job.status,
+                "status_display": job.get_status_display(),
+                "queue_position": (
+                    ReportJob.objects.filter(
+                        status=constants.PENDING, created_at__lt=job.created_at
+                    ).count()
+                    + 1
+                    if job.status == constants.PENDING
+                    else None
+                ),
+                "started_at": job.started_at,
+                "finished_at": job.finished_at,
+                "error": (
+                    _("The report failed. Please try again later.")
+                    if job.status == constants.FAILED
+                    else None
+                ),
+            }
+        )
+
+    def result_view(self, request, object_id):
+        job = self.get_job(request, object_id)
+
+        if job.status != constants.DONE:
+            return redirect("admin:jobs_reportjob_progress", job.pk)
+
+        return HttpResponse(
+            insert_csrf_token(bytes(job.content), get_token(request)),
+            content_type=job.content_type,
+        )
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).defer("query", "content")
+
+        if not request.user.is_superuser:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
@@ -0,0 +1,44 @@
+from django.utils.translation import gettext_lazy as _
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+STATUS_CHOICES = (
+    (PENDING, _("Pending")),
+    (RUNNING, _("Running")),
+    (DONE, _("Done")),
+    (FAILED, _("Failed")),
+)
+
+# The tables the reports read besides the selected rows. A change to any of
+# them makes the stored reports stale.
+REPORT_DATA_MODELS = (
+    "brokers.Broker",
+    "currencies.Currency",
+    "currencies.ExchangeRate",
+    "payments.Payment",
+    "payments.Payment_tags",
+    "payments.TaxRate",
+    "positions.Position",
+    "positions.Position_tags",
+    "securities.Security",
+    "statements.Statement",
+    "tags.Tag",
+)
+
+# Jobs in these states are reused when the same report is requested again.
+# The running jobs are reused only while their worker is alive.
+REUSABLE_STATUSES = (PENDING, RUNNING, DONE)
+
+# Seconds between the heartbeats of the worker running a job.
+HEARTBEAT_INTERVAL = 30
+
+# Seconds without a heartbeat after which a running job is considered
+# abandoned by its worker, e.g. after a crash or a redeploy, and queued again.
+STALE_JOB_TIMEOUT = 5 * 60
+
+# Stored in place of the CSRF tokens of the worker in the rendered reports,
+# so the forms in them get the token of the user viewing them.
+CSRF_TOKEN_PLACEHOLDER = "report-job-csrf-token"
@@ -0,0 +1,68 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from investments.contrib.jobs import constants
+from investments.contrib.jobs.utils import (
+    claim_report_job,
+    requeue_stale_report_jobs,
+    run_report_job,
+)
+
+
+class Command(BaseCommand):
+    help = "Runs the queued report jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no pending jobs instead of waiting for more.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2,
+            help="Seconds to wait between the checks for pending jobs.",
+        )
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.write_success(f"Started report worker {worker}")
+
+        while True:
+            close_old_connections()
+            stale_job_count = requeue_stale_report_jobs()
+
+            if stale_job_count:
+                self.write_error(f"Queued {stale_job_count} abandoned jobs again")
+
+            job = claim_report_job(worker)
+
+            if not job:
+                if options["once"]:
+                    break
+
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Running {job.name} ({job.pk})")
+
+            start = time.perf_counter()
+            job = run_report_job(job)
+            duration = time.perf_counter() - start
+
+            if job.status == constants.DONE:
+                self.write_success(f"Finished {job.name} ({job.pk}) in {duration:.2f}s")
+            else:
+                self.write_error(f"Failed {job.name} ({job.pk}):\n{job.error}")
+
+    def write_success(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def write_error(self, message):
+        self.stdout.write(self.style.ERROR(message))
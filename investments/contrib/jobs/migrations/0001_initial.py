@@ -0,0 +1,121 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:01
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=uuid.uuid4, primary_key=True, serialize=False
+                    ),
+                ),
+                ("name", models.CharField(max_length=254, verbose_name="Name")),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The model label, e.g. app.Model.",
+                        max_length=254,
+                        verbose_name="Model",
+                    ),
+                ),
+                ("action", models.CharField(max_length=254, verbose_name="Action")),
+                (
+                    "query",
+                    models.BinaryField(
+                        help_text="The pickled query of the queryset the action was applied to.",
+                        verbose_name="Query",
+                    ),
+                ),
+                ("language", models.CharField(max_length=16, verbose_name="Language")),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        db_index=True,
+                        help_text="Identifies the action, the selection and the state of the selected data.",
+                        max_length=64,
+                        verbose_name="Fingerprint",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "worker",
+                    models.CharField(blank=True, max_length=254, verbose_name="Worker"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Started at"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Finished at"
+                    ),
+                ),
+                ("content", models.TextField(blank=True, verbose_name="Content")),
+                (
+                    "content_type",
+                    models.CharField(
+                        blank=True, max_length=254, verbose_name="Content type"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Error")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="report_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Report job",
+                "verbose_name_plural": "Report jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="jobs_report_status_bda89f_idx",
+                    )
+                ],
+            },
+        ),
+    ]
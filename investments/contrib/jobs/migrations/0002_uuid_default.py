@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+import investments.utils.uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        # The default is applied by Django, not by the database, so the
+        # existing keys and the tables stay as they are.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="reportjob",
+                    name="uuid",
+                    field=models.UUIDField(
+                        default=investments.utils.uuid.generate_uuid,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
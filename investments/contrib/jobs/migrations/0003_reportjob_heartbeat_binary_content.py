@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+def expire_stored_results(apps, schema_editor):
+    ReportJob = apps.get_model("jobs", "ReportJob")
+
+    # The text results are dropped with their column, so these jobs run
+    # again, when their reports are requested.
+    ReportJob.objects.filter(status="done").update(
+        status="failed", error="The result was dropped, when it was stored as bytes."
+    )
+    ReportJob.objects.filter(status="running").update(
+        heartbeat_at=models.F("started_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0002_uuid_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="The last time the worker reported the job as running.",
+                null=True,
+                verbose_name="Heartbeat at",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="reportjob",
+            name="content",
+        ),
+        migrations.AddField(
+            model_name="reportjob",
+            name="content",
+            field=models.BinaryField(blank=True, default=b"", verbose_name="Content"),
+            preserve_default=False,
+        ),
+        migrations.RunPython(expire_stored_results, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+def fail_unfinished_jobs(apps, schema_editor):
+    ReportJob = apps.get_model("jobs", "ReportJob")
+
+    # The selections of these jobs are dropped with their pickled queries.
+    ReportJob.objects.filter(status__in=("pending", "running")).update(
+        status="failed", error="The selection was dropped, when it was stored as JSON."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0003_reportjob_heartbeat_binary_content"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_unfinished_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="reportjob",
+            name="query",
+        ),
+        migrations.AddField(
+            model_name="reportjob",
+            name="data",
+            field=models.JSONField(
+                default=dict,
+                help_text="The form data the action was posted with.",
+                verbose_name="Data",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reportjob",
+            name="params",
+            field=models.JSONField(
+                default=dict,
+                help_text="The changelist parameters the action was applied with.",
+                verbose_name="Parameters",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reportjob",
+            name="pks",
+            field=models.JSONField(
+                help_text="The primary keys of the selected rows, or none for all rows of the changelist.",
+                null=True,
+                verbose_name="Primary keys",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from investments.models import TimestampedModel
+from investments.utils.uuid import generate_uuid
+
+from . import constants
+
+UserModel = get_user_model()
+
+
+class ReportJob(TimestampedModel):
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
+    name = models.CharField(_("Name"), max_length=254)
+    user = models.ForeignKey(
+        UserModel, related_name="report_jobs", on_delete=models.CASCADE
+    )
+    model = models.CharField(
+        _("Model"), max_length=254, help_text=_("The model label, e.g. app.Model.")
+    )
+    action = models.CharField(_("Action"), max_length=254)
+    params = models.JSONField(
+        _("Parameters"),
+        default=dict,
+        help_text=_("The changelist parameters the action was applied with."),
+    )
+    data = models.JSONField(
+        _("Data"),
+        default=dict,
+        help_text=_("The form data the action was posted with."),
+    )
+    pks = models.JSONField(
+        _("Primary keys"),
+        null=True,
+        help_text=_(
+            "The primary keys of the selected rows, or none for all rows of the "
+            "changelist."
+        ),
+    )
+    language = models.CharField(_("Language"), max_length=16)
+    fingerprint = models.CharField(
+        _("Fingerprint"),
+        max_length=64,
+        db_index=True,
+        help_text=_(
+            "Identifies the action, the selection and the state of the selected data."
+        ),
+    )
+    status = models.CharField(
+        _("Status"),
+        max_length=16,
+        choices=constants.STATUS_CHOICES,
+        default=constants.PENDING,
+    )
+    worker = models.CharField(_("Worker"), max_length=254, blank=True)
+    started_at = models.DateTimeField(_("Started at"), blank=True, null=True)
+    heartbeat_at = models.DateTimeField(
+        _("Heartbeat at"),
+        blank=True,
+        null=True,
+        help_text=_("The last time the worker reported the job as running."),
+    )
+    finished_at = models.DateTimeField(_("Finished at"), blank=True, null=True)
+    content = models.BinaryField(_("Content"), blank=True)
+    content_type = models.CharField(_("Content type"), max_length=254, blank=True)
+    error = models.TextField(_("Error"), blank=True)
+
+    class Meta:
+        verbose_name = _("Report job")
+        verbose_name_plural = _("Report jobs")
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (constants.DONE, constants.FAILED)
@@ -0,0 +1,198 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from investments import chart_constants
+from investments.contrib.brokers.models import Broker
+from investments.contrib.positions.models import Position
+from investments.contrib.securities.constants import ENERGY
+from investments.contrib.securities.models import Stock
+from investments.contrib.users.models import User
+
+from . import constants
+from .models import ReportJob
+from .utils import (
+    claim_report_job,
+    enqueue_report_job,
+    get_job_queryset,
+    get_job_request,
+    remove_csrf_tokens,
+    requeue_stale_report_jobs,
+    run_report_job,
+)
+
+
+class ReportJobTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(email="user@example.com", password="x")
+
+    def create_job(self, **kwargs):
+        return ReportJob.objects.create(
+            name="Report",
+            user=self.user,
+            model="positions.Position",
+            action="show_daily_invested_amount",
+            language="en-us",
+            fingerprint="fingerprint",
+            **kwargs,
+        )
+
+
+class StaleJobTests(ReportJobTestCase):
+    def test_requeues_the_jobs_without_recent_heartbeats(self):
+        now = timezone.now()
+        stale_job = self.create_job(
+            status=constants.RUNNING,
+            started_at=now,
+            heartbeat_at=now
+            - datetime.timedelta(seconds=constants.STALE_JOB_TIMEOUT + 1),
+        )
+        live_job = self.create_job(
+            status=constants.RUNNING, started_at=now, heartbeat_at=now
+        )
+
+        self.assertEqual(requeue_stale_report_jobs(), 1)
+
+        stale_job.refresh_from_db()
+        live_job.refresh_from_db()
+        self.assertEqual(stale_job.status, constants.PENDING)
+        self.assertIsNone(stale_job.started_at)
+        self.assertEqual(live_job.status, constants.RUNNING)
+
+    def test_claim_starts_the_heartbeats(self):
+        job = self.create_job()
+
+        claimed_job = claim_report_job("worker")
+
+        self.assertEqual(claimed_job.pk, job.pk)
+        self.assertEqual(claimed_job.status, constants.RUNNING)
+        self.assertIsNotNone(claimed_job.heartbeat_at)
+
+    def test_doesnt_reuse_the_stale_jobs(self):
+        model_admin = admin.site._registry[Position]
+        request = RequestFactory().get("/")
+        request.user = self.user
+        job = enqueue_report_job(
+            model_admin, "show_daily_invested_amount", request, Position.objects.all()
+        )
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=constants.RUNNING,
+            heartbeat_at=timezone.now()
+            - datetime.timedelta(seconds=constants.STALE_JOB_TIMEOUT + 1),
+        )
+
+        new_job = enqueue_report_job(
+            model_admin, "show_daily_invested_amount", request, Position.objects.all()
+        )
+
+        self.assertNotEqual(new_job.pk, job.pk)
+
+
+class JobInputTests(ReportJobTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.stock = Stock.objects.create(
+            name="Stock", symbol="STK", sector=ENERGY, user=cls.user
+        )
+        broker = Broker.objects.create(name="Broker", user=cls.user)
+        cls.positions = [
+            Position.objects.create(
+                position_id=str(index),
+                units=Decimal(1),
+                open_price=Decimal(100),
+                security=cls.stock,
+                broker=broker,
+                opened_at=timezone.make_aware(datetime.datetime(2020, 1, 1)),
+            )
+            for index in range(2)
+        ]
+
+    def enqueue(self, data, params=""):
+        request = RequestFactory().post(f"/?{params}", data)
+        request.user = self.user
+        queryset = Position.objects.all()
+
+        if data.get("select_across") != "1":
+            queryset = queryset.filter(pk__in=data.get("_selected_action", []))
+
+        return enqueue_report_job(
+            admin.site._registry[Position],
+            "show_daily_invested_amount",
+            request,
+            queryset,
+        )
+
+    def test_stores_the_selected_rows_as_json(self):
+        job = self.enqueue(
+            {
+                "action": "show_daily_invested_amount",
+                "_selected_action": [str(self.positions[0].pk)],
+                "csrfmiddlewaretoken": "token",
+            }
+        )
+
+        job.refresh_from_db()
+        self.assertEqual(job.pks, [str(self.positions[0].pk)])
+        self.assertNotIn("csrfmiddlewaretoken", job.data)
+
+    def test_replays_the_request_and_the_selection(self):
+        job = self.enqueue(
+            {"select_across": "1", chart_constants.CHART_OFFSET_VAR: "20"},
+            params=f"opened_on__year=2020&q={self.positions[1].position_id}",
+        )
+
+        job.refresh_from_db()
+        request = get_job_request(job, Position)
+        queryset = get_job_queryset(job, admin.site._registry[Position], request)
+
+        self.assertIsNone(job.pks)
+        self.assertEqual(request.POST[chart_constants.CHART_OFFSET_VAR], "20")
+        self.assertEqual(request.GET["opened_on__year"], "2020")
+        self.assertEqual(list(queryset), [self.positions[1]])
+
+    def test_related_changes_make_a_new_report(self):
+        data = {"select_across": "1"}
+        job = self.enqueue(data)
+
+        self.assertEqual(self.enqueue(data).pk, job.pk)
+
+        self.stock.name = "Renamed"
+        self.stock.save()
+
+        self.assertNotEqual(self.enqueue(data).pk, job.pk)
+
+
+class ReportResultTests(ReportJobTestCase):
+    def test_stores_the_content_as_bytes(self):
+        job = self.create_job(status=constants.RUNNING)
+
+        job = run_report_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, constants.DONE, job.error)
+        self.assertIsInstance(bytes(job.content), bytes)
+        self.assertTrue(job.content_type.startswith("text/html"))
+
+    def test_replaces_the_csrf_token_of_the_worker(self):
+        content = remove_csrf_tokens(
+            b'<input type="hidden" name="csrfmiddlewaretoken" value="worker">'
+        )
+        job = self.create_job(
+            status=constants.DONE, content=content, content_type="text/html"
+        )
+        self.client.force_login(self.user)
+
+        response = self.client.get(
+            reverse("admin:jobs_reportjob_result", args=(job.pk,))
+        )
+
+        self.assertNotIn(b"worker", content)
+        self.assertNotIn(constants.CSRF_TOKEN_PLACEHOLDER.encode(), response.content)
+        self.assertIn(b'name="csrfmiddlewaretoken" value="', response.content)
@@ -0,0 +1,277 @@
+import contextlib
+import datetime
+import functools
+import hashlib
+import json
+import re
+import threading
+import traceback
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.messages.storage import default_storage
+from django.contrib.sessions.backends.base import SessionBase
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone, translation
+from django.utils.http import urlencode
+
+from investments.utils.admin import get_changelist_queryset, get_data_version
+
+from . import constants
+from .models import ReportJob
+
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def run_in_background(action):
+    """Run a heavy admin action with the report worker instead of the request.
+
+    The request gets redirected to a progress page, which shows the stored
+    result once the `run_report_worker` command has executed the action.
+    """
+
+    @functools.wraps(action)
+    def wrapper(model_admin, request, queryset):
+        if getattr(request, "is_report_worker", False):
+            return action(model_admin, request, queryset)
+
+        job = enqueue_report_job(model_admin, action.__name__, request, queryset)
+
+        return redirect("admin:jobs_reportjob_progress", job.pk)
+
+    return wrapper
+
+
+def get_request_data(query_dict):
+    return {
+        key: values
+        for key, values in query_dict.lists()
+        if key != "csrfmiddlewaretoken"
+    }
+
+
+def get_selected_pks(request, queryset):
+    """Return the primary keys of the selected rows, or `None`, when all rows
+    of the changelist are selected, so the worker filters them again.
+    """
+    if request.POST.get("select_across") == "1":
+        return None
+
+    return sorted(str(pk) for pk in queryset.values_list("pk", flat=True))
+
+
+def get_fingerprint(model_admin, action_name, request, queryset):
+    sql, params = queryset.query.sql_with_params()
+    # The reports read the related tables too, e.g. the names of the
+    # securities and the exchange rates, so their changes make new reports.
+    data_versions = [
+        get_data_version(apps.get_model(label)._default_manager.all())
+        for label in constants.REPORT_DATA_MODELS
+    ]
+
+    key = "|".join(
+        str(part)
+        for part in (
+            model_admin.opts.label,
+            action_name,
+            request.user.pk,
+            translation.get_language(),
+            sql,
+            params,
+            json.dumps(get_request_data(request.POST), sort_keys=True),
+            get_data_version(queryset),
+            data_versions,
+        )
+    )
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def enqueue_report_job(model_admin, action_name, request, queryset):
+    """Queue the action for the worker, or return the job of the same report.
+
+    Only plain data is stored, the changelist parameters, the posted form
+    and the selected primary keys, from which the worker rebuilds the
+    request and the queryset.
+    """
+    fingerprint = get_fingerprint(model_admin, action_name, request, queryset)
+
+    job = (
+        ReportJob.objects.filter(
+            fingerprint=fingerprint, status__in=constants.REUSABLE_STATUSES
+        )
+        .exclude(get_stale_condition())
+        .order_by("-created_at")
+        .first()
+    )
+
+    if job:
+        return job
+
+    action = getattr(model_admin, action_name)
+
+    return ReportJob.objects.create(
+        name=getattr(action, "short_description", action_name),
+        user=request.user,
+        model=model_admin.opts.label,
+        action=action_name,
+        params=get_request_data(request.GET),
+        data=get_request_data(request.POST),
+        pks=get_selected_pks(request, queryset),
+        language=translation.get_language(),
+        fingerprint=fingerprint,
+    )
+
+
+def get_stale_condition():
+    cutoff = timezone.now() - datetime.timedelta(seconds=constants.STALE_JOB_TIMEOUT)
+
+    return Q(status=constants.RUNNING) & (
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True)
+    )
+
+
+def requeue_stale_report_jobs():
+    """Queue the running jobs, whose workers stopped sending heartbeats, again
+    and return their number.
+    """
+    return ReportJob.objects.filter(get_stale_condition()).update(
+        status=constants.PENDING, worker="", started_at=None, heartbeat_at=None
+    )
+
+
+@contextlib.contextmanager
+def send_heartbeats(job):
+    """Mark the job as alive periodically, while the worker runs it."""
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(constants.HEARTBEAT_INTERVAL):
+                ReportJob.objects.filter(pk=job.pk, status=constants.RUNNING).update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def remove_csrf_tokens(content):
+    return CSRF_INPUT_RE.sub(
+        rb"\1" + constants.CSRF_TOKEN_PLACEHOLDER.encode() + rb"\2", content
+    )
+
+
+def insert_csrf_token(content, token):
+    return content.replace(constants.CSRF_TOKEN_PLACEHOLDER.encode(), token.encode())
+
+
+def claim_report_job(worker):
+    """Mark the oldest pending job as running and return it.
+
+    The conditional update makes sure that only one worker gets the job,
+    without relying on row locks, which SQLite doesn't support.
+    """
+    pending_jobs = ReportJob.objects.filter(status=constants.PENDING).order_by(
+        "created_at"
+    )
+
+    for pk in pending_jobs.values_list("pk", flat=True)[:10]:
+        now = timezone.now()
+        is_claimed = ReportJob.objects.filter(pk=pk, status=constants.PENDING).update(
+            status=constants.RUNNING, worker=worker, started_at=now, heartbeat_at=now
+        )
+
+        if is_claimed:
+            return ReportJob.objects.get(pk=pk)
+
+    return None
+
+
+def get_job_request(job, model):
+    """Return the request the action was posted with, as the worker sends it.
+
+    The messages of the action are stored in a session, which is dropped
+    with the request, since the user doesn't wait for them.
+    """
+    url = reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist")
+    request = RequestFactory().post(
+        f"{url}?{urlencode(job.params, doseq=True)}", job.data
+    )
+    request.user = job.user
+    request.session = SessionBase()
+    request._messages = default_storage(request)
+    request.is_report_worker = True
+
+    return request
+
+
+def get_job_queryset(job, model_admin, request):
+    """Return the rows the action was applied to, as the changelist selects
+    them. May raise `IncorrectLookupParameters`.
+    """
+    queryset = get_changelist_queryset(model_admin, request)
+
+    if job.pks is not None:
+        queryset = queryset.filter(pk__in=job.pks)
+
+    return queryset
+
+
+def run_report_job(job):
+    model = apps.get_model(job.model)
+    model_admin = admin.site._registry[model]
+
+    try:
+        with send_heartbeats(job), translation.override(job.language):
+            request = get_job_request(job, model)
+            queryset = get_job_queryset(job, model_admin, request)
+            response = getattr(model_admin, job.action)(request, queryset)
+
+            if hasattr(response, "render"):
+                response.render()
+
+            content = (
+                b"".join(response.streaming_content)
+                if response.streaming
+                else response.content
+            )
+    except Exception:
+        job.status = constants.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = constants.DONE
+        job.content_type = response["Content-Type"]
+        # The content is stored as it was sent, without the token of the
+        # worker, which isn't valid for the users.
+        job.content = (
+            remove_csrf_tokens(content)
+            if job.content_type.startswith("text/html")
+            else content
+        )
+
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=(
+            "status",
+            "error",
+            "content",
+            "content_type",
+            "finished_at",
+            "updated_at",
+        )
+    )
+
+    return job
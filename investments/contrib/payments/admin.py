@@ -1,8 +1,9 @@
-import copy
 import json
-from datetime import timedelta
 
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ERROR_FLAG
+from django.core.exceptions import PermissionDenied
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import (
     Avg,
@@ -27,38 +28,84 @@ from django.db.models.functions import (
     TruncQuarter,
     TruncYear,
 )
+from django.http import HttpResponseRedirect
 from django.shortcuts import render
-from django.urls import reverse
+from django.urls import path, reverse
+from django.utils.dates import MONTHS_3
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
 from investments import chart_constants
 from investments.contrib.currencies.models import ExchangeRate
-from investments.contrib.securities.constants import SECTOR_CHOICES
-from investments.contrib.securities.models import Bond
+from investments.contrib.jobs.utils import run_in_background
+from investments.contrib.search.utils import SearchIndexAdminMixin
+from investments.contrib.securities.constants import (
+    CHART_SECTORS_LIMIT,
+    SECTOR_CHOICES,
+)
 from investments.utils.admin import (
-    get_all_days,
-    get_all_months,
-    get_all_quarters,
-    get_all_years,
+    ChangeURLCacheAdminMixin,
+    get_change_url,
+    get_changelist_queryset,
     get_chart_data,
-    get_color,
+    get_security_change_url,
+)
+from investments.utils.admin_filters import (
+    AutocompleteFilter,
+    CachedAllValuesFieldListFilter,
+)
+from investments.utils.exports import (
+    EXPORT_CHUNK_SIZE,
+    chunked,
+    stream_csv,
+    stream_xlsx,
+)
+from investments.utils.pagination import EstimatedCountAdminMixin
+from investments.utils.pivot import DAY, MONTH, QUARTER, YEAR, get_pivot_chart_data
+from investments.utils.ranking import (
+    get_chart_offset,
+    get_top_chart_config,
+    get_top_chart_data,
+)
+from investments.utils.series import (
+    CHANGE,
+    CUMULATIVE,
+    MOVING_AVERAGE,
+    get_series_chart_data,
 )
 
-from .models import DividendPayment, InterestPayment
-
-
-def get_custom_titled_filter(title, filter_class):
-    class Wrapper(filter_class):
-        def __new__(cls, *args, **kwargs):
-            instance = filter_class.create(*args, **kwargs)
-            instance.title = title
-            return instance
-
-    return Wrapper
-
-
-class BasePaymentsAdmin(admin.ModelAdmin):
+from . import constants
+from .cube import (
+    CUBE_FIELDS,
+    PAYMENT_FIELDS,
+    aggregate_payment_cube,
+    get_payment_cube_queryset,
+)
+from .forecasts import get_dividend_forecast
+from .income import aggregate_income, get_income_chart_data, get_income_heatmap_data
+from .models import DividendPayment, InterestPayment, PaymentCube, TaxRate
+from .reports import build_payment_report_rows
+from .taxes import get_total_tax_due, get_yearly_taxes
+
+# The models, whose payments make up the income.
+INCOME_MODELS = (DividendPayment, InterestPayment)
+
+# The periods of the income charts and their names.
+INCOME_CHARTS = {
+    DAY: _("Income grouped by days"),
+    MONTH: _("Income grouped by months"),
+    QUARTER: _("Income grouped by quarters"),
+    YEAR: _("Income grouped by years"),
+}
+
+
+class BasePaymentsAdmin(
+    SearchIndexAdminMixin,
+    EstimatedCountAdminMixin,
+    ChangeURLCacheAdminMixin,
+    admin.ModelAdmin,
+):
+    change_list_template = "admin/payments/change_list.html"
     ordering = ("-recorded_on",)
     list_per_page = 100
     date_hierarchy = "recorded_on"
@@ -74,14 +121,11 @@ class BasePaymentsAdmin(admin.ModelAdmin):
         "user_link",
     )
     list_filter = (
-        "position__security__user",
+        ("position__security__user", AutocompleteFilter),
         "recorded_on",
-        "withheld_tax_rate",
-        "tags",
-        (
-            "position__security__name",
-            get_custom_titled_filter(_("Securities"), admin.FieldListFilter),
-        ),
+        ("withheld_tax_rate", CachedAllValuesFieldListFilter),
+        ("tags", AutocompleteFilter),
+        ("position__security", AutocompleteFilter),
     )
     search_fields = ("position__security", "notes")
     autocomplete_fields = ("position",)
@@ -94,9 +138,17 @@ class BasePaymentsAdmin(admin.ModelAdmin):
         "show_quarterly_payments_with_securities",
         "show_yearly_payments",
         "show_yearly_payments_with_securities",
+        "show_cumulative_payments",
+        "show_moving_average_payments",
+        "show_long_moving_average_payments",
+        "show_monthly_payments_change",
         "show_securities_by_received_amount",
+        "show_tags_by_received_amount",
         "show_aggregated_report",
         "show_payment_report",
+        "show_tax_report",
+        "export_payment_report_csv",
+        "export_payment_report_xlsx",
     ]
 
     @admin.display(
@@ -106,7 +158,7 @@ class BasePaymentsAdmin(admin.ModelAdmin):
     def position_link(self, payment):
         return mark_safe(
             '<a href="{}">{}</a>'.format(
-                reverse("admin:positions_position_change", args=(payment.position.pk,)),
+                get_change_url("admin:positions_position_change", payment.position.pk),
                 payment.position.position_id,
             )
         )
@@ -143,15 +195,10 @@ class BasePaymentsAdmin(admin.ModelAdmin):
     def security_link(self, payment):
         security = payment.position.security
 
-        try:
-            if security.bond:
-                reverse_string = "admin:securities_bond_change"
-        except Bond.DoesNotExist:
-            reverse_string = "admin:securities_stock_change"
-
         return mark_safe(
             '<a href="{}">{}</a>'.format(
-                reverse(reverse_string, args=(security.pk,)), security
+                get_security_change_url(security),
+                security,
             )
         )
 
@@ -161,7 +208,7 @@ class BasePaymentsAdmin(admin.ModelAdmin):
     def tag_links(self, payment):
         tag_links = [
             '<a href="{}">{}</a>'.format(
-                reverse("admin:tags_tag_change", args=(tag.pk,)),
+                get_change_url("admin:tags_tag_change", tag.pk),
                 tag,
             )
             for tag in payment.tags.all()
@@ -178,12 +225,13 @@ class BasePaymentsAdmin(admin.ModelAdmin):
 
         return mark_safe(
             '<a href="{}">{}</a>'.format(
-                reverse("admin:users_user_change", args=(user.pk,)),
+                get_change_url("admin:users_user_change", user.pk),
                 user.email,
             )
         )
 
     @admin.action(description=_("Show payments grouped by days"))
+    @run_in_background
     def show_daily_payments(self, request, queryset):
         queryset = (
             queryset.order_by()
@@ -220,54 +268,20 @@ class BasePaymentsAdmin(admin.ModelAdmin):
         )
 
     @admin.action(description=_("Show payments grouped by days with securities"))
+    @run_in_background
     def show_daily_payments_with_securities(self, request, queryset):
-        queryset = (
-            queryset.order_by()
-            .annotate(
-                day=ExtractDay("recorded_on"),
-                month=ExtractMonth("recorded_on"),
-                year=ExtractYear("recorded_on"),
-                security=F("position__security__name"),
-            )
-            .values("day", "month", "year", "security")
-            .annotate(
-                value=Sum("amount"),
-                label=Concat(
-                    "day",
-                    Value("."),
-                    "month",
-                    Value("."),
-                    "year",
-                    output_field=CharField(),
-                ),
-            )
-            .order_by(TruncDay("recorded_on"))
+        chart_data = get_pivot_chart_data(
+            queryset,
+            date_field="recorded_on",
+            group_field="position__security__name",
+            value_field="amount",
+            period=DAY,
+            limit=constants.CHART_SECURITIES_LIMIT,
         )
 
-        days = get_all_days(queryset)
-
-        results = {
-            row["security"]: {"label": row["security"], "data": copy.copy(days)}
-            for row in queryset
-        }
-
-        for row in queryset:
-            security = row["security"]
-            label = row["label"]
-            results[security]["data"][label] = row["value"]
-
-        datasets = [
-            {
-                "label": result["label"],
-                "data": list(result["data"].values()),
-                "backgroundColor": get_color(index),
-            }
-            for index, result in enumerate(results.values())
-        ]
-
         return self.show_payments(
             request,
-            data={"labels": list(days.keys()), "datasets": datasets},
+            data=chart_data,
             chart_name=_("Payments grouped by days"),
             chart_config={"is_stacked": True},
         )
@@ -275,7 +289,8 @@ class BasePaymentsAdmin(admin.ModelAdmin):
     @admin.action(description=_("Show payments grouped by months"))
     def show_monthly_payments(self, request, queryset):
         queryset = (
-            queryset.order_by()
+            self.get_chart_queryset(request, queryset)
+            .order_by()
             .annotate(
                 month=ExtractMonth("recorded_on"), year=ExtractYear("recorded_on")
             )
@@ -301,45 +316,19 @@ class BasePaymentsAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Show payments grouped by months with securities"))
     def show_monthly_payments_with_securities(self, request, queryset):
-        queryset = (
-            queryset.order_by()
-            .annotate(
-                month=ExtractMonth("recorded_on"),
-                year=ExtractYear("recorded_on"),
-                security=F("position__security__name"),
-            )
-            .values("month", "year", "security")
-            .annotate(
-                value=Sum("amount"),
-                label=Concat("month", Value("."), "year", output_field=CharField()),
-            )
-            .order_by(TruncMonth("recorded_on"))
+        queryset = self.get_chart_queryset(request, queryset)
+        chart_data = get_pivot_chart_data(
+            queryset,
+            date_field="recorded_on",
+            group_field=self.get_chart_fields(queryset)["security"],
+            value_field="amount",
+            period=MONTH,
+            limit=constants.CHART_SECURITIES_LIMIT,
         )
 
-        months = get_all_months(queryset)
-
-        results = {
-            row["security"]: {"label": row["security"], "data": copy.copy(months)}
-            for row in queryset
-        }
-
-        for row in queryset:
-            security = row["security"]
-            label = row["label"]
-            results[security]["data"][label] = row["value"]
-
-        datasets = [
-            {
-                "label": result["label"],
-                "data": list(result["data"].values()),
-                "backgroundColor": get_color(index),
-            }
-            for index, result in enumerate(results.values())
-        ]
-
         return self.show_payments(
             request,
-            data={"labels": list(months.keys()), "datasets": datasets},
+            data=chart_data,
             chart_name=_("Payments grouped by months"),
             chart_config={"is_stacked": True},
         )
@@ -347,7 +336,8 @@ class BasePaymentsAdmin(admin.ModelAdmin):
     @admin.action(description=_("Show payments grouped by quarters"))
     def show_quarterly_payments(self, request, queryset):
         queryset = (
-            queryset.order_by()
+            self.get_chart_queryset(request, queryset)
+            .order_by()
             .annotate(
                 quarter=ExtractQuarter("recorded_on"), year=ExtractYear("recorded_on")
             )
@@ -373,45 +363,19 @@ class BasePaymentsAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Show payments grouped by quarters with securities"))
     def show_quarterly_payments_with_securities(self, request, queryset):
-        queryset = (
-            queryset.order_by()
-            .annotate(
-                quarter=ExtractQuarter("recorded_on"),
-                year=ExtractYear("recorded_on"),
-                security=F("position__security__name"),
-            )
-            .values("quarter", "year", "security")
-            .annotate(
-                value=Sum("amount"),
-                label=Concat("quarter", Value("/"), "year", output_field=CharField()),
-            )
-            .order_by(TruncQuarter("recorded_on"))
+        queryset = self.get_chart_queryset(request, queryset)
+        chart_data = get_pivot_chart_data(
+            queryset,
+            date_field="recorded_on",
+            group_field=self.get_chart_fields(queryset)["security"],
+            value_field="amount",
+            period=QUARTER,
+            limit=constants.CHART_SECURITIES_LIMIT,
         )
 
-        quarters = get_all_quarters(queryset)
-
-        results = {
-            row["security"]: {"label": row["security"], "data": copy.copy(quarters)}
-            for row in queryset
-        }
-
-        for row in queryset:
-            security = row["security"]
-            label = row["label"]
-            results[security]["data"][label] = row["value"]
-
-        datasets = [
-            {
-                "label": result["label"],
-                "data": list(result["data"].values()),
-                "backgroundColor": get_color(index),
-            }
-            for index, result in enumerate(results.values())
-        ]
-
         return self.show_payments(
             request,
-            data={"labels": list(quarters.keys()), "datasets": datasets},
+            data=chart_data,
             chart_name=_("Payments grouped by quarters"),
             chart_config={"is_stacked": True},
         )
@@ -419,7 +383,8 @@ class BasePaymentsAdmin(admin.ModelAdmin):
     @admin.action(description=_("Show payments grouped by years"))
     def show_yearly_payments(self, request, queryset):
         queryset = (
-            queryset.order_by()
+            self.get_chart_queryset(request, queryset)
+            .order_by()
             .annotate(year=ExtractYear("recorded_on"))
             .values("year")
             .annotate(
@@ -443,60 +408,103 @@ class BasePaymentsAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Show payments grouped by years with securities"))
     def show_yearly_payments_with_securities(self, request, queryset):
-        queryset = (
-            queryset.order_by()
-            .annotate(
-                year=ExtractYear("recorded_on"),
-                security=F("position__security__name"),
-            )
-            .values("year", "security")
-            .annotate(
-                value=Sum("amount"),
-                label=F("year"),
-            )
-            .order_by(TruncYear("recorded_on"))
+        queryset = self.get_chart_queryset(request, queryset)
+        chart_data = get_pivot_chart_data(
+            queryset,
+            date_field="recorded_on",
+            group_field=self.get_chart_fields(queryset)["security"],
+            value_field="amount",
+            period=YEAR,
+            limit=constants.CHART_SECURITIES_LIMIT,
         )
 
-        years = get_all_years(queryset)
+        return self.show_payments(
+            request,
+            data=chart_data,
+            chart_name=_("Payments grouped by years"),
+            chart_config={"is_stacked": True},
+        )
 
-        results = {
-            row["security"]: {"label": row["security"], "data": copy.copy(years)}
-            for row in queryset
-        }
+    @admin.action(description=_("Show cumulative payments by months"))
+    def show_cumulative_payments(self, request, queryset):
+        chart_data = get_series_chart_data(
+            self.get_chart_queryset(request, queryset),
+            date_field="recorded_on",
+            value_field="amount",
+            period=MONTH,
+            metric=CUMULATIVE,
+            label=_("Cumulative payments"),
+        )
 
-        for row in queryset:
-            security = row["security"]
-            label = row["label"]
-            results[security]["data"][label] = row["value"]
-
-        datasets = [
-            {
-                "label": result["label"],
-                "data": list(result["data"].values()),
-                "backgroundColor": get_color(index),
-            }
-            for index, result in enumerate(results.values())
-        ]
+        return self.show_payments(
+            request,
+            data=chart_data,
+            chart_name=_("Cumulative payments by months"),
+            chart_type=chart_constants.LINE_CHART,
+        )
+
+    @admin.action(description=_("Show 3-month moving average of payments"))
+    def show_moving_average_payments(
+        self, request, queryset, months=constants.MOVING_AVERAGE_MONTHS
+    ):
+        chart_data = get_series_chart_data(
+            self.get_chart_queryset(request, queryset),
+            date_field="recorded_on",
+            value_field="amount",
+            period=MONTH,
+            metric=MOVING_AVERAGE,
+            label=_("Moving average"),
+            size=months,
+        )
 
         return self.show_payments(
             request,
-            data={"labels": list(years.keys()), "datasets": datasets},
-            chart_name=_("Payments grouped by years"),
-            chart_config={"is_stacked": True},
+            data=chart_data,
+            chart_name=_("%(months)s-month moving average of payments")
+            % {"months": months},
+            chart_type=chart_constants.LINE_CHART,
+        )
+
+    @admin.action(description=_("Show 12-month moving average of payments"))
+    def show_long_moving_average_payments(self, request, queryset):
+        return self.show_moving_average_payments(
+            request, queryset, months=constants.LONG_MOVING_AVERAGE_MONTHS
+        )
+
+    @admin.action(description=_("Show month-over-month change of payments"))
+    def show_monthly_payments_change(self, request, queryset):
+        chart_data = get_series_chart_data(
+            self.get_chart_queryset(request, queryset),
+            date_field="recorded_on",
+            value_field="amount",
+            period=MONTH,
+            metric=CHANGE,
+            label=_("Change"),
+        )
+
+        return self.show_payments(
+            request,
+            data=chart_data,
+            chart_name=_("Month-over-month change of payments"),
+            chart_type=chart_constants.LINE_CHART,
         )
 
     @admin.action(description=_("Show securities grouped by received amount"))
     def show_securities_by_received_amount(self, request, queryset):
+        queryset = self.get_chart_queryset(request, queryset)
+        security_field = self.get_chart_fields(queryset)["security"]
         queryset = (
             queryset.order_by()
-            .values("position__security__name")
-            .annotate(value=Sum("amount"), label=F("position__security__name"))
+            .values(security_field)
+            .annotate(value=Sum("amount"), label=F(security_field))
         )
 
-        chart_data = get_chart_data(
+        chart_data = get_top_chart_data(
             queryset=queryset,
             label=_("Received amount"),
             colors=chart_constants.COLORS,
+            limit=constants.CHART_SECURITIES_LIMIT,
+            offset=get_chart_offset(request),
         )
 
         return self.show_payments(
@@ -504,29 +512,73 @@ class BasePaymentsAdmin(admin.ModelAdmin):
             data=chart_data,
             chart_name=_("Securities grouped by received amount"),
             chart_type=chart_constants.PIE_CHART,
+            chart_config=get_top_chart_config(
+                request, chart_data, constants.CHART_SECURITIES_LIMIT
+            ),
+        )
+
+    @admin.action(description=_("Show tags grouped by received amount"))
+    def show_tags_by_received_amount(self, request, queryset):
+        queryset = self.get_chart_queryset(request, queryset, by_tag=True)
+        tag_field = self.get_chart_fields(queryset)["tag"]
+        queryset = (
+            queryset.order_by()
+            .values(tag_field)
+            .annotate(value=Sum("amount"), label=F(tag_field))
+            .exclude(label=None)
+        )
+
+        chart_data = get_top_chart_data(
+            queryset=queryset,
+            label=_("Received amount"),
+            colors=chart_constants.COLORS,
+            limit=constants.CHART_TAGS_LIMIT,
+            offset=get_chart_offset(request),
+        )
+
+        return self.show_payments(
+            request,
+            data=chart_data,
+            chart_name=_("Tags grouped by received amount"),
+            chart_type=chart_constants.PIE_CHART,
+            chart_config=get_top_chart_config(
+                request, chart_data, constants.CHART_TAGS_LIMIT
+            ),
         )
 
     @admin.action(description=_("Show aggregated report"))
     def show_aggregated_report(self, request, queryset):
-        data = queryset.aggregate(
-            total_received_amount=Sum("amount"),
-            total_withheld_tax=Sum("withheld_tax"),
-            gross_amount=Sum("amount") + Sum("withheld_tax"),
-            gross_untaxed_amount=Sum(Case(When(withheld_tax=0, then="amount"))),
-            average_tax_rate=Avg("withheld_tax_rate"),
-            average_amount=Avg("amount"),
-            payment_count=Count("uuid"),
-            position_count=Count("position", distinct=True),
-            # Without cast the result will be integer
-            payments_per_position=Cast(Count("uuid"), FloatField())
-            / Cast(Count("position", distinct=True), FloatField()),
-            received_amount_per_position=Sum("amount")
-            / Count("position", distinct=True),
-        )
+        cells = self.get_chart_queryset(request, queryset)
 
+        if cells.model is PaymentCube:
+            data = aggregate_payment_cube(cells, queryset)
+        else:
+            data = queryset.aggregate(
+                total_received_amount=Sum("amount"),
+                total_withheld_tax=Sum("withheld_tax"),
+                gross_amount=Sum("amount") + Sum("withheld_tax"),
+                gross_untaxed_amount=Sum(Case(When(withheld_tax=0, then="amount"))),
+                average_tax_rate=Avg("withheld_tax_rate"),
+                average_amount=Avg("amount"),
+                payment_count=Count("uuid"),
+                position_count=Count("position", distinct=True),
+                # Without cast the result will be integer
+                payments_per_position=Cast(Count("uuid"), FloatField())
+                / Cast(Count("position", distinct=True), FloatField()),
+                received_amount_per_position=Sum("amount")
+                / Count("position", distinct=True),
+            )
+
+        return self.show_aggregated_report_data(request, data, [queryset])
+
+    def show_aggregated_report_data(self, request, data, querysets):
         exchange_rate = (
             ExchangeRate.objects.filter(currency__code="USD").order_by("date").last()
         )
+        # The tax due is reconciled with the rates of the countries and the
+        # years, as in the payment and the tax reports, and converted with
+        # the rates of the payment dates.
+        data["tax_due"], data["tax_due_local"] = get_total_tax_due(querysets)
 
         return render(
             request,
@@ -540,10 +592,55 @@ class BasePaymentsAdmin(admin.ModelAdmin):
         )
 
     @admin.action(description=_("Show payment report"))
+    @run_in_background
     def show_payment_report(self, request, queryset):
-        # data = queryset.values("recorded_on", "position__security").annotate(total_amount=Sum('amount'))
-        data = (
-            queryset.values("recorded_on", "position__security__name")
+        data = build_payment_report_rows(self.get_payment_report_queryset(queryset))
+
+        return render(
+            request,
+            "admin/payments/payment_report.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "data": data,
+            },
+        )
+
+    @admin.action(description=_("Show tax report"))
+    def show_tax_report(self, request, queryset):
+        return render(
+            request,
+            "admin/payments/tax_report.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "data": get_yearly_taxes(queryset),
+            },
+        )
+
+    @admin.action(description=_("Export payment report as CSV"))
+    def export_payment_report_csv(self, request, queryset):
+        return stream_csv(
+            filename="payment_report.csv",
+            header=self.get_payment_report_header(),
+            rows=self.get_payment_report_rows(queryset),
+        )
+
+    @admin.action(description=_("Export payment report as XLSX"))
+    def export_payment_report_xlsx(self, request, queryset):
+        return stream_xlsx(
+            filename="payment_report.xlsx",
+            header=self.get_payment_report_header(),
+            rows=self.get_payment_report_rows(queryset),
+        )
+
+    def get_payment_report_queryset(self, queryset):
+        return (
+            queryset.values(
+                "recorded_on",
+                "position__security__name",
+                "position__security__country",
+            )
             .annotate(
                 total_received_amount=Sum("amount"),
                 total_withheld_tax=Sum("withheld_tax"),
@@ -552,56 +649,205 @@ class BasePaymentsAdmin(admin.ModelAdmin):
             .order_by("recorded_on")
         )
 
-        start_date = data.first()["recorded_on"]
-        end_date = data.last()["recorded_on"]
+    def get_payment_report_header(self):
+        return (
+            _("Recorded on"),
+            _("Security"),
+            _("Received amount"),
+            _("Withheld tax"),
+            _("Gross amount"),
+            _("Tax due"),
+            _("Exchange rate"),
+            _("Received amount (BGN)"),
+            _("Withheld tax (BGN)"),
+            _("Gross amount (BGN)"),
+            _("Tax due (BGN)"),
+        )
+
+    def get_payment_report_rows(self, queryset):
+        data = self.get_payment_report_queryset(queryset)
+
+        # The rates are resolved once per chunk, so only the rates for the
+        # dates of the rows being written are kept in memory.
+        for chunk in chunked(data.iterator(chunk_size=EXPORT_CHUNK_SIZE)):
+            for row in build_payment_report_rows(chunk):
+                yield [
+                    row["recorded_on"],
+                    row["security"],
+                    row["received_amount"],
+                    row["withheld_tax"],
+                    row["gross_amount"],
+                    row["tax_due"],
+                    row["exchange_rate"],
+                    row["received_amount_local"],
+                    row["withheld_tax_local"],
+                    row["gross_amount_local"],
+                    row["tax_due_local"],
+                ]
+
+    def get_urls(self):
+        return [
+            path(
+                "income/",
+                self.admin_site.admin_view(self.income_view),
+                name="{}_{}_income".format(self.opts.app_label, self.opts.model_name),
+            ),
+            *super().get_urls(),
+        ]
 
-        exchange_rates_queryset = ExchangeRate.objects.filter(
-            currency__code="USD",
-            # In case there is no rate for the start rate.
-            # There should be more than 7 days without rates
-            date__gte=start_date - timedelta(days=7),
-            date__lte=end_date,
-        )
+    def income_view(self, request):
+        """Show the dividends and the interest together.
 
-        exchange_rates = {
-            rate.date.isoformat(): rate for rate in exchange_rates_queryset
-        }
+        The filters of the changelist are applied to the payments of each
+        model, which are then aggregated in one query.
+        """
+        model_admins = [
+            self.admin_site._registry[model]
+            for model in INCOME_MODELS
+            if self.admin_site._registry[model].has_view_permission(request)
+        ]
 
-        current_date = start_date
+        if not model_admins:
+            raise PermissionDenied
 
-        def get_rate(date):
-            key = date.isoformat()
-            return exchange_rates.get(key)
+        report = request.GET.get(constants.INCOME_REPORT_VAR, MONTH)
 
-        while current_date <= end_date:
-            exchange_rate = None
-            lookout_date = current_date
+        try:
+            querysets = [
+                get_changelist_queryset(
+                    model_admin,
+                    request,
+                    ignored_params=(
+                        constants.INCOME_REPORT_VAR,
+                        constants.INCOME_CURRENCY_VAR,
+                    ),
+                )
+                for model_admin in model_admins
+            ]
+        except IncorrectLookupParameters:
+            return HttpResponseRedirect(
+                "{}?{}=1".format(
+                    reverse(
+                        "admin:{}_{}_changelist".format(
+                            self.opts.app_label, self.opts.model_name
+                        )
+                    ),
+                    ERROR_FLAG,
+                )
+            )
 
-            exchange_rate = get_rate(lookout_date)
+        if report == constants.INCOME_AGGREGATED_REPORT:
+            return self.show_aggregated_report_data(
+                request, aggregate_income(querysets), querysets
+            )
 
-            if exchange_rate:
-                current_date += timedelta(days=1)
-                continue
+        if report not in (*INCOME_CHARTS, constants.INCOME_HEATMAP_REPORT):
+            report = MONTH
 
-            while not exchange_rate:
-                # Mooving back in time until we find the rate
-                lookout_date -= timedelta(days=1)
-                exchange_rate = get_rate(lookout_date)
+        reports = self.get_income_links(
+            request,
+            constants.INCOME_REPORT_VAR,
+            report,
+            (
+                *INCOME_CHARTS.items(),
+                (constants.INCOME_HEATMAP_REPORT, _("Heatmap")),
+                (constants.INCOME_AGGREGATED_REPORT, _("Aggregated report")),
+            ),
+        )
 
-            exchange_rates[current_date.isoformat()] = exchange_rate
-            current_date += timedelta(days=1)
+        if report == constants.INCOME_HEATMAP_REPORT:
+            return self.show_income_heatmap(request, querysets, reports)
 
         return render(
             request,
-            "admin/payments/payment_report.html",
+            "admin/payments/income.html",
             context={
                 **self.admin_site.each_context(request),
                 "opts": self.model._meta,
-                "data": data,
-                "exchange_rates": exchange_rates,
+                "data": json.dumps(
+                    get_income_chart_data(
+                        querysets, report, limit=constants.CHART_SECURITIES_LIMIT
+                    ),
+                    cls=DjangoJSONEncoder,
+                ),
+                "chart_name": INCOME_CHARTS[report],
+                "chart_type": chart_constants.BAR_CHART,
+                "chart_config": {"is_stacked": True},
+                "reports": reports,
             },
         )
 
+    def show_income_heatmap(self, request, querysets, reports):
+        currency = request.GET.get(constants.INCOME_CURRENCY_VAR)
+
+        if currency != constants.LOCAL_CURRENCY:
+            currency = constants.PAYMENT_CURRENCY
+
+        return render(
+            request,
+            "admin/payments/income_heatmap.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "data": json.dumps(
+                    get_income_heatmap_data(
+                        querysets,
+                        to_local_currency=currency == constants.LOCAL_CURRENCY,
+                    ),
+                    cls=DjangoJSONEncoder,
+                ),
+                "months": [MONTHS_3[month].title() for month in range(1, 13)],
+                "chart_name": _("Income heatmap in %(currency)s")
+                % {"currency": currency},
+                "reports": reports,
+                "currencies": self.get_income_links(
+                    request,
+                    constants.INCOME_CURRENCY_VAR,
+                    currency,
+                    (
+                        (constants.PAYMENT_CURRENCY, constants.PAYMENT_CURRENCY),
+                        (constants.LOCAL_CURRENCY, constants.LOCAL_CURRENCY),
+                    ),
+                ),
+            },
+        )
+
+    def get_income_links(self, request, param, active_value, choices):
+        links = []
+
+        for value, label in choices:
+            params = request.GET.copy()
+            params[param] = value
+            links.append(
+                {
+                    "label": label,
+                    "url": f"?{params.urlencode()}",
+                    "is_active": value == active_value,
+                }
+            )
+
+        return links
+
+    def get_chart_queryset(self, request, queryset, by_tag=False):
+        """Return the cube cells of the payments the action applies to.
+
+        They are used only when all payments of the changelist are selected
+        and the cube can answer its filters. The cells sum many payments, so
+        the payments selected one by one are always returned as they are.
+        Both have an amount and a monthly recorded_on. With `by_tag` the cells
+        of the tags are returned.
+        """
+        if request.POST.get("select_across") == "1":
+            cells = get_payment_cube_queryset(self.model, request.GET, by_tag)
+
+            if cells is not None:
+                return cells
+
+        return queryset
+
+    def get_chart_fields(self, queryset):
+        return CUBE_FIELDS if queryset.model is PaymentCube else PAYMENT_FIELDS
+
     def show_payments(
         self,
         request,
@@ -639,8 +885,6 @@ class BasePaymentsAdmin(admin.ModelAdmin):
                 "position__broker",
                 "position__security",
                 "position__security__user",
-                "position__security__bond",
-                "position__security__stock",
             )
             .prefetch_related(
                 "tags",
@@ -650,24 +894,31 @@ class BasePaymentsAdmin(admin.ModelAdmin):
 
 @admin.register(DividendPayment)
 class DividendPaymentsAdmin(BasePaymentsAdmin):
-    def __init__(self, model, admin_site):
-        self.actions.append("show_sectors_by_received_amount")
-        super().__init__(model, admin_site)
+    actions = [
+        *BasePaymentsAdmin.actions,
+        "show_sectors_by_received_amount",
+        "show_dividend_forecast",
+        "show_long_dividend_forecast",
+    ]
 
     @admin.action(description=_("Show sectors grouped by received amount"))
     def show_sectors_by_received_amount(self, request, queryset):
+        queryset = self.get_chart_queryset(request, queryset)
+        sector_field = self.get_chart_fields(queryset)["sector"]
         queryset = (
             queryset.order_by()
-            .values("position__security__stock__sector")
-            .annotate(value=Sum("amount"), label=F("position__security__stock__sector"))
+            .values(sector_field)
+            .annotate(value=Sum("amount"), label=F(sector_field))
         )
 
         label_map = {key: value for (key, value) in SECTOR_CHOICES}
 
-        chart_data = get_chart_data(
+        chart_data = get_top_chart_data(
             queryset=queryset,
             label=_("Received amount"),
             colors=chart_constants.COLORS,
+            limit=CHART_SECTORS_LIMIT,
+            offset=get_chart_offset(request),
             label_map=label_map,
         )
 
@@ -676,9 +927,44 @@ class DividendPaymentsAdmin(BasePaymentsAdmin):
             data=chart_data,
             chart_name=_("Sectors grouped by received amount"),
             chart_type=chart_constants.PIE_CHART,
+            chart_config=get_top_chart_config(request, chart_data, CHART_SECTORS_LIMIT),
+        )
+
+    @admin.action(description=_("Show dividend forecast for 12 months"))
+    def show_dividend_forecast(
+        self, request, queryset, months=constants.FORECAST_MONTHS
+    ):
+        return self.show_payments(
+            request,
+            data=get_dividend_forecast(queryset, months),
+            chart_name=_("Dividend forecast for %(months)s months")
+            % {"months": months},
+            chart_config={"is_stacked": True},
+        )
+
+    @admin.action(description=_("Show dividend forecast for 24 months"))
+    def show_long_dividend_forecast(self, request, queryset):
+        return self.show_dividend_forecast(
+            request, queryset, months=constants.LONG_FORECAST_MONTHS
         )
 
 
 @admin.register(InterestPayment)
 class InterestPaymentsAdmin(BasePaymentsAdmin):
     pass
+
+
+@admin.register(TaxRate)
+class TaxRatesAdmin(admin.ModelAdmin):
+    list_filter = ("country", "year", "created_at", "updated_at")
+    list_display = (
+        "country",
+        "year",
+        "local_rate",
+        "treaty_rate",
+        "created_at",
+        "updated_at",
+    )
+    list_per_page = 50
+    ordering = ("country", "-year")
+    search_fields = ("country",)
@@ -4,3 +4,33 @@ from django.apps import AppConfig
 class PaymentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "investments.contrib.payments"
+
+    def ready(self):
+        from investments.contrib.positions.models import Position
+        from investments.contrib.rollups.utils import register_date_rollup
+        from investments.contrib.search.utils import register_search_index
+        from investments.contrib.securities.models import Security
+        from investments.utils.admin_filters import register_cached_choices
+
+        from .cube import register_payment_cube
+        from .models import DividendPayment, InterestPayment
+
+        for model in (DividendPayment, InterestPayment):
+            register_payment_cube(model)
+            register_cached_choices(model)
+            register_date_rollup(
+                model,
+                "recorded_on",
+                "position__security__user",
+                dependencies={Security: "position__security", Position: "position"},
+            )
+            register_search_index(
+                model,
+                (
+                    "notes",
+                    "position__position_id",
+                    "position__security__name",
+                    "position__security__stock__symbol",
+                ),
+                dependencies={Security: "position__security", Position: "position"},
+            )
@@ -13,3 +13,32 @@ DIVIDEND_TYPES = (
     (ANNUAL, _("Annual")),
     (SPECIAL, _("Special")),
 )
+
+# The securities with the largest amounts shown in the stacked charts, so
+# each has its own color. The rest are shown together.
+CHART_SECURITIES_LIMIT = 20
+CHART_TAGS_LIMIT = 20
+
+# The parameter of the income view, which selects the chart or the report.
+INCOME_REPORT_VAR = "report"
+INCOME_AGGREGATED_REPORT = "aggregated"
+INCOME_HEATMAP_REPORT = "heatmap"
+
+# The parameter of the income view, which selects the currency of the heatmap,
+# and the currencies. The payments are in USD, which is converted to BGN with
+# the exchange rate of the date of each payment.
+INCOME_CURRENCY_VAR = "currency"
+PAYMENT_CURRENCY = "USD"
+LOCAL_CURRENCY = "BGN"
+
+# The months of the moving averages of the payments.
+MOVING_AVERAGE_MONTHS = 3
+LONG_MOVING_AVERAGE_MONTHS = 12
+
+# The months of the dividend forecasts.
+FORECAST_MONTHS = 12
+LONG_FORECAST_MONTHS = 24
+
+# The local tax rate of the payments, when there are no tax rates of their
+# country or year.
+TAX_PERCENTAGE = 10
@@ -0,0 +1,568 @@
+import datetime
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.contrib.admin.utils import prepare_lookup_value
+from django.contrib.admin.views.main import (
+    ERROR_FLAG,
+    IGNORED_PARAMS,
+    PAGE_VAR,
+    SEARCH_VAR,
+)
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+
+from investments.contrib.positions.models import Position
+from investments.contrib.search.utils import get_models_with_subclasses
+from investments.contrib.securities.models import Security
+from investments.utils.pagination import EXACT_COUNT_VAR
+
+from .models import Payment, PaymentCube
+
+# The fields of the payments, which the cells depend on.
+CELL_FIELDS = {"recorded_on", "position", "amount", "withheld_tax", "withheld_tax_rate"}
+
+# The models, whose fields the cells depend on, with the lookups from the
+# payments to them and the fields.
+CELL_DEPENDENCIES = (
+    (Position, "position", {"security", "broker"}),
+    (Security, "position__security", {"user", "sector"}),
+)
+
+# The field paths of the charts in the payments and in the cube.
+PAYMENT_FIELDS = {
+    "security": "position__security__name",
+    "sector": "position__security__stock__sector",
+    "tag": "tags__name",
+}
+CUBE_FIELDS = {"security": "security__name", "sector": "sector", "tag": "tag__name"}
+
+# The prefixes of the changelist parameters of the payments, which the cube
+# can filter by, and the prefixes of the cube lookups they become. The
+# payments without tags have no cells of their own, so they can't be selected.
+CUBE_FILTER_PREFIXES = (
+    ("tags__isnull", None),
+    ("tags__", "tag__"),
+    ("position__security__user__", "user__"),
+    ("position__security__stock__sector", "sector"),
+    ("position__security__", "security__"),
+    ("position__broker__", "broker__"),
+    ("withheld_tax_rate", "withheld_tax_rate"),
+    ("recorded_on__year", "recorded_on__year"),
+    ("recorded_on__month", "recorded_on__month"),
+    ("recorded_on__isnull", "recorded_on__isnull"),
+)
+# The date bounds, which the cube can filter by when they are months.
+CUBE_MONTH_BOUNDS = ("recorded_on__gte", "recorded_on__lt")
+
+# The labels of the payment models with a cube.
+PAYMENT_CUBES = set()
+
+_deferred = threading.local()
+
+
+def register_payment_cube(model):
+    """Keep the cube cells of `model` current, as its payments change.
+
+    The cells of the old and the new month of each saved, deleted or tagged
+    payment are recomputed, and so are all cells of a security, whose user,
+    sector or positions change. The bulk updates of the positions and the
+    securities recompute them with `payment_cube_updates`.
+    """
+    PAYMENT_CUBES.add(model._meta.label)
+
+    m2m_changed.connect(
+        update_tag_cells,
+        sender=Payment.tags.through,
+        dispatch_uid="payment_cube:update_tag_cells",
+    )
+
+    for signal, receiver in (
+        (pre_save, store_cell_keys),
+        (pre_delete, store_cell_keys),
+        (post_save, update_cells),
+        (post_delete, update_cells),
+    ):
+        signal.connect(
+            receiver,
+            sender=model,
+            dispatch_uid=f"payment_cube:{receiver.__name__}:{model._meta.label}",
+        )
+
+    for related_model, fields in (
+        (Position, ("security", "broker")),
+        (Security, ("pk", "user", "stock__sector")),
+    ):
+        store_state, update_dependent_cells = get_dependency_receivers(
+            related_model, fields
+        )
+
+        for sender in get_models_with_subclasses(related_model):
+            pre_save.connect(
+                store_state,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"payment_cube:store_state:{sender._meta.label}",
+            )
+            post_save.connect(
+                update_dependent_cells,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"payment_cube:update_dependent_cells:{sender._meta.label}",
+            )
+
+
+def get_dependency_receivers(related_model, fields):
+    """Return the receivers, which refresh the cells of the securities of the
+    rows of `related_model`, whose `fields` change. The first is the security.
+    """
+
+    def get_state(pk):
+        return related_model._base_manager.filter(pk=pk).values_list(*fields).first()
+
+    def store_state(sender, instance, update_fields=None, **kwargs):
+        is_changed = update_fields is None or {
+            field.split("__")[-1] for field in fields
+        } & set(update_fields)
+
+        instance._payment_cube_state = (
+            get_state(instance.pk)
+            if is_changed and not instance._state.adding
+            else None
+        )
+
+    def update_dependent_cells(sender, instance, **kwargs):
+        state = getattr(instance, "_payment_cube_state", None)
+        instance._payment_cube_state = None
+
+        if state is None:
+            return
+
+        new_state = get_state(instance.pk)
+
+        if state != new_state:
+            for label in PAYMENT_CUBES:
+                for security_id in {state[0], new_state[0]}:
+                    refresh_payment_cube(apps.get_model(label), security_id)
+
+    return store_state, update_dependent_cells
+
+
+def get_cell_keys(queryset):
+    """Return the pairs of a security and a date of the payments of `queryset`."""
+    return set(
+        queryset.order_by().values_list("position__security", "recorded_on").distinct()
+    )
+
+
+def store_cell_keys(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (
+        update_fields is not None and not CELL_FIELDS & set(update_fields)
+    ):
+        instance._payment_cube_keys = set()
+        return
+
+    instance._payment_cube_keys = get_cell_keys(
+        sender._base_manager.filter(pk=instance.pk)
+    )
+
+
+def update_cells(sender, instance, signal, update_fields=None, **kwargs):
+    keys = getattr(instance, "_payment_cube_keys", set())
+    instance._payment_cube_keys = set()
+
+    if signal is post_save and (
+        update_fields is None or CELL_FIELDS & set(update_fields)
+    ):
+        keys = keys | get_cell_keys(sender._base_manager.filter(pk=instance.pk))
+
+    update_payment_cube(sender, keys)
+
+
+def get_tagged_payment_pks(sender, instance, reverse, pk_set):
+    if not reverse:
+        return {instance.pk}
+
+    if pk_set is not None:
+        return pk_set
+
+    return set(sender.objects.filter(tag=instance).values_list("payment", flat=True))
+
+
+def update_tag_cells(sender, instance, action, reverse, pk_set, **kwargs):
+    # The payments of a cleared tag are gone after the clear, so they are
+    # stored before it.
+    if action == "pre_clear":
+        instance._payment_cube_pks = get_tagged_payment_pks(
+            sender, instance, reverse, None
+        )
+        return
+
+    if action == "post_clear":
+        pks = getattr(instance, "_payment_cube_pks", set())
+        instance._payment_cube_pks = set()
+    elif action in ("post_add", "post_remove"):
+        pks = get_tagged_payment_pks(sender, instance, reverse, pk_set)
+    else:
+        return
+
+    for label in PAYMENT_CUBES:
+        model = apps.get_model(label)
+        update_payment_cube(
+            model, get_cell_keys(model._base_manager.filter(pk__in=pks))
+        )
+
+
+def update_payment_cube(model, keys):
+    """Refresh the cells of the months of the pairs of a security and a date
+    of `keys`.
+
+    Within `deferred_payment_cube_updates` they are refreshed at its end.
+    """
+    deferred_months = getattr(_deferred, "months", None)
+    months = (
+        defaultdict(set)
+        if deferred_months is None
+        else deferred_months[model._meta.label]
+    )
+
+    for security_id, date in keys:
+        months[security_id].add(get_month(date))
+
+    if deferred_months is None:
+        for security_id, security_months in months.items():
+            refresh_payment_cube(model, security_id, security_months)
+
+
+@contextmanager
+def payment_cube_updates(queryset, fields):
+    """Refresh the cells of the payments of the rows of `queryset`, whose
+    `fields` the block updates in bulk, since it sends no signals.
+
+    These are the positions, whose security or broker change, and the
+    securities, whose user or sector change.
+    """
+    model = queryset.model
+    fields = {model._meta.get_field(field).name for field in fields}
+    lookup = next(
+        (
+            lookup
+            for related_model, lookup, cell_fields in CELL_DEPENDENCIES
+            if issubclass(model, related_model) and fields & cell_fields
+        ),
+        None,
+    )
+
+    if lookup is None or not PAYMENT_CUBES:
+        yield
+        return
+
+    pks = list(queryset.values_list("pk", flat=True))
+
+    def get_keys():
+        return {
+            label: get_cell_keys(
+                apps.get_model(label)._base_manager.filter(**{f"{lookup}__in": pks})
+            )
+            for label in PAYMENT_CUBES
+        }
+
+    keys = get_keys()
+
+    yield
+
+    for label, new_keys in get_keys().items():
+        update_payment_cube(apps.get_model(label), keys[label] | new_keys)
+
+
+@contextmanager
+def deferred_payment_cube_updates():
+    """Refresh the cells of the payments changed in the block once, at its end.
+
+    Meant for imports, which save many payments of the same securities.
+    """
+    if getattr(_deferred, "months", None) is not None:
+        yield
+        return
+
+    _deferred.months = defaultdict(lambda: defaultdict(set))
+
+    try:
+        yield
+    finally:
+        months, _deferred.months = _deferred.months, None
+
+        for label, security_months in months.items():
+            for security_id, security_month_set in security_months.items():
+                refresh_payment_cube(
+                    apps.get_model(label), security_id, security_month_set
+                )
+
+
+def get_cube_rows(queryset, by_tag=False):
+    """Return the cells of the payments of `queryset`.
+
+    With `by_tag` there is a cell per tag of the payments instead, and the
+    payments without tags are left out.
+    """
+    tag = {"tag_id": F("tags")} if by_tag else {}
+    rows = (
+        queryset.order_by()
+        .values(
+            "withheld_tax_rate",
+            **tag,
+            user_id=F("position__security__user"),
+            security_id=F("position__security"),
+            sector=F("position__security__stock__sector"),
+            broker_id=F("position__broker"),
+            month=TruncMonth("recorded_on"),
+        )
+        .annotate(
+            total_amount=Sum("amount"),
+            total_withheld_tax=Sum("withheld_tax"),
+            total_gross_amount=Sum(
+                F("amount") + Coalesce("withheld_tax", Value(Decimal(0))),
+                output_field=DecimalField(),
+            ),
+            total_untaxed_amount=Sum(Case(When(withheld_tax=0, then="amount"))),
+            payment_count=Count("pk"),
+        )
+    )
+
+    return rows.filter(tag_id__isnull=False) if by_tag else rows
+
+
+def get_cells(model, queryset):
+    for by_tag in (False, True):
+        for row in get_cube_rows(queryset, by_tag).iterator():
+            yield get_cell(model, row)
+
+
+def get_cell(model, row):
+    return PaymentCube(
+        model=model._meta.label,
+        user_id=row["user_id"],
+        security_id=row["security_id"],
+        sector=row["sector"],
+        broker_id=row["broker_id"],
+        withheld_tax_rate=row["withheld_tax_rate"],
+        tag_id=row.get("tag_id"),
+        recorded_on=row["month"],
+        amount=row["total_amount"],
+        withheld_tax=row["total_withheld_tax"],
+        gross_amount=row["total_gross_amount"],
+        untaxed_amount=row["total_untaxed_amount"],
+        count=row["payment_count"],
+    )
+
+
+def get_month(date):
+    return date.replace(day=1)
+
+
+def get_next_month(date):
+    return (date.replace(day=1) + datetime.timedelta(days=31)).replace(day=1)
+
+
+def refresh_payment_cube(model, security_id, months=None):
+    """Recompute the cells of a security from its payments.
+
+    Only the cells of `months`, the first days of the months, are
+    recomputed, when they are given.
+    """
+    cells = PaymentCube.objects.filter(model=model._meta.label, security_id=security_id)
+    payments = model._default_manager.filter(position__security=security_id)
+
+    if months is not None:
+        if not months:
+            return
+
+        cells = cells.filter(recorded_on__in=months)
+        payments = payments.filter(
+            reduce(
+                or_,
+                (
+                    Q(recorded_on__gte=month, recorded_on__lt=get_next_month(month))
+                    for month in sorted(months)
+                ),
+            )
+        )
+
+    with transaction.atomic():
+        cells.delete()
+        PaymentCube.objects.bulk_create(get_cells(model, payments))
+
+
+def rebuild_payment_cube(model):
+    """Recompute all cells of `model` and return their count."""
+    PaymentCube.objects.filter(model=model._meta.label).delete()
+    cells = PaymentCube.objects.bulk_create(
+        get_cells(model, model._default_manager.all()), batch_size=1000
+    )
+
+    return len(cells)
+
+
+def get_cell_key(cell):
+    return (
+        cell.user_id,
+        cell.security_id,
+        cell.sector,
+        cell.broker_id,
+        cell.withheld_tax_rate,
+        cell.tag_id,
+        cell.recorded_on,
+    )
+
+
+def get_cell_totals(cell):
+    # The sums are rounded as they are stored, so computed and stored cells
+    # are compared equally.
+    return tuple(
+        None if value is None else round(value, places)
+        for value, places in (
+            (cell.amount, 2),
+            (cell.withheld_tax, 6),
+            (cell.gross_amount, 6),
+            (cell.untaxed_amount, 2),
+            (cell.count, 0),
+        )
+    )
+
+
+def check_payment_cube(model):
+    """Return the keys of the cells of `model`, which differ from the payments."""
+    expected = {
+        get_cell_key(cell): get_cell_totals(cell)
+        for cell in get_cells(model, model._default_manager.all())
+    }
+    stored = defaultdict(list)
+
+    for cell in PaymentCube.objects.filter(model=model._meta.label).iterator():
+        stored[get_cell_key(cell)].append(get_cell_totals(cell))
+
+    return sorted(
+        (
+            key
+            for key in expected.keys() | stored.keys()
+            if stored.get(key) != ([expected[key]] if key in expected else None)
+        ),
+        key=str,
+    )
+
+
+def aggregate_payment_cube(cells, payments):
+    """Return the totals of the aggregated report of the payments from their cells.
+
+    The positions aren't a dimension of the cube, so they are counted in the
+    payments.
+    """
+    data = cells.aggregate(
+        total_received_amount=Sum("amount"),
+        total_withheld_tax=Sum("withheld_tax"),
+        gross_amount=Sum("gross_amount"),
+        gross_untaxed_amount=Sum("untaxed_amount"),
+        total_tax_rate=Sum(F("withheld_tax_rate") * F("count")),
+        tax_rate_count=Sum(Case(When(withheld_tax_rate__isnull=False, then="count"))),
+        payment_count=Coalesce(Sum("count"), 0),
+    )
+    position_count = payments.aggregate(count=Count("position", distinct=True))["count"]
+    total_tax_rate = data.pop("total_tax_rate")
+    tax_rate_count = data.pop("tax_rate_count")
+    total_received_amount = data["total_received_amount"]
+    payment_count = data["payment_count"]
+
+    return {
+        **data,
+        "average_tax_rate": (
+            total_tax_rate / tax_rate_count if tax_rate_count else None
+        ),
+        "average_amount": (
+            total_received_amount / payment_count if payment_count else None
+        ),
+        "position_count": position_count,
+        "payments_per_position": (
+            payment_count / position_count if position_count else None
+        ),
+        "received_amount_per_position": (
+            total_received_amount / position_count
+            if total_received_amount is not None and position_count
+            else None
+        ),
+    }
+
+
+def get_payment_cube_filters(params):
+    """Return the cube lookups of the changelist parameters of the payments.
+
+    `None` is returned, when a parameter has no cube counterpart, such as a
+    search, a day or the payments without tags, since the cells can't tell
+    the payments apart.
+    """
+    filters = {}
+
+    for param, value in params.items():
+        if param == SEARCH_VAR:
+            if value:
+                return None
+            continue
+
+        if param in (*IGNORED_PARAMS, PAGE_VAR, ERROR_FLAG, EXACT_COUNT_VAR):
+            continue
+
+        if param in CUBE_MONTH_BOUNDS:
+            try:
+                date = datetime.date.fromisoformat(value)
+            except ValueError:
+                return None
+
+            if date.day != 1:
+                return None
+
+            filters[param] = date
+            continue
+
+        for prefix, cube_prefix in CUBE_FILTER_PREFIXES:
+            if param.startswith(prefix):
+                if cube_prefix is None:
+                    return None
+
+                lookup = cube_prefix + param[len(prefix) :]
+                filters[lookup] = prepare_lookup_value(lookup, value)
+                break
+        else:
+            return None
+
+    return filters
+
+
+def get_payment_cube_queryset(model, params, by_tag=False):
+    """Return the cells of the payments of `model` the changelist parameters
+    select, or `None` when the cube can't answer them.
+
+    The cells of the tags are returned, when the parameters filter by a tag
+    or with `by_tag`, and the cells of all payments otherwise.
+    """
+    filters = get_payment_cube_filters(params)
+
+    if filters is None or model._meta.label not in PAYMENT_CUBES:
+        return None
+
+    filters["tag__isnull"] = not (
+        by_tag or any(lookup.startswith("tag__") for lookup in filters)
+    )
+
+    return PaymentCube.objects.filter(model=model._meta.label, **filters)
@@ -0,0 +1,154 @@
+import datetime
+
+import numpy
+import pandas
+from django.db.models import Max, Sum
+
+from investments.contrib.positions.models import Position
+from investments.utils.pivot import MONTH, build_pivot_chart_data
+
+from . import constants
+
+# The months between the payments of each dividend type.
+PAYMENT_INTERVALS = {
+    constants.MOHTLY: 1,
+    constants.QUARTERLY: 3,
+    constants.SEMIANNUAL: 6,
+    constants.ANNUAL: 12,
+}
+INFERRED_INTERVALS = numpy.array(sorted(PAYMENT_INTERVALS.values()))
+
+# The schedule of a security is considered stopped, when this many payments
+# in a row are missing.
+MISSED_PAYMENTS_LIMIT = 2
+
+
+def get_month_index(year, month):
+    return year * 12 + month - 1
+
+
+def get_payment_schedules(queryset):
+    """Return the schedule and the last payment of each security of the payments.
+
+    The interval comes from the type of the last payment, or from the median
+    number of months between the payments, when it has no type.
+    """
+    rows = (
+        queryset.exclude(type=constants.SPECIAL)
+        .order_by()
+        .values("position__security", "position__security__name", "recorded_on")
+        .annotate(
+            total_amount=Sum("amount"),
+            total_units=Sum("position__units"),
+            last_type=Max("type"),
+        )
+        .values_list(
+            "position__security",
+            "position__security__name",
+            "recorded_on",
+            "total_amount",
+            "total_units",
+            "last_type",
+        )
+    )
+    payments = pandas.DataFrame.from_records(
+        list(rows),
+        columns=["security", "name", "recorded_on", "amount", "units", "type"],
+    )
+
+    if payments.empty:
+        return payments
+
+    recorded_on = pandas.to_datetime(payments["recorded_on"])
+    payments["month"] = get_month_index(recorded_on.dt.year, recorded_on.dt.month)
+    payments["amount_per_unit"] = payments["amount"].astype(float) / payments[
+        "units"
+    ].astype(float)
+    payments = payments.sort_values(["security", "recorded_on"])
+    payments["interval"] = payments.groupby("security")["month"].diff()
+
+    schedules = payments.groupby("security").agg(
+        name=("name", "last"),
+        last_month=("month", "last"),
+        amount_per_unit=("amount_per_unit", "last"),
+        type=("type", "last"),
+        median_interval=("interval", "median"),
+    )
+
+    # The median is rounded to the nearest interval of a dividend type.
+    # Securities with a single payment and no type are assumed to pay yearly.
+    median_intervals = schedules["median_interval"].fillna(12).to_numpy()
+    inferred_intervals = INFERRED_INTERVALS[
+        numpy.abs(median_intervals[:, None] - INFERRED_INTERVALS).argmin(axis=1)
+    ]
+    schedules["interval"] = (
+        schedules["type"]
+        .map(PAYMENT_INTERVALS)
+        .fillna(pandas.Series(inferred_intervals, index=schedules.index))
+    ).astype(int)
+
+    return schedules
+
+
+def get_held_units(security_ids):
+    units = (
+        Position.objects.filter(security__in=security_ids, closed_at__isnull=True)
+        .order_by()
+        .values("security")
+        .annotate(total_units=Sum("units"))
+        .values_list("security", "total_units")
+    )
+
+    return pandas.Series(
+        {security: float(total_units) for security, total_units in units},
+        index=security_ids,
+        dtype=float,
+    ).fillna(0)
+
+
+def get_dividend_forecast(queryset, months, today=None):
+    """Return the stacked chart data of the expected dividends per month.
+
+    Each security is expected to keep paying its last amount per unit on its
+    schedule for the units, which are currently held. The payments of all
+    securities are projected at once as a securities by payments matrix.
+    """
+    schedules = get_payment_schedules(queryset)
+
+    if schedules.empty:
+        return build_pivot_chart_data([], MONTH)
+
+    today = today or datetime.date.today()
+    current_month = get_month_index(today.year, today.month)
+
+    intervals = schedules["interval"].to_numpy()
+    last_months = schedules["last_month"].to_numpy()
+    amounts = (
+        schedules["amount_per_unit"].to_numpy()
+        * get_held_units(schedules.index).to_numpy()
+    )
+
+    # A monthly security, which has missed its last payments, has the most
+    # payments until the end of the forecast.
+    payment_numbers = numpy.arange(1, months + MISSED_PAYMENTS_LIMIT + 1)
+    payment_months = last_months[:, None] + intervals[:, None] * payment_numbers
+    is_expected = (
+        (payment_months > current_month)
+        & (payment_months <= current_month + months)
+        & (last_months + intervals * MISSED_PAYMENTS_LIMIT >= current_month)[:, None]
+        & (amounts > 0)[:, None]
+    )
+    security_indexes, payment_indexes = numpy.nonzero(is_expected)
+    expected_months = payment_months[security_indexes, payment_indexes]
+    names = schedules["name"].to_numpy()
+
+    return build_pivot_chart_data(
+        zip(
+            names[security_indexes],
+            expected_months // 12,
+            expected_months % 12 + 1,
+            amounts[security_indexes],
+        ),
+        MONTH,
+        limit=constants.CHART_SECURITIES_LIMIT,
+    )
@@ -0,0 +1,185 @@
+from decimal import Decimal
+
+import numpy
+from django.db import connections
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from investments.utils.exchange_rates import get_exchange_rate_subquery
+from investments.utils.pivot import build_pivot_chart_data, get_period_expressions
+
+from . import constants
+
+INCOME_ALIAS = "income"
+
+
+def to_decimal(value):
+    # SQLite returns the sums of the decimal columns as floats.
+    return Decimal(str(value)) if isinstance(value, float) else value
+
+
+def get_income_rows(querysets, columns, select, group_by=()):
+    """Return the rows of `select` over the UNION ALL of the payment querysets.
+
+    The querysets are filtered on their own, so the filters of each model
+    apply in its branch, and then read as `columns` in one query.
+    """
+    first, *rest = [
+        queryset.order_by().prefetch_related(None).values(**columns)
+        for queryset in querysets
+    ]
+    union_sql, params = first.union(*rest, all=True).query.sql_with_params()
+    connection = connections[first.db]
+    quote_name = connection.ops.quote_name
+
+    sql = f"SELECT {select} FROM ({union_sql}) {quote_name(INCOME_ALIAS)}"
+
+    if group_by:
+        sql += " GROUP BY " + ", ".join(quote_name(column) for column in group_by)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def get_income_chart_data(querysets, period, limit=None):
+    """Return the stacked chart data of the income per security and period."""
+    expressions = get_period_expressions(period, "recorded_on")
+    columns = ["pivot_group", *expressions]
+    quote_name = connections[querysets[0].db].ops.quote_name
+
+    rows = get_income_rows(
+        querysets,
+        columns={
+            "pivot_group": F("position__security__name"),
+            **expressions,
+            "pivot_value": F("amount"),
+        },
+        select=", ".join(
+            [
+                *(quote_name(column) for column in columns),
+                f"SUM({quote_name('pivot_value')})",
+            ]
+        ),
+        group_by=columns,
+    )
+
+    return build_pivot_chart_data(rows, period, limit)
+
+
+def get_income_heatmap_data(querysets, to_local_currency=False):
+    """Return the income per year and month as a years by months matrix.
+
+    The sums are read with one query grouped by year and month. In the local
+    currency each payment is converted with the rate of its date first. The
+    months without income are `None`.
+    """
+    quote_name = connections[querysets[0].db].ops.quote_name
+    value = F("amount")
+
+    if to_local_currency:
+        value = ExpressionWrapper(
+            value
+            * get_exchange_rate_subquery(
+                constants.PAYMENT_CURRENCY, OuterRef("recorded_on")
+            ),
+            output_field=DecimalField(),
+        )
+
+    rows = get_income_rows(
+        querysets,
+        columns={
+            "heatmap_year": ExtractYear("recorded_on"),
+            "heatmap_month": ExtractMonth("recorded_on"),
+            "heatmap_value": value,
+        },
+        select=", ".join(
+            (
+                quote_name("heatmap_year"),
+                quote_name("heatmap_month"),
+                f"SUM({quote_name('heatmap_value')})",
+            )
+        ),
+        group_by=("heatmap_year", "heatmap_month"),
+    )
+
+    if not rows:
+        return {"years": [], "values": [], "max": None}
+
+    years, months, values = (numpy.array(column) for column in zip(*rows))
+    years = years.astype(numpy.int64)
+    first_year = int(years.min())
+    matrix = numpy.full((int(years.max()) - first_year + 1, 12), numpy.nan)
+    matrix[years - first_year, months.astype(numpy.int64) - 1] = values.astype(
+        numpy.float64
+    )
+    matrix = matrix.round(2)
+
+    return {
+        "years": list(range(first_year, int(years.max()) + 1)),
+        "values": [
+            [None if numpy.isnan(value) else value for value in row]
+            for row in matrix.tolist()
+        ],
+        "max": float(numpy.nanmax(matrix)),
+    }
+
+
+def aggregate_income(querysets):
+    """Return the totals of the aggregated report of the payment querysets."""
+    quote_name = connections[querysets[0].db].ops.quote_name
+    amount = quote_name("income_amount")
+    withheld_tax = quote_name("income_withheld_tax")
+
+    rows = get_income_rows(
+        querysets,
+        columns={
+            "income_amount": F("amount"),
+            "income_withheld_tax": F("withheld_tax"),
+            "income_withheld_tax_rate": F("withheld_tax_rate"),
+            "income_position": F("position"),
+        },
+        select=", ".join(
+            (
+                f"SUM({amount})",
+                f"SUM({withheld_tax})",
+                f"COALESCE(SUM(CASE WHEN {withheld_tax} = 0 THEN {amount} END), 0)",
+                f"AVG({quote_name('income_withheld_tax_rate')})",
+                f"AVG({amount})",
+                "COUNT(*)",
+                f"COUNT(DISTINCT {quote_name('income_position')})",
+            )
+        ),
+    )
+    (
+        total_received_amount,
+        total_withheld_tax,
+        gross_untaxed_amount,
+        average_tax_rate,
+        average_amount,
+        payment_count,
+        position_count,
+    ) = (to_decimal(value) for value in rows[0])
+
+    return {
+        "total_received_amount": total_received_amount,
+        "total_withheld_tax": total_withheld_tax,
+        "gross_amount": (
+            total_received_amount + total_withheld_tax
+            if total_received_amount is not None and total_withheld_tax is not None
+            else None
+        ),
+        "gross_untaxed_amount": gross_untaxed_amount,
+        "average_tax_rate": average_tax_rate,
+        "average_amount": average_amount,
+        "payment_count": payment_count,
+        "position_count": position_count,
+        "payments_per_position": (
+            payment_count / position_count if position_count else None
+        ),
+        "received_amount_per_position": (
+            total_received_amount / position_count
+            if total_received_amount is not None and position_count
+            else None
+        ),
+    }
@@ -0,0 +1,35 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.contrib.payments.cube import PAYMENT_CUBES, check_payment_cube
+
+
+class Command(BaseCommand):
+    help = "Compares the payment cube with the payments it's computed from"
+
+    def handle(self, *args, **options):
+        is_consistent = True
+
+        for label in sorted(PAYMENT_CUBES):
+            keys = check_payment_cube(apps.get_model(label))
+
+            if not keys:
+                self.write_success(f"{label}: the cube matches the payments")
+                continue
+
+            is_consistent = False
+            self.write_error(f"{label}: {len(keys)} cells differ from the payments")
+
+            for key in keys:
+                self.write_error(f"  {key}")
+
+        if not is_consistent:
+            raise CommandError(
+                "The payment cube is out of date. Run rebuild_payment_cube."
+            )
+
+    def write_success(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def write_error(self, message):
+        self.stdout.write(self.style.ERROR(message))
@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from investments.contrib.payments.cube import PAYMENT_CUBES, rebuild_payment_cube
+
+
+class Command(BaseCommand):
+    help = "Recomputes the payment cube from the payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            nargs="+",
+            default=[],
+            help="Only rebuild these models, e.g. payments.DividendPayment.",
+        )
+
+    def handle(self, *args, **options):
+        for label in sorted(PAYMENT_CUBES):
+            if options["model"] and label not in options["model"]:
+                continue
+
+            with transaction.atomic():
+                count = rebuild_payment_cube(apps.get_model(label))
+
+            self.write_success(f"{label}: stored {count} cells")
+
+    def write_success(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
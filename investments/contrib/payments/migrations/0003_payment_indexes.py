@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_payment_withheld_tax_payment_withheld_tax_rate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["-recorded_on"], name="payments_pa_recorde_bbda86_idx"
+            ),
+        ),
+    ]
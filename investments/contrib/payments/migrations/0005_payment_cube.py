@@ -0,0 +1,128 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import investments.utils.uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("brokers", "0002_uuid_default"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("securities", "0004_security_kind"),
+        ("payments", "0004_uuid_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentCube",
+            fields=[
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=investments.utils.uuid.generate_uuid,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The model label, e.g. app.Model.",
+                        max_length=254,
+                        verbose_name="Model",
+                    ),
+                ),
+                ("sector", models.IntegerField(null=True, verbose_name="Sector")),
+                (
+                    "withheld_tax_rate",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        verbose_name="Withheld tax rate",
+                    ),
+                ),
+                (
+                    "recorded_on",
+                    models.DateField(
+                        help_text="The first day of the month of the payments.",
+                        verbose_name="Recorded on",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=18, verbose_name="Amount"
+                    ),
+                ),
+                (
+                    "withheld_tax",
+                    models.DecimalField(
+                        decimal_places=6,
+                        max_digits=18,
+                        null=True,
+                        verbose_name="Withheld tax",
+                    ),
+                ),
+                (
+                    "gross_amount",
+                    models.DecimalField(
+                        decimal_places=6, max_digits=18, verbose_name="Gross amount"
+                    ),
+                ),
+                (
+                    "untaxed_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="The amount of the payments without withheld tax.",
+                        max_digits=18,
+                        null=True,
+                        verbose_name="Untaxed amount",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="Count")),
+                (
+                    "broker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payment_cube",
+                        to="brokers.broker",
+                    ),
+                ),
+                (
+                    "security",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payment_cube",
+                        to="securities.security",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payment_cube",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Payment cube cell",
+                "verbose_name_plural": "Payment cube cells",
+                "indexes": [
+                    models.Index(
+                        fields=["model", "user", "recorded_on"],
+                        name="payments_pa_model_2ca943_idx",
+                    ),
+                    models.Index(
+                        fields=["model", "security", "recorded_on"],
+                        name="payments_pa_model_998354_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+
+PAYMENT_MODELS = ("DividendPayment", "InterestPayment")
+
+
+def backfill_payment_cube(apps, schema_editor):
+    PaymentCube = apps.get_model("payments", "PaymentCube")
+
+    for model_name in PAYMENT_MODELS:
+        model = apps.get_model("payments", model_name)
+        rows = (
+            model.objects.order_by()
+            .values(
+                "withheld_tax_rate",
+                user_id=F("position__security__user"),
+                security_id=F("position__security"),
+                sector=F("position__security__stock__sector"),
+                broker_id=F("position__broker"),
+                month=TruncMonth("recorded_on"),
+            )
+            .annotate(
+                total_amount=Sum("amount"),
+                total_withheld_tax=Sum("withheld_tax"),
+                total_gross_amount=Sum(
+                    F("amount") + Coalesce("withheld_tax", Value(Decimal(0))),
+                    output_field=DecimalField(),
+                ),
+                total_untaxed_amount=Sum(Case(When(withheld_tax=0, then="amount"))),
+                payment_count=Count("pk"),
+            )
+        )
+
+        PaymentCube.objects.bulk_create(
+            (
+                PaymentCube(
+                    model=f"payments.{model_name}",
+                    user_id=row["user_id"],
+                    security_id=row["security_id"],
+                    sector=row["sector"],
+                    broker_id=row["broker_id"],
+                    withheld_tax_rate=row["withheld_tax_rate"],
+                    recorded_on=row["month"],
+                    amount=row["total_amount"],
+                    withheld_tax=row["total_withheld_tax"],
+                    gross_amount=row["total_gross_amount"],
+                    untaxed_amount=row["total_untaxed_amount"],
+                    count=row["payment_count"],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_payment_cube"),
+        ("positions", "0005_uuid_default"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_payment_cube, migrations.RunPython.noop),
+    ]
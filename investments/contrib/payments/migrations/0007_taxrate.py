@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+import investments.utils.uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0006_backfill_payment_cube"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaxRate",
+            fields=[
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=investments.utils.uuid.generate_uuid,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "country",
+                    models.CharField(
+                        blank=True,
+                        help_text="The ISO 3166 code of the country. Leave blank for the rates of all countries.",
+                        max_length=2,
+                        verbose_name="Country",
+                    ),
+                ),
+                (
+                    "year",
+                    models.PositiveSmallIntegerField(
+                        help_text="The first year the rates apply to.",
+                        verbose_name="Year",
+                    ),
+                ),
+                (
+                    "local_rate",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="The percentage of the gross amount, which is due locally.",
+                        max_digits=5,
+                        null=True,
+                        verbose_name="Local rate",
+                    ),
+                ),
+                (
+                    "treaty_rate",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="The percentage of the gross amount, up to which the withheld tax is credited.",
+                        max_digits=5,
+                        null=True,
+                        verbose_name="Treaty rate",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tax rate",
+                "verbose_name_plural": "Tax rates",
+                "unique_together": {("country", "year")},
+            },
+        ),
+    ]
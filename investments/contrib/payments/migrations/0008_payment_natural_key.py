@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_taxrate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="natural_key",
+            field=models.CharField(
+                editable=False,
+                help_text="The model, the position, the amount and the date.",
+                max_length=254,
+                null=True,
+                unique=True,
+                verbose_name="Natural key",
+            ),
+        ),
+    ]
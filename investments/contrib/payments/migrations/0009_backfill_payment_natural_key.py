@@ -0,0 +1,42 @@
+from django.db import migrations
+
+PAYMENT_MODELS = ("DividendPayment", "InterestPayment")
+
+
+def backfill_payment_natural_key(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    natural_keys = set()
+    payments = []
+
+    for model_name in PAYMENT_MODELS:
+        model = apps.get_model("payments", model_name)
+        rows = model.objects.order_by("created_at").values_list(
+            "pk", "position_id", "amount", "recorded_on"
+        )
+
+        for pk, position_id, amount, recorded_on in rows.iterator():
+            natural_key = (
+                f"payments.{model_name}:{position_id}:{amount:.2f}:"
+                f"{recorded_on.isoformat()}"
+            )
+
+            # The duplicates, which were imported before the key was unique,
+            # are left without a key.
+            if natural_key in natural_keys:
+                continue
+
+            natural_keys.add(natural_key)
+            payments.append(Payment(uuid=pk, natural_key=natural_key))
+
+    Payment.objects.bulk_update(payments, ("natural_key",), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0008_payment_natural_key"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_payment_natural_key, migrations.RunPython.noop),
+    ]
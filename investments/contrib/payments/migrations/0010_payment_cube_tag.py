@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tags", "0003_uuid_default"),
+        ("payments", "0009_backfill_payment_natural_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymentcube",
+            name="tag",
+            field=models.ForeignKey(
+                help_text="The tag of the payments. The cells without a tag sum all payments.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payment_cube",
+                to="tags.tag",
+            ),
+        ),
+    ]
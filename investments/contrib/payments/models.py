@@ -1,20 +1,225 @@
-import uuid
-
 from django.contrib.auth import get_user_model
 from django.core import validators
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import connections, models, transaction
+from django.db.backends.utils import format_number
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 
+from investments.contrib.rollups.utils import date_count_updates, refresh_date_counts
+from investments.contrib.search.utils import (
+    search_index_updates,
+    update_search_documents_by_pk,
+)
 from investments.models import TimestampedModel
+from investments.utils.admin_filters import invalidate_cached_choices
+from investments.utils.uuid import generate_uuid
 
 from . import constants
 
 UserModel = get_user_model()
 
+UPSERT_BATCH_SIZE = 1000
+
+
+class PaymentQuerySet(models.QuerySet):
+    def bulk_upsert(self, objs, batch_size=UPSERT_BATCH_SIZE):
+        """Insert the payments, or update the withheld tax of the existing
+        payments with the same natural keys, and return both.
+
+        The payments can't be bulk created, since their fields are split
+        between two tables. The rows of the parent table are upserted on the
+        natural key instead, and only the child rows of the new ones are
+        inserted, with two statements per batch. No signals are sent, so
+        the rollups, the cube and the search index are updated afterwards.
+        """
+        from .cube import update_payment_cube
+
+        objs = list({obj.set_natural_key(): obj for obj in objs}.values())
+        created = []
+        updated = []
+        keys = set()
+
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start : start + batch_size]
+                batch_created, batch_updated = self._upsert_batch(batch)
+                created.extend(batch_created)
+                updated.extend(batch_updated)
+                keys.update(
+                    self.model._base_manager.using(self.db)
+                    .filter(pk__in=[obj.pk for obj in batch])
+                    .values_list(
+                        "position__security__user", "position__security", "recorded_on"
+                    )
+                )
+
+        refresh_date_counts(
+            self.model, {(user_id, date) for user_id, security_id, date in keys}
+        )
+        update_payment_cube(
+            self.model, {(security_id, date) for user_id, security_id, date in keys}
+        )
+        update_search_documents_by_pk(self.model, (obj.pk for obj in created))
+        invalidate_cached_choices(self.model)
+
+        return created, updated
+
+    bulk_upsert.alters_data = True
+
+    def update(self, **kwargs):
+        """Update the payments and recompute the natural keys and the date
+        counts, which are made of the updated fields, and expire the cached
+        filter choices.
+        """
+        if not Payment.NATURAL_KEY_FIELDS & set(kwargs):
+            with date_count_updates(self, kwargs), search_index_updates(self, kwargs):
+                rows = super().update(**kwargs)
+        else:
+            with transaction.atomic(using=self.db), date_count_updates(
+                self, kwargs
+            ), search_index_updates(self, kwargs):
+                pks = list(self.values_list("pk", flat=True))
+                rows = super().update(**kwargs)
+                self.model._default_manager.using(self.db).filter(
+                    pk__in=pks
+                ).refresh_natural_keys()
+
+        invalidate_cached_choices(self.model)
+
+        return rows
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = set(fields)
+
+        if Payment.NATURAL_KEY_FIELDS & fields:
+            for obj in objs:
+                obj.set_natural_key()
+
+            fields.add("natural_key")
+
+        queryset = self.filter(pk__in=[obj.pk for obj in objs])
+
+        with date_count_updates(queryset, fields), search_index_updates(
+            queryset, fields
+        ):
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+
+        invalidate_cached_choices(self.model)
+
+        return rows
+
+    def refresh_natural_keys(self):
+        """Recompute the natural keys of the payments from their stored fields."""
+        # The payments without a position and an amount are keyed by the
+        # models, which inherit them.
+        key_models = [
+            model
+            for model in (self.model, *self.model.__subclasses__())
+            if Payment.NATURAL_KEY_FIELDS
+            <= {field.name for field in model._meta.fields}
+        ]
+        pks = self.values_list("pk", flat=True)
+
+        for model in key_models:
+            objs = list(
+                model._base_manager.using(self.db)
+                .filter(pk__in=pks)
+                .only(*Payment.NATURAL_KEY_FIELDS)
+            )
+
+            for obj in objs:
+                obj.set_natural_key()
+
+            model._base_manager.using(self.db).bulk_update(objs, ["natural_key"])
+
+    refresh_natural_keys.alters_data = True
+
+    def _upsert_batch(self, objs):
+        parents = [
+            Payment(
+                uuid=obj.uuid,
+                natural_key=obj.natural_key,
+                recorded_on=obj.recorded_on,
+                withheld_tax=obj.withheld_tax,
+                withheld_tax_rate=obj.withheld_tax_rate,
+            )
+            for obj in objs
+        ]
+        Payment.objects.using(self.db).bulk_create(
+            parents,
+            update_conflicts=True,
+            unique_fields=("natural_key",),
+            update_fields=("withheld_tax", "withheld_tax_rate", "updated_at"),
+        )
+        # The conflicting rows keep their keys, so the keys, which were
+        # stored, tell the new payments apart.
+        pks = dict(
+            Payment.objects.using(self.db)
+            .filter(natural_key__in=[obj.natural_key for obj in objs])
+            .values_list("natural_key", "uuid")
+        )
+        created = []
+        updated = []
+
+        for obj, parent in zip(objs, parents):
+            if pks[obj.natural_key] == obj.uuid:
+                obj.created_at = parent.created_at
+                obj.updated_at = parent.updated_at
+                created.append(obj)
+            else:
+                obj.uuid = pks[obj.natural_key]
+                updated.append(obj)
+
+            setattr(obj, self.model._meta.pk.attname, obj.uuid)
+            obj._state.adding = False
+            obj._state.db = self.db
+
+        if created:
+            self._insert_child_rows(created)
+
+        return created, updated
+
+    def _insert_child_rows(self, objs):
+        # `bulk_create` refuses the models of a multi-table inheritance, so
+        # the child rows of the upserted parents are inserted with a cursor.
+        connection = connections[self.db]
+        fields = self.model._meta.local_concrete_fields
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(self.model._meta.db_table),
+            ", ".join(connection.ops.quote_name(field.column) for field in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                sql,
+                [
+                    [
+                        field.get_db_prep_save(getattr(obj, field.attname), connection)
+                        for field in fields
+                    ]
+                    for obj in objs
+                ],
+            )
+
 
 class Payment(TimestampedModel):
-    uuid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    # The fields of the payments, which their natural keys are made of.
+    NATURAL_KEY_FIELDS = {"position", "amount", "recorded_on"}
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
+    natural_key = models.CharField(
+        _("Natural key"),
+        max_length=254,
+        unique=True,
+        null=True,
+        editable=False,
+        help_text=_("The model, the position, the amount and the date."),
+    )
     recorded_on = models.DateField(_("Recorded on"))
     tags = models.ManyToManyField(
         "tags.Tag",
@@ -35,13 +240,65 @@ class Payment(TimestampedModel):
         ),
     )
 
+    objects = PaymentQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Payment")
         verbose_name_plural = _("Payments")
+        indexes = [models.Index(fields=["-recorded_on"])]
 
     def __str__(self):
         return gettext(f"Payment {self.uuid}")
 
+    def get_natural_key(self):
+        """Return the key, which tells the payments of a model apart, or `None`
+        when the payment has no position, amount or date yet.
+        """
+        position_id = getattr(self, "position_id", None)
+        amount = getattr(self, "amount", None)
+
+        if position_id is None or amount is None or self.recorded_on is None:
+            return None
+
+        # The amount is formatted as it is stored, with all its decimal places.
+        amount_field = self._meta.get_field("amount")
+        amount = format_number(
+            amount_field.to_python(amount),
+            amount_field.max_digits,
+            amount_field.decimal_places,
+        )
+        recorded_on = self._meta.get_field("recorded_on").to_python(self.recorded_on)
+
+        return f"{self._meta.label}:{position_id}:{amount}:{recorded_on.isoformat()}"
+
+    def set_natural_key(self):
+        self.natural_key = self.get_natural_key()
+        return self.natural_key
+
+    def clean(self):
+        super().clean()
+
+        natural_key = self.get_natural_key()
+
+        if (
+            natural_key is not None
+            and Payment.objects.filter(natural_key=natural_key)
+            .exclude(pk=self.pk)
+            .exists()
+        ):
+            raise ValidationError(
+                _("A payment of the position with this amount and date already exists.")
+            )
+
+    def save(self, *args, **kwargs):
+        self.set_natural_key()
+        update_fields = kwargs.get("update_fields")
+
+        if update_fields is not None and self.NATURAL_KEY_FIELDS & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "natural_key"}
+
+        super().save(*args, **kwargs)
+
 
 class DividendPayment(Payment):
     amount = models.DecimalField(
@@ -88,3 +345,114 @@ class InterestPayment(Payment):
         return gettext(
             f"Interest Payment, position {self.position.position_id}, {self.position.security}"
         )
+
+
+class PaymentCube(models.Model):
+    """The sums of the payments of a model per month and dimension.
+
+    The cells are recomputed from the payments by the signals connected in
+    `register_payment_cube`, so the charts and the reports don't join and
+    aggregate the payments each time.
+    """
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
+    model = models.CharField(
+        _("Model"), max_length=254, help_text=_("The model label, e.g. app.Model.")
+    )
+    user = models.ForeignKey(
+        UserModel, related_name="payment_cube", on_delete=models.CASCADE
+    )
+    security = models.ForeignKey(
+        "securities.Security", related_name="payment_cube", on_delete=models.CASCADE
+    )
+    sector = models.IntegerField(_("Sector"), null=True)
+    broker = models.ForeignKey(
+        "brokers.Broker", related_name="payment_cube", on_delete=models.CASCADE
+    )
+    withheld_tax_rate = models.DecimalField(
+        _("Withheld tax rate"), max_digits=5, decimal_places=2, null=True
+    )
+    tag = models.ForeignKey(
+        "tags.Tag",
+        related_name="payment_cube",
+        on_delete=models.CASCADE,
+        null=True,
+        help_text=_(
+            "The tag of the payments. The cells without a tag sum all payments."
+        ),
+    )
+    recorded_on = models.DateField(
+        _("Recorded on"), help_text=_("The first day of the month of the payments.")
+    )
+    amount = models.DecimalField(_("Amount"), max_digits=18, decimal_places=2)
+    withheld_tax = models.DecimalField(
+        _("Withheld tax"), max_digits=18, decimal_places=6, null=True
+    )
+    gross_amount = models.DecimalField(
+        _("Gross amount"), max_digits=18, decimal_places=6
+    )
+    untaxed_amount = models.DecimalField(
+        _("Untaxed amount"),
+        max_digits=18,
+        decimal_places=2,
+        null=True,
+        help_text=_("The amount of the payments without withheld tax."),
+    )
+    count = models.PositiveIntegerField(_("Count"), default=0)
+
+    class Meta:
+        verbose_name = _("Payment cube cell")
+        verbose_name_plural = _("Payment cube cells")
+        indexes = [
+            models.Index(fields=["model", "user", "recorded_on"]),
+            models.Index(fields=["model", "security", "recorded_on"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.security_id} {self.recorded_on}: {self.amount}"
+
+
+class TaxRate(TimestampedModel):
+    """The rates of the tax on the payments from a country from a year on.
+
+    The rates without a country apply to the countries without their own.
+    """
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
+    country = models.CharField(
+        _("Country"),
+        max_length=2,
+        blank=True,
+        help_text=_(
+            "The ISO 3166 code of the country. Leave blank for the rates of all countries."
+        ),
+    )
+    year = models.PositiveSmallIntegerField(
+        _("Year"), help_text=_("The first year the rates apply to.")
+    )
+    local_rate = models.DecimalField(
+        _("Local rate"),
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("The percentage of the gross amount, which is due locally."),
+    )
+    treaty_rate = models.DecimalField(
+        _("Treaty rate"),
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_(
+            "The percentage of the gross amount, up to which the withheld tax is credited."
+        ),
+    )
+
+    class Meta:
+        verbose_name = _("Tax rate")
+        verbose_name_plural = _("Tax rates")
+        unique_together = (("country", "year"),)
+
+    def __str__(self):
+        return f"{self.country or '*'} {self.year}"
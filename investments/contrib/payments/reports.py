@@ -0,0 +1,58 @@
+from investments.utils.exchange_rates import convert, get_exchange_rates
+from investments.utils.exports import round_amount
+
+from .constants import TAX_PERCENTAGE
+from .taxes import get_tax_reconciliation, reconcile_taxes
+
+
+def calculate_tax(gross_amount, withheld_tax, percentage=TAX_PERCENTAGE):
+    """Return the tax due of a payment at `percentage` after the withheld tax."""
+    *_, taxes_due = reconcile_taxes(
+        [gross_amount], [withheld_tax], [percentage], [None]
+    )
+
+    return taxes_due[0]
+
+
+def build_payment_report_rows(rows, exchange_rates=None):
+    """Turn grouped payment report rows into final, already converted rows.
+
+    The exchange rates for all rows are resolved with a single query, unless
+    they are provided, so the templates and the exports only format values.
+    """
+    rows = list(rows)
+
+    if exchange_rates is None and rows:
+        dates = [row["recorded_on"] for row in rows]
+        exchange_rates = get_exchange_rates("USD", min(dates), max(dates))
+
+    # The taxes of all rows are reconciled at once with the rates of their
+    # countries and years.
+    _, _, taxes_due = get_tax_reconciliation(
+        [row["gross_amount"] for row in rows],
+        [row["total_withheld_tax"] for row in rows],
+        [row.get("position__security__country") for row in rows],
+        [row["recorded_on"] for row in rows],
+    )
+    report_rows = []
+
+    for row, tax_due in zip(rows, taxes_due):
+        rate = exchange_rates[row["recorded_on"].isoformat()].rate
+
+        report_rows.append(
+            {
+                "recorded_on": row["recorded_on"],
+                "security": row["position__security__name"],
+                "received_amount": round_amount(row["total_received_amount"]),
+                "withheld_tax": round_amount(row["total_withheld_tax"]),
+                "gross_amount": round_amount(row["gross_amount"]),
+                "tax_due": round_amount(tax_due),
+                "exchange_rate": rate,
+                "received_amount_local": convert(row["total_received_amount"], rate),
+                "withheld_tax_local": convert(row["total_withheld_tax"], rate),
+                "gross_amount_local": convert(row["gross_amount"], rate),
+                "tax_due_local": convert(tax_due, rate),
+            }
+        )
+
+    return report_rows
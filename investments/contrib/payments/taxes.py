@@ -0,0 +1,207 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy
+import pandas
+from django.db.models import Case, DecimalField, F, OuterRef, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractYear
+
+from investments.utils.exchange_rates import get_exchange_rate_subquery
+
+from . import constants
+from .models import TaxRate
+
+# The country of the rates, which apply to the countries without their own.
+ANY_COUNTRY = ""
+
+RATE_FIELDS = ("local_rate", "treaty_rate")
+TAX_FIELDS = ("local_tax", "tax_credit", "tax_due")
+
+
+def get_tax_rates(countries, years):
+    """Return the local and the treaty rates of each pair of a country and a year.
+
+    The rates are read with one query and matched to the pairs at once. The
+    latest rates of a country up to the year apply, and each missing rate
+    is taken from the rates without a country.
+    """
+    payments = pandas.DataFrame(
+        {
+            "country": pandas.Series(countries, dtype=object).fillna(ANY_COUNTRY),
+            "year": numpy.asarray(years, dtype=numpy.int64),
+        }
+    )
+    payments["order"] = numpy.arange(len(payments))
+    payments = payments.sort_values("year")
+
+    rates = pandas.DataFrame.from_records(
+        list(
+            TaxRate.objects.filter(
+                country__in={*payments["country"], ANY_COUNTRY},
+                year__lte=payments["year"].max() if len(payments) else 0,
+            ).values_list("country", "year", *RATE_FIELDS)
+        ),
+        columns=["country", "year", *RATE_FIELDS],
+    ).astype({"country": object, "year": numpy.int64})
+    rates = rates.sort_values("year")
+
+    country_rates = pandas.merge_asof(payments, rates, on="year", by="country")
+    any_country_rates = pandas.merge_asof(
+        payments[["year"]],
+        rates[rates["country"] == ANY_COUNTRY].drop(columns="country"),
+        on="year",
+    )
+
+    for field in RATE_FIELDS:
+        country_rates[field] = country_rates[field].fillna(any_country_rates[field])
+
+    country_rates["local_rate"] = country_rates["local_rate"].fillna(
+        constants.TAX_PERCENTAGE
+    )
+
+    return country_rates.sort_values("order")[list(RATE_FIELDS)].reset_index(drop=True)
+
+
+def to_decimal(value):
+    """Return `value` as a decimal, or `None` when it is missing."""
+    if value is None or pandas.isna(value):
+        return None
+
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def reconcile_taxes(gross_amounts, withheld_taxes, local_rates, treaty_rates):
+    """Return the local taxes, the credits for the withheld taxes and the
+    taxes due of the payments, as lists of decimals.
+
+    The withheld tax is credited up to the treaty rate, when there is one,
+    and up to the local tax. The taxes of the payments without a gross
+    amount are `None`.
+    """
+    local_taxes = []
+    tax_credits = []
+    taxes_due = []
+
+    for gross_amount, withheld_tax, local_rate, treaty_rate in zip(
+        gross_amounts, withheld_taxes, local_rates, treaty_rates
+    ):
+        gross_amount = to_decimal(gross_amount)
+
+        if gross_amount is None:
+            local_tax = tax_credit = tax_due = None
+        else:
+            local_tax = gross_amount * to_decimal(local_rate) / 100
+            tax_credit = min(to_decimal(withheld_tax) or Decimal(0), local_tax)
+            treaty_rate = to_decimal(treaty_rate)
+
+            if treaty_rate is not None:
+                tax_credit = min(tax_credit, gross_amount * treaty_rate / 100)
+
+            tax_due = local_tax - tax_credit
+
+        local_taxes.append(local_tax)
+        tax_credits.append(tax_credit)
+        taxes_due.append(tax_due)
+
+    return local_taxes, tax_credits, taxes_due
+
+
+def get_tax_reconciliation(gross_amounts, withheld_taxes, countries, dates):
+    """Return the local taxes, the tax credits and the taxes due of payments
+    as lists of decimals.
+    """
+    rates = get_tax_rates(countries, [date.year for date in dates])
+
+    return reconcile_taxes(
+        gross_amounts, withheld_taxes, rates["local_rate"], rates["treaty_rate"]
+    )
+
+
+def get_reconciled_payments(queryset, currency="USD"):
+    """Return the reconciled taxes of the payments in `currency` and in the
+    local currency, which each payment is converted to with the rate of its
+    date.
+
+    The payments are summed in the query per year, which the tax rates
+    apply to, country of the security and withheld tax rate. The payments
+    of a group are withheld at the same rate, so the credits of their sums
+    are the sums of their credits.
+    """
+    withheld_tax = Coalesce("withheld_tax", Value(Decimal(0)))
+    gross_amount = F("amount") + withheld_tax
+    groups = list(
+        queryset.order_by()
+        .annotate(
+            exchange_rate=get_exchange_rate_subquery(currency, OuterRef("recorded_on"))
+        )
+        .values(
+            "withheld_tax_rate",
+            year=ExtractYear("recorded_on"),
+            country=F("position__security__country"),
+            # The payments without a rate are reconciled one by one.
+            payment=Case(When(withheld_tax_rate__isnull=True, then="pk")),
+        )
+        .annotate(
+            total_gross_amount=Sum(gross_amount, output_field=DecimalField()),
+            total_withheld_tax=Sum(withheld_tax, output_field=DecimalField()),
+            total_gross_amount_local=Sum(
+                gross_amount * F("exchange_rate"), output_field=DecimalField()
+            ),
+            total_withheld_tax_local=Sum(
+                withheld_tax * F("exchange_rate"), output_field=DecimalField()
+            ),
+        )
+    )
+    rates = get_tax_rates(
+        [group["country"] for group in groups], [group["year"] for group in groups]
+    )
+
+    for suffix in ("", "_local"):
+        taxes = reconcile_taxes(
+            [group[f"total_gross_amount{suffix}"] for group in groups],
+            [group[f"total_withheld_tax{suffix}"] for group in groups],
+            rates["local_rate"],
+            rates["treaty_rate"],
+        )
+
+        for group, *group_taxes in zip(groups, *taxes):
+            for field, tax in zip(TAX_FIELDS, group_taxes):
+                group[f"total_{field}{suffix}"] = tax
+
+    return groups
+
+
+def get_total(groups, field):
+    return round(sum(group[field] or 0 for group in groups), 2)
+
+
+def get_yearly_taxes(queryset, currency="USD"):
+    """Return the totals of the tax declaration per year in the local currency."""
+    years = defaultdict(list)
+
+    for group in get_reconciled_payments(queryset, currency):
+        years[group["year"]].append(group)
+
+    return [
+        {
+            "year": year,
+            **{
+                field: get_total(groups, f"total_{field}_local")
+                for field in ("gross_amount", "withheld_tax", *TAX_FIELDS)
+            },
+        }
+        for year, groups in sorted(years.items())
+    ]
+
+
+def get_total_tax_due(querysets, currency="USD"):
+    """Return the tax due of the payments of the querysets in `currency` and in
+    the local currency.
+    """
+    groups = [
+        group
+        for queryset in querysets
+        for group in get_reconciled_payments(queryset, currency)
+    ]
+
+    return get_total(groups, "total_tax_due"), get_total(groups, "total_tax_due_local")
@@ -1 +1,573 @@
-# Create your tests here.
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import numpy
+import openpyxl
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from investments.contrib.brokers.models import Broker
+from investments.contrib.currencies.models import Currency, ExchangeRate
+from investments.contrib.positions.models import Position
+from investments.contrib.securities.constants import ENERGY, UTILITIES
+from investments.contrib.securities.models import Stock
+from investments.contrib.tags.models import Tag
+from investments.contrib.users.models import User
+from investments.utils.admin_filters import CachedChoicesMixin
+from investments.utils.pivot import MONTH, build_pivot_chart_data
+from investments.utils.series import (
+    CHANGE,
+    CUMULATIVE,
+    MOVING_AVERAGE,
+    get_series_chart_data,
+)
+
+from . import constants, cube
+from .admin import DividendPaymentsAdmin, InterestPaymentsAdmin
+from .cube import check_payment_cube, get_payment_cube_queryset
+from .models import DividendPayment, InterestPayment, Payment, PaymentCube, TaxRate
+from .taxes import get_tax_rates, get_yearly_taxes, reconcile_taxes
+
+
+class PaymentTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", password="x")
+        cls.broker = Broker.objects.create(name="Broker", user=cls.user)
+        cls.stock = Stock.objects.create(
+            name="Stock", symbol="STK", sector=ENERGY, user=cls.user
+        )
+        cls.position = Position.objects.create(
+            position_id="1234",
+            units=Decimal(10),
+            open_price=Decimal(100),
+            security=cls.stock,
+            broker=cls.broker,
+            opened_at=timezone.make_aware(datetime.datetime(2020, 1, 1)),
+        )
+
+    def build_payment(self, amount, recorded_on, withheld_tax=Decimal(0)):
+        return DividendPayment(
+            position=self.position,
+            amount=amount,
+            recorded_on=recorded_on,
+            withheld_tax=withheld_tax,
+            withheld_tax_rate=Decimal(0),
+        )
+
+
+class BulkUpsertTests(PaymentTestCase):
+    def test_creates_new_payments(self):
+        created, updated = DividendPayment.objects.bulk_upsert(
+            [
+                self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1)),
+                self.build_payment(Decimal("1.50"), datetime.date(2020, 6, 1)),
+            ]
+        )
+
+        self.assertEqual((len(created), len(updated)), (2, 0))
+        self.assertEqual(DividendPayment.objects.count(), 2)
+        self.assertEqual(
+            set(DividendPayment.objects.values_list("natural_key", flat=True)),
+            {payment.natural_key for payment in created},
+        )
+
+    def test_updates_the_withheld_tax_of_existing_payments(self):
+        payment = self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1))
+        payment.save()
+
+        created, updated = DividendPayment.objects.bulk_upsert(
+            [
+                self.build_payment(
+                    Decimal("1.50"), datetime.date(2020, 3, 1), Decimal("0.15")
+                ),
+                self.build_payment(Decimal("2.00"), datetime.date(2020, 6, 1)),
+            ]
+        )
+
+        self.assertEqual((len(created), len(updated)), (1, 1))
+        self.assertEqual(updated[0].pk, payment.pk)
+        self.assertEqual(DividendPayment.objects.count(), 2)
+        payment.refresh_from_db()
+        self.assertEqual(payment.withheld_tax, Decimal("0.15"))
+
+    def test_stores_the_fields_of_both_tables(self):
+        payment = self.build_payment(
+            Decimal("1.50"), datetime.date(2020, 3, 1), Decimal("0.15")
+        )
+        payment.notes = "Special"
+
+        DividendPayment.objects.bulk_upsert([payment], batch_size=1)
+
+        self.assertEqual(
+            DividendPayment.objects.values_list(
+                "pk",
+                "natural_key",
+                "position",
+                "amount",
+                "type",
+                "notes",
+                "recorded_on",
+                "withheld_tax",
+            ).get(),
+            (
+                payment.pk,
+                payment.get_natural_key(),
+                self.position.pk,
+                Decimal("1.50"),
+                payment.type,
+                "Special",
+                datetime.date(2020, 3, 1),
+                Decimal("0.15"),
+            ),
+        )
+        self.assertFalse(InterestPayment.objects.exists())
+
+    def test_deduplicates_the_payments_of_a_batch(self):
+        created, updated = DividendPayment.objects.bulk_upsert(
+            [
+                self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1)),
+                self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1)),
+            ]
+        )
+
+        self.assertEqual((len(created), len(updated)), (1, 0))
+        self.assertEqual(DividendPayment.objects.count(), 1)
+
+
+class CachedChoicesTests(PaymentTestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.payment = self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1))
+        self.payment.save()
+
+    def get_choices(self):
+        queryset = (
+            DividendPayment.objects.distinct()
+            .order_by("withheld_tax_rate")
+            .values_list("withheld_tax_rate", flat=True)
+        )
+
+        return CachedChoicesMixin().get_cached_choices(queryset, lambda: queryset)
+
+    def test_reads_the_cached_choices_without_queries(self):
+        self.assertEqual(self.get_choices(), [Decimal(0)])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_choices(), [Decimal(0)])
+
+    def test_saves_and_bulk_updates_expire_the_choices(self):
+        self.get_choices()
+
+        self.payment.withheld_tax_rate = Decimal(15)
+        self.payment.save()
+
+        self.assertEqual(self.get_choices(), [Decimal(15)])
+
+        Payment.objects.update(withheld_tax_rate=Decimal(19))
+
+        self.assertEqual(self.get_choices(), [Decimal(19)])
+
+        DividendPayment.objects.bulk_upsert(
+            [
+                self.build_payment(
+                    Decimal("1.50"), datetime.date(2020, 3, 1), Decimal("0.15")
+                )
+            ]
+        )
+
+        self.assertEqual(self.get_choices(), [Decimal(0)])
+
+
+class NaturalKeyTests(PaymentTestCase):
+    def test_formats_the_amount_as_it_is_stored(self):
+        payment = self.build_payment(Decimal("1.5"), datetime.date(2020, 3, 1))
+        payment.save()
+        payment.refresh_from_db()
+
+        self.assertEqual(payment.natural_key, payment.get_natural_key())
+        self.assertIn(":1.50:", payment.natural_key)
+
+    def test_update_recomputes_the_natural_keys(self):
+        payment = self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1))
+        payment.save()
+
+        DividendPayment.objects.filter(pk=payment.pk).update(amount=Decimal("2.25"))
+        payment.refresh_from_db()
+
+        self.assertEqual(payment.natural_key, payment.get_natural_key())
+        self.assertIn(":2.25:", payment.natural_key)
+
+    def test_update_of_the_parent_recomputes_the_natural_keys(self):
+        payment = self.build_payment(Decimal("1.50"), datetime.date(2020, 3, 1))
+        payment.save()
+
+        Payment.objects.filter(pk=payment.pk).update(
+            recorded_on=datetime.date(2020, 4, 1)
+        )
+        payment.refresh_from_db()
+
+        self.assertTrue(payment.natural_key.endswith(":2020-04-01"))
+
+
+class SeriesTests(PaymentTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        for month in (1, 4, 7):
+            DividendPayment.objects.create(
+                position=cls.position,
+                amount=Decimal("4.55"),
+                recorded_on=datetime.date(2019, month, 15),
+            )
+
+    def get_data(self, metric, size=1):
+        return get_series_chart_data(
+            DividendPayment.objects.all(),
+            "recorded_on",
+            "amount",
+            MONTH,
+            metric,
+            "Amount",
+            size,
+        )["datasets"][0]["data"]
+
+    def test_cumulative_carries_over_the_months_without_payments(self):
+        self.assertEqual(
+            self.get_data(CUMULATIVE), [4.55, 4.55, 4.55, 9.1, 9.1, 9.1, 13.65]
+        )
+
+    def test_moving_average_counts_the_months_without_payments_as_zero(self):
+        self.assertEqual(self.get_data(MOVING_AVERAGE, 3), [1.52] * 7)
+
+    def test_change_drops_to_zero_in_the_months_without_payments(self):
+        self.assertEqual(
+            self.get_data(CHANGE), [4.55, -4.55, 0.0, 4.55, -4.55, 0.0, 4.55]
+        )
+
+    def test_rejects_unsupported_metrics(self):
+        with self.assertRaises(ValueError):
+            self.get_data("median")
+
+
+class PivotChartTests(TestCase):
+    rows = [
+        ("A", 2020, 1, Decimal("10")),
+        ("B", 2020, 1, Decimal("5")),
+        ("C", 2020, 3, Decimal("1")),
+        ("B", 2020, 3, Decimal("2")),
+        ("D", 2020, 2, Decimal("20")),
+    ]
+
+    def get_datasets(self, limit=None):
+        data = build_pivot_chart_data(self.rows, MONTH, limit)
+
+        self.assertEqual(data["labels"], ["1.2020", "2.2020", "3.2020"])
+
+        return [(dataset["label"], dataset["data"]) for dataset in data["datasets"]]
+
+    def test_orders_the_groups_by_their_first_period(self):
+        self.assertEqual(
+            self.get_datasets(),
+            [
+                ("A", [10.0, None, None]),
+                ("B", [5.0, None, 2.0]),
+                ("D", [None, 20.0, None]),
+                ("C", [None, None, 1.0]),
+            ],
+        )
+
+    def test_sums_the_groups_past_the_limit_as_other(self):
+        self.assertEqual(
+            self.get_datasets(limit=2),
+            [
+                ("A", [10.0, None, None]),
+                ("D", [None, 20.0, None]),
+                ("Other", [5.0, None, 3.0]),
+            ],
+        )
+
+    def test_no_rows(self):
+        self.assertEqual(
+            build_pivot_chart_data([], MONTH), {"labels": [], "datasets": []}
+        )
+
+
+class PaymentCubeTests(PaymentTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.tag = Tag.objects.create(name="Tag")
+        cls.payments = [
+            DividendPayment.objects.create(
+                position=cls.position,
+                amount=amount,
+                recorded_on=datetime.date(2020, 3, day),
+            )
+            for day, amount in ((1, Decimal("1.50")), (2, Decimal("2.25")))
+        ]
+
+    def get_total(self, params, by_tag=False):
+        return get_payment_cube_queryset(DividendPayment, params, by_tag).aggregate(
+            total=Sum("amount")
+        )["total"]
+
+    def test_tagging_updates_the_cells_of_the_tags(self):
+        self.payments[0].tags.add(self.tag)
+
+        self.assertEqual(check_payment_cube(DividendPayment), [])
+        self.assertEqual(self.get_total({}), Decimal("3.75"))
+        self.assertEqual(self.get_total({}, by_tag=True), Decimal("1.50"))
+        self.assertEqual(
+            self.get_total({"tags__uuid__exact": str(self.tag.pk)}), Decimal("1.50")
+        )
+
+        self.tag.dividend_payments.clear()
+
+        self.assertEqual(check_payment_cube(DividendPayment), [])
+        self.assertFalse(PaymentCube.objects.filter(tag__isnull=False).exists())
+
+    def test_saving_a_payment_refreshes_only_its_month(self):
+        DividendPayment.objects.create(
+            position=self.position,
+            amount=Decimal(1),
+            recorded_on=datetime.date(2020, 4, 1),
+        )
+
+        with mock.patch(
+            "investments.contrib.payments.cube.refresh_payment_cube",
+            wraps=cube.refresh_payment_cube,
+        ) as refresh_payment_cube:
+            self.payments[0].amount = Decimal(3)
+            self.payments[0].save()
+
+        refresh_payment_cube.assert_called_once_with(
+            DividendPayment, self.stock.pk, {datetime.date(2020, 3, 1)}
+        )
+        self.assertEqual(check_payment_cube(DividendPayment), [])
+
+    def test_bulk_updates_of_the_positions_refresh_the_cells(self):
+        other_broker = Broker.objects.create(name="Other", user=self.user)
+        other_stock = Stock.objects.create(
+            name="Other", symbol="OTH", sector=UTILITIES, user=self.user
+        )
+
+        Position.objects.filter(pk=self.position.pk).update(broker=other_broker)
+
+        self.assertEqual(check_payment_cube(DividendPayment), [])
+
+        self.position.security = other_stock
+        Position.objects.bulk_update([self.position], ["security"])
+
+        self.assertEqual(check_payment_cube(DividendPayment), [])
+        self.assertEqual(
+            set(PaymentCube.objects.values_list("security", "broker")),
+            {(other_stock.pk, other_broker.pk)},
+        )
+
+    def test_bulk_updates_of_the_securities_refresh_the_cells(self):
+        Stock.objects.filter(pk=self.stock.pk).update(sector=UTILITIES)
+
+        self.assertEqual(check_payment_cube(DividendPayment), [])
+        self.assertEqual(
+            set(PaymentCube.objects.values_list("sector", flat=True)), {UTILITIES}
+        )
+
+    def test_payments_without_tags_arent_in_the_cube(self):
+        self.assertIsNone(
+            get_payment_cube_queryset(DividendPayment, {"tags__isnull": "True"})
+        )
+
+    def test_tags_chart_of_all_payments(self):
+        self.payments[1].tags.add(self.tag)
+        request = RequestFactory().post("/", {"select_across": "1"})
+        request.user = self.user
+        model_admin = DividendPaymentsAdmin(DividendPayment, admin.site)
+
+        response = model_admin.show_tags_by_received_amount(
+            request, DividendPayment.objects.all()
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Tag", response.content)
+
+
+class PaymentsAdminTests(TestCase):
+    def test_interest_payments_have_no_dividend_actions(self):
+        DividendPaymentsAdmin(DividendPayment, admin.site)
+        actions = InterestPaymentsAdmin(InterestPayment, admin.site).actions
+
+        self.assertNotIn("show_sectors_by_received_amount", actions)
+        self.assertNotIn("show_dividend_forecast", actions)
+        self.assertIn(
+            "show_dividend_forecast",
+            DividendPaymentsAdmin(DividendPayment, admin.site).actions,
+        )
+
+
+class IncomeViewTests(PaymentTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.user.is_staff = cls.user.is_superuser = True
+        cls.user.save()
+        ExchangeRate.objects.create(
+            currency=Currency.objects.create(name="Dollar", code="USD"),
+            date=datetime.date(2020, 3, 2),
+            rate=Decimal("1.8"),
+        )
+
+    def get_report(self, report):
+        self.client.force_login(self.user)
+
+        return self.client.get(
+            reverse("admin:payments_dividendpayment_income"),
+            {constants.INCOME_REPORT_VAR: report},
+        )
+
+    def test_aggregated_report_of_taxed_payments(self):
+        DividendPayment.objects.create(
+            position=self.position,
+            amount=Decimal("8.50"),
+            recorded_on=datetime.date(2020, 3, 2),
+            withheld_tax=Decimal("1.50"),
+        )
+
+        response = self.get_report(constants.INCOME_AGGREGATED_REPORT)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["data"]["gross_untaxed_amount"], 0)
+
+    def test_aggregated_report_reconciles_the_tax_due(self):
+        for amount, withheld_tax in ((Decimal("8.50"), Decimal("1.50")), (5, 0)):
+            DividendPayment.objects.create(
+                position=self.position,
+                amount=amount,
+                recorded_on=datetime.date(2020, 3, 2),
+                withheld_tax=withheld_tax,
+            )
+
+        data = self.get_report(constants.INCOME_AGGREGATED_REPORT).context["data"]
+
+        # The withheld tax of the first payment covers its local tax.
+        self.assertEqual(data["tax_due"], Decimal("0.5"))
+        self.assertEqual(data["tax_due_local"], Decimal("0.9"))
+
+    def test_yearly_taxes_of_the_payments_withheld_at_a_rate(self):
+        for day, amount, withheld_tax in ((2, "8.50", "1.50"), (3, "17.00", "3.00")):
+            DividendPayment.objects.create(
+                position=self.position,
+                amount=Decimal(amount),
+                recorded_on=datetime.date(2020, 3, day),
+                withheld_tax=Decimal(withheld_tax),
+                withheld_tax_rate=Decimal(15),
+            )
+
+        self.assertEqual(
+            get_yearly_taxes(DividendPayment.objects.all()),
+            [
+                {
+                    "year": 2020,
+                    "gross_amount": Decimal("54.00"),
+                    "withheld_tax": Decimal("8.10"),
+                    "local_tax": Decimal("5.40"),
+                    "tax_credit": Decimal("5.40"),
+                    "tax_due": Decimal("0.00"),
+                }
+            ],
+        )
+
+
+class TaxTests(TestCase):
+    def test_credits_the_withheld_tax_up_to_the_treaty_rate(self):
+        local_taxes, tax_credits, taxes_due = reconcile_taxes(
+            [100, 100, 100], [15, 15, None], [10, 10, 10], [5, numpy.nan, None]
+        )
+
+        self.assertEqual(local_taxes, [10, 10, 10])
+        self.assertEqual(tax_credits, [5, 10, 0])
+        self.assertEqual(taxes_due, [5, 0, 10])
+
+    def test_reconciles_the_taxes_in_decimals(self):
+        *_, taxes_due = reconcile_taxes(
+            [Decimal("0.10")], [Decimal(0)], [Decimal("0.3")], [None]
+        )
+
+        self.assertEqual(taxes_due, [Decimal("0.0003")])
+
+    def test_rates_of_the_countries_and_years(self):
+        TaxRate.objects.create(country="", year=2020, local_rate=12)
+        TaxRate.objects.create(country="US", year=2021, local_rate=5, treaty_rate=15)
+        TaxRate.objects.create(country="GB", year=2020, treaty_rate=10)
+
+        rates = get_tax_rates(
+            ["US", "US", "DE", "GB", "US", None],
+            [2021, 2022, 2021, 2021, 2019, 2020],
+        )
+
+        self.assertEqual(
+            rates.fillna(-1).values.tolist(),
+            [
+                # The latest rates of the country up to the year.
+                [5, 15],
+                [5, 15],
+                # The rates without a country apply to the other countries.
+                [12, -1],
+                [12, 10],
+                # Without any rates in the year the default local rate applies.
+                [constants.TAX_PERCENTAGE, -1],
+                [12, -1],
+            ],
+        )
+
+
+class ImportTests(PaymentTestCase):
+    def import_dividends(self, rows):
+        workbook = openpyxl.Workbook()
+        workbook.active.title = "Account Activity"
+        workbook.active.append(["Date", "Type"])
+        worksheet = workbook.create_sheet("Dividends")
+        worksheet.append(["Date", "Name", "Amount", "Rate", "Tax", "Position ID"])
+
+        for row in rows:
+            worksheet.append(row)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "statement.xlsx")
+            workbook.save(filename)
+            call_command(
+                "import",
+                filename,
+                self.user.email,
+                self.broker.name,
+                stdout=StringIO(),
+            )
+
+    def test_imports_the_dividends_of_numeric_position_ids(self):
+        self.import_dividends([["02/03/2020", "Stock", 1.5, "15%", 0.26, 1234]])
+
+        payment = DividendPayment.objects.get()
+        self.assertEqual(payment.position, self.position)
+        self.assertEqual(payment.amount, Decimal("1.50"))
+        self.assertEqual(payment.withheld_tax_rate, Decimal(15))
+
+    def test_updates_the_dividends_on_reimport(self):
+        row = ["02/03/2020", "Stock", 1.5, "15%", 0.26, "1234"]
+        self.import_dividends([row])
+        self.import_dividends([[*row[:4], 0.3, row[5]]])
+
+        payment = DividendPayment.objects.get()
+        self.assertEqual(payment.withheld_tax, Decimal("0.3"))
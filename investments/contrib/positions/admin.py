@@ -1,62 +1,112 @@
 import json
-from datetime import timedelta
+from decimal import Decimal
 
 from django.contrib import admin
 from django.contrib.admin import helpers
+from django.contrib.admin.options import IncorrectLookupParameters
 from django.core.checks import messages
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Avg, Case, CharField, Count, F, Sum, Value, When
+from django.db.models import (
+    Avg,
+    CharField,
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Sum,
+    Value,
+)
 from django.db.models.functions import (
+    Coalesce,
     Concat,
     ExtractDay,
     ExtractMonth,
     ExtractQuarter,
     ExtractYear,
-    TruncDay,
+    Round,
     TruncMonth,
     TruncQuarter,
 )
+from django.http import JsonResponse, QueryDict
 from django.shortcuts import redirect, render
-from django.urls import reverse
+from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from django_object_actions import DjangoObjectActions
 
 from investments import chart_constants
 from investments.contrib.currencies.models import ExchangeRate
-from investments.contrib.securities.constants import SECTOR_CHOICES
-from investments.contrib.securities.models import Bond, Security
-from investments.utils.admin import get_chart_data
+from investments.contrib.jobs.utils import run_in_background
+from investments.contrib.search.utils import SearchIndexAdminMixin
+from investments.contrib.securities.constants import (
+    CHART_SECTORS_LIMIT,
+    SECTOR_CHOICES,
+    STOCK,
+)
+from investments.contrib.securities.models import Security
+from investments.utils.admin import (
+    ChangeURLCacheAdminMixin,
+    get_change_url,
+    get_changelist_queryset,
+    get_chart_data,
+    get_security_change_url,
+)
+from investments.utils.admin_filters import AutocompleteFilter
+from investments.utils.exchange_rates import get_exchange_rate_subquery
+from investments.utils.exports import (
+    EXPORT_CHUNK_SIZE,
+    chunked,
+    format_decimal,
+    round_amount,
+    stream_csv,
+    stream_xlsx,
+)
+from investments.utils.pagination import EstimatedCountAdminMixin
+from investments.utils.ranking import (
+    get_chart_offset,
+    get_top_chart_config,
+    get_top_chart_data,
+)
+from investments.utils.uuid import generate_uuid
 
 from .admin_filters import StatusFilter
+from .constants import (
+    CHART_SECURITIES_LIMIT,
+    LOCAL_CURRENCY_REPORT,
+    REPORT_COLUMNS,
+    REPORT_MAX_PAGE_SIZE,
+    REPORT_PAGE_SIZE,
+    REPORT_QUERY_PARAMS,
+    REPORT_SELECTIONS_LIMIT,
+    REPORT_SELECTIONS_SESSION_KEY,
+    TAX_REPORT,
+    USD_REPORT,
+)
 from .forms import ClosePositionForm
 from .models import Position
-
-
-def custom_titled_filter(title, filter_class):
-    class Wrapper(filter_class):
-        def __new__(cls, *args, **kwargs):
-            instance = filter_class.create(*args, **kwargs)
-            instance.title = title
-            return instance
-
-    return Wrapper
+from .reports import build_position_report_rows
 
 
 @admin.register(Position)
-class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
+class PositionsAdmin(
+    SearchIndexAdminMixin,
+    EstimatedCountAdminMixin,
+    ChangeURLCacheAdminMixin,
+    DjangoObjectActions,
+    admin.ModelAdmin,
+):
     change_form_template = "admin/positions/change_form.html"
+    change_list_template = "admin/positions/change_list.html"
     list_filter = (
-        "security__user",
+        ("security__user", AutocompleteFilter),
         "opened_at",
         "closed_at",
         ("closed_at", StatusFilter),
         "security__stock__sector",
-        (
-            "security__name",
-            custom_titled_filter(_("Securities"), admin.FieldListFilter),
-        ),
+        ("security", AutocompleteFilter),
     )
     list_display = (
         "position_id",
@@ -69,13 +119,13 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         "closed_at",
         "normalized_close_price",
         "close_amount",
-        "profit_or_loss",
+        "realized_pl",
         "user_link",
     )
 
     list_per_page = 100
     ordering = ("-opened_at",)
-    date_hierarchy = "opened_at"
+    date_hierarchy = "opened_on"
     search_fields = (
         "position_id",
         "notes",
@@ -102,6 +152,8 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         "show_local_currency_position_report",
         "show_position_report",
         "show_tax_report",
+        "export_position_report_csv",
+        "export_position_report_xlsx",
     ]
     change_actions = ("close_position", "open_position")
 
@@ -110,15 +162,10 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         description=_("Security"),
     )
     def security_link(self, position):
-        try:
-            if position.security.bond:
-                reverse_string = "admin:securities_bond_change"
-        except Bond.DoesNotExist:
-            reverse_string = "admin:securities_stock_change"
-
         return mark_safe(
             '<a href="{}">{}</a>'.format(
-                reverse(reverse_string, args=(position.security.pk,)), position.security
+                get_security_change_url(position.security),
+                position.security,
             )
         )
 
@@ -127,6 +174,9 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         description=_("Sector"),
     )
     def sector(self, position):
+        if position.security.kind != STOCK:
+            return None
+
         return position.security.stock.get_sector_display()
 
     @admin.display(
@@ -150,27 +200,6 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def normalized_close_price(self, position):
         return position.close_price.normalize() if position.close_price else None
 
-    @admin.display(
-        ordering=F("open_price") * F("units"),
-        description=_("Open amount"),
-    )
-    def open_amount(self, position):
-        return position.open_amount
-
-    @admin.display(
-        ordering=F("close_price") * F("units"),
-        description=_("Close amount"),
-    )
-    def close_amount(self, position):
-        return position.close_amount
-
-    @admin.display(
-        ordering=F("close_price") * F("units") - F("open_price") * F("units"),
-        description=_("P/L"),
-    )
-    def profit_or_loss(self, position):
-        return position.profit_or_loss
-
     @admin.display(
         ordering="security__user",
         description=_("User"),
@@ -178,11 +207,31 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def user_link(self, position):
         return mark_safe(
             '<a href="{}">{}</a>'.format(
-                reverse("admin:users_user_change", args=(position.security.user.pk,)),
+                get_change_url("admin:users_user_change", position.security.user.pk),
                 position.security.user.email,
             )
         )
 
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context=extra_context)
+        changelist = getattr(response, "context_data", {}).get("cl")
+
+        if changelist is not None:
+            response.context_data["totals"] = self.get_changelist_totals(
+                changelist.queryset
+            )
+
+        return response
+
+    def get_changelist_totals(self, queryset):
+        """Sum the amounts of the whole filtered selection with one query."""
+        return queryset.order_by().aggregate(
+            total_open_amount=Coalesce(Sum("open_amount"), Decimal(0)),
+            total_close_amount=Coalesce(Sum("close_amount"), Decimal(0)),
+            total_realized_pl=Coalesce(Sum("realized_pl"), Decimal(0)),
+            position_count=Count("pk"),
+        )
+
     def get_change_actions(self, request, position_id, form_url):
         actions = list(super().get_change_actions(request, position_id, form_url))
         position = self.model.objects.get(pk=position_id)
@@ -194,18 +243,29 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
 
         return actions
 
+    def get_urls(self):
+        return [
+            path(
+                "report/data/",
+                self.admin_site.admin_view(self.position_report_data_view),
+                name="positions_position_report_data",
+            ),
+            *super().get_urls(),
+        ]
+
     @admin.action(description=_("Show invested amount grouped by days"))
+    @run_in_background
     def show_daily_invested_amount(self, request, queryset):
         queryset = (
             queryset.order_by()
             .annotate(
-                day=ExtractDay("opened_at"),
-                month=ExtractMonth("opened_at"),
-                year=ExtractYear("opened_at"),
+                day=ExtractDay("opened_on"),
+                month=ExtractMonth("opened_on"),
+                year=ExtractYear("opened_on"),
             )
             .values("day", "month", "year")
             .annotate(
-                value=Sum(F("open_price") * F("units")),
+                value=Sum("open_amount"),
                 label=Concat(
                     "day",
                     Value("."),
@@ -215,7 +275,7 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
                     output_field=CharField(),
                 ),
             )
-            .order_by(TruncDay("opened_at"))
+            .order_by("opened_on")
         )
 
         chart_data = get_chart_data(
@@ -234,13 +294,13 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def show_monthly_invested_amount(self, request, queryset):
         queryset = (
             queryset.order_by()
-            .annotate(month=ExtractMonth("opened_at"), year=ExtractYear("opened_at"))
+            .annotate(month=ExtractMonth("opened_on"), year=ExtractYear("opened_on"))
             .values("month", "year")
             .annotate(
-                value=Sum(F("open_price") * F("units")),
+                value=Sum("open_amount"),
                 label=Concat("month", Value("."), "year", output_field=CharField()),
             )
-            .order_by(TruncMonth("opened_at"))
+            .order_by(TruncMonth("opened_on"))
         )
 
         chart_data = get_chart_data(
@@ -260,14 +320,14 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         queryset = (
             queryset.order_by()
             .annotate(
-                quarter=ExtractQuarter("opened_at"), year=ExtractYear("opened_at")
+                quarter=ExtractQuarter("opened_on"), year=ExtractYear("opened_on")
             )
             .values("quarter", "year")
             .annotate(
-                value=Sum(F("open_price") * F("units")),
+                value=Sum("open_amount"),
                 label=Concat("quarter", Value("/"), "year", output_field=CharField()),
             )
-            .order_by(TruncQuarter("opened_at"))
+            .order_by(TruncQuarter("opened_on"))
         )
 
         chart_data = get_chart_data(
@@ -283,17 +343,18 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         )
 
     @admin.action(description=_("Show closed amount grouped by days"))
+    @run_in_background
     def show_daily_closed_amount(self, request, queryset):
         queryset = (
             queryset.order_by()
             .annotate(
-                day=ExtractDay("closed_at"),
-                month=ExtractMonth("closed_at"),
-                year=ExtractYear("closed_at"),
+                day=ExtractDay("closed_on"),
+                month=ExtractMonth("closed_on"),
+                year=ExtractYear("closed_on"),
             )
             .values("day", "month", "year")
             .annotate(
-                value=Sum(F("close_price") * F("units")),
+                value=Sum("close_amount"),
                 label=Concat(
                     "day",
                     Value("."),
@@ -303,7 +364,7 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
                     output_field=CharField(),
                 ),
             )
-            .order_by(TruncDay("closed_at"))
+            .order_by("closed_on")
         )
 
         chart_data = get_chart_data(
@@ -322,13 +383,13 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def show_monthly_closed_amount(self, request, queryset):
         queryset = (
             queryset.order_by()
-            .annotate(month=ExtractMonth("closed_at"), year=ExtractYear("closed_at"))
+            .annotate(month=ExtractMonth("closed_on"), year=ExtractYear("closed_on"))
             .values("month", "year")
             .annotate(
-                value=Sum(F("close_price") * F("units")),
+                value=Sum("close_amount"),
                 label=Concat("month", Value("."), "year", output_field=CharField()),
             )
-            .order_by(TruncMonth("closed_at"))
+            .order_by(TruncMonth("closed_on"))
         )
 
         chart_data = get_chart_data(
@@ -348,14 +409,14 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         queryset = (
             queryset.order_by()
             .annotate(
-                quarter=ExtractQuarter("closed_at"), year=ExtractYear("closed_at")
+                quarter=ExtractQuarter("closed_on"), year=ExtractYear("closed_on")
             )
             .values("quarter", "year")
             .annotate(
-                value=Sum(F("close_price") * F("units")),
+                value=Sum("close_amount"),
                 label=Concat("quarter", Value("/"), "year", output_field=CharField()),
             )
-            .order_by(TruncQuarter("closed_at"))
+            .order_by(TruncQuarter("closed_on"))
         )
 
         chart_data = get_chart_data(
@@ -371,13 +432,14 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         )
 
     @admin.action(description=_("Show opened positions grouped by days"))
+    @run_in_background
     def show_daily_opened_positions(self, request, queryset):
         queryset = (
             queryset.order_by()
             .annotate(
-                day=ExtractDay("opened_at"),
-                month=ExtractMonth("opened_at"),
-                year=ExtractYear("opened_at"),
+                day=ExtractDay("opened_on"),
+                month=ExtractMonth("opened_on"),
+                year=ExtractYear("opened_on"),
             )
             .values("day", "month", "year")
             .annotate(
@@ -391,7 +453,7 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
                     output_field=CharField(),
                 ),
             )
-            .order_by(TruncDay("opened_at"))
+            .order_by("opened_on")
         )
 
         chart_data = get_chart_data(
@@ -410,13 +472,13 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def show_monthly_opened_positions(self, request, queryset):
         queryset = (
             queryset.order_by()
-            .annotate(month=ExtractMonth("opened_at"), year=ExtractYear("opened_at"))
+            .annotate(month=ExtractMonth("opened_on"), year=ExtractYear("opened_on"))
             .values("month", "year")
             .annotate(
                 value=Count("uuid"),
                 label=Concat("month", Value("."), "year", output_field=CharField()),
             )
-            .order_by(TruncMonth("opened_at"))
+            .order_by(TruncMonth("opened_on"))
         )
 
         chart_data = get_chart_data(
@@ -436,14 +498,14 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         queryset = (
             queryset.order_by()
             .annotate(
-                quarter=ExtractQuarter("opened_at"), year=ExtractYear("opened_at")
+                quarter=ExtractQuarter("opened_on"), year=ExtractYear("opened_on")
             )
             .values("quarter", "year")
             .annotate(
                 value=Count("uuid"),
                 label=Concat("quarter", Value("/"), "year", output_field=CharField()),
             )
-            .order_by(TruncQuarter("opened_at"))
+            .order_by(TruncQuarter("opened_on"))
         )
 
         chart_data = get_chart_data(
@@ -459,13 +521,14 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         )
 
     @admin.action(description=_("Show closed positions grouped by days"))
+    @run_in_background
     def show_daily_closed_positions(self, request, queryset):
         queryset = (
             queryset.order_by()
             .annotate(
-                day=ExtractDay("closed_at"),
-                month=ExtractMonth("closed_at"),
-                year=ExtractYear("closed_at"),
+                day=ExtractDay("closed_on"),
+                month=ExtractMonth("closed_on"),
+                year=ExtractYear("closed_on"),
             )
             .values("day", "month", "year")
             .annotate(
@@ -479,7 +542,7 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
                     output_field=CharField(),
                 ),
             )
-            .order_by(TruncDay("closed_at"))
+            .order_by("closed_on")
         )
 
         chart_data = get_chart_data(
@@ -498,13 +561,13 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def show_monthly_closed_positions(self, request, queryset):
         queryset = (
             queryset.order_by()
-            .annotate(month=ExtractMonth("closed_at"), year=ExtractYear("closed_at"))
+            .annotate(month=ExtractMonth("closed_on"), year=ExtractYear("closed_on"))
             .values("month", "year")
             .annotate(
                 value=Count("uuid"),
                 label=Concat("month", Value("."), "year", output_field=CharField()),
             )
-            .order_by(TruncMonth("closed_at"))
+            .order_by(TruncMonth("closed_on"))
         )
 
         chart_data = get_chart_data(
@@ -524,14 +587,14 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         queryset = (
             queryset.order_by()
             .annotate(
-                quarter=ExtractQuarter("closed_at"), year=ExtractYear("closed_at")
+                quarter=ExtractQuarter("closed_on"), year=ExtractYear("closed_on")
             )
             .values("quarter", "year")
             .annotate(
                 value=Count("uuid"),
                 label=Concat("quarter", Value("/"), "year", output_field=CharField()),
             )
-            .order_by(TruncQuarter("closed_at"))
+            .order_by(TruncQuarter("closed_on"))
         )
 
         chart_data = get_chart_data(
@@ -551,13 +614,15 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
         queryset = (
             queryset.order_by()
             .values("security__name")
-            .annotate(
-                value=Sum(F("open_price") * F("units")), label=F("security__name")
-            )
+            .annotate(value=Sum("open_amount"), label=F("security__name"))
         )
 
-        chart_data = get_chart_data(
-            queryset=queryset, label=_("Securities"), colors=chart_constants.COLORS
+        chart_data = get_top_chart_data(
+            queryset=queryset,
+            label=_("Securities"),
+            colors=chart_constants.COLORS,
+            limit=CHART_SECURITIES_LIMIT,
+            offset=get_chart_offset(request),
         )
 
         return self.show_positions(
@@ -565,6 +630,9 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
             data=chart_data,
             chart_name=_("Securities grouped by invested amount"),
             chart_type=chart_constants.PIE_CHART,
+            chart_config=get_top_chart_config(
+                request, chart_data, CHART_SECURITIES_LIMIT
+            ),
         )
 
     @admin.action(description=_("Show sectors grouped by invested amount"))
@@ -573,17 +641,19 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
             queryset.order_by()
             .values("security__stock__sector")
             .annotate(
-                value=Sum(F("open_price") * F("units")),
+                value=Sum("open_amount"),
                 label=F("security__stock__sector"),
             )
         )
 
         label_map = {key: value for (key, value) in SECTOR_CHOICES}
 
-        chart_data = get_chart_data(
+        chart_data = get_top_chart_data(
             queryset=queryset,
             label=_("Securities"),
             colors=chart_constants.COLORS,
+            limit=CHART_SECTORS_LIMIT,
+            offset=get_chart_offset(request),
             label_map=label_map,
         )
 
@@ -592,10 +662,16 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
             data=chart_data,
             chart_name=_("Sectors grouped by invested amount"),
             chart_type=chart_constants.PIE_CHART,
+            chart_config=get_top_chart_config(request, chart_data, CHART_SECTORS_LIMIT),
         )
 
     def show_positions(
-        self, request, data, chart_name, chart_type=chart_constants.BAR_CHART
+        self,
+        request,
+        data,
+        chart_name,
+        chart_type=chart_constants.BAR_CHART,
+        chart_config=None,
     ):
         context = {
             **self.admin_site.each_context(request),
@@ -608,6 +684,9 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
             "chart_type": chart_type,
         }
 
+        if chart_config:
+            context["chart_config"] = chart_config
+
         return render(
             request,
             "admin/chart.html",
@@ -616,23 +695,15 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
 
     @admin.action(description=_("Show aggregated report"))
     def show_aggregated_report(self, request, queryset):
-        open_amount = F("open_price") * F("units")
-        close_amount = F("close_price") * F("units")
-
         data = queryset.aggregate(
-            open_amount=Sum(open_amount),
-            close_amount=Sum(close_amount),
-            unrealized_amount=Sum(
-                Case(When(close_price__isnull=True, then=open_amount))
-            ),
+            total_open_amount=Sum("open_amount"),
+            total_close_amount=Sum("close_amount"),
+            unrealized_amount=Sum("open_amount", filter=Q(close_amount__isnull=True)),
             average_open_price=Avg("open_price"),
             average_close_price=Avg("close_price"),
             position_count=Count("uuid"),
             units_sum=Sum("units"),
-            profit_or_loss=(
-                Sum(Case(When(close_price__isnull=False, then=close_amount)))
-                - Sum(Case(When(close_price__isnull=False, then=open_amount)))
-            ),
+            profit_or_loss=Sum("realized_pl"),
         )
 
         exchange_rate = (
@@ -664,88 +735,312 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
     def show_position_report(
         self, request, queryset, is_in_local_currency=False, is_tax_report=False
     ):
-        open_amount = F("open_price") * F("units")
-        close_amount = F("close_price") * F("units")
+        if is_tax_report:
+            report_type = TAX_REPORT
+        elif is_in_local_currency:
+            report_type = LOCAL_CURRENCY_REPORT
+        else:
+            report_type = USD_REPORT
+
+        # The page is rendered without rows. They are fetched page by page from
+        # the report data endpoint, which applies the same selection. The
+        # selected positions are stored in the session, so their keys don't
+        # make the URL of each page longer.
+        if request.POST.get("select_across") == "1":
+            params = request.GET.copy()
+        else:
+            params = QueryDict(mutable=True)
+            params["selection"] = self.store_report_selection(request, queryset)
 
-        data = (
-            queryset.values("opened_at__date", "closed_at__date", "security__name")
-            .annotate(
-                open_amount=Sum(open_amount),
-                close_amount=Sum(close_amount),
-                unrealized_amount=Sum(
-                    Case(When(close_price__isnull=True, then=open_amount))
-                ),
-                profit_or_loss=(
-                    Sum(Case(When(close_price__isnull=False, then=close_amount)))
-                    - Sum(Case(When(close_price__isnull=False, then=open_amount)))
+        params["report"] = report_type
+
+        return render(
+            request,
+            "admin/positions/position_report.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "columns": REPORT_COLUMNS[report_type],
+                "data_url": "{}?{}".format(
+                    reverse("admin:positions_position_report_data"),
+                    params.urlencode(),
                 ),
-                average_open_price=Avg("open_price"),
-                average_close_price=Avg("close_price"),
-                units=Sum("units"),
-                position_count=Count("uuid"),
-            )
-            .order_by("opened_at__date")
+                "is_in_local_currency": is_in_local_currency,
+                "is_tax_report": is_tax_report,
+            },
         )
 
-        if is_in_local_currency:
-            start_date = data.first()["opened_at__date"]
+    def position_report_data_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        report_type = request.GET.get("report")
+
+        if report_type not in REPORT_COLUMNS:
+            report_type = USD_REPORT
 
-            last_opened_at_date = data.last()["opened_at__date"]
-            last_closed_at_date = data.last()["closed_at__date"]
-            end_date = (
-                last_opened_at_date
-                if not last_closed_at_date or last_opened_at_date > last_closed_at_date
-                else last_closed_at_date
+        try:
+            limit = min(
+                int(request.GET.get("limit", REPORT_PAGE_SIZE)), REPORT_MAX_PAGE_SIZE
             )
+        except ValueError:
+            limit = REPORT_PAGE_SIZE
 
-            exchange_rates_queryset = ExchangeRate.objects.filter(
-                currency__code="USD",
-                # In case there is no rate for the start rate.
-                # There should be more than 7 days without rates
-                date__gte=start_date - timedelta(days=7),
-                date__lte=end_date,
+        try:
+            queryset = get_changelist_queryset(
+                self, request, ignored_params=REPORT_QUERY_PARAMS
             )
 
-            exchange_rates = {
-                rate.date.isoformat(): rate for rate in exchange_rates_queryset
-            }
+            if selection := request.GET.get("selection"):
+                pks = request.session.get(REPORT_SELECTIONS_SESSION_KEY, {}).get(
+                    selection
+                )
 
-            current_date = start_date
+                if pks is None:
+                    return JsonResponse(
+                        {"error": _("The selection has expired")}, status=400
+                    )
+
+                queryset = queryset.filter(pk__in=pks)
+
+            is_in_local_currency = report_type != USD_REPORT
+            data = self.get_position_report_queryset(queryset, is_in_local_currency)
+            cursor = self.get_position_report_cursor(request)
+
+            if cursor:
+                data = data.filter(cursor)
+
+            rows = list(data[: limit + 1])
+        except (IncorrectLookupParameters, ValidationError):
+            return JsonResponse({"error": _("Invalid report parameters")}, status=400)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        keys = [key for key, label in REPORT_COLUMNS[report_type]]
+        report_rows = build_position_report_rows(rows, is_in_local_currency)
+
+        response = {
+            "rows": [
+                {key: format_decimal(report_row[key]) for key in keys}
+                for report_row in report_rows
+            ],
+            "next": (
+                {
+                    "after_opened_on": rows[-1]["opened_on"],
+                    "after_security": rows[-1]["security__name"],
+                    "after_closed_on": rows[-1]["closed_on"] or "",
+                }
+                if has_more
+                else None
+            ),
+        }
 
-            def get_rate(date):
-                key = date.isoformat()
-                return exchange_rates.get(key)
+        # The totals don't depend on the page, so they are sent only once.
+        if not cursor:
+            response["totals"] = self.get_position_report_totals(queryset, report_type)
+
+        return JsonResponse(response, encoder=DjangoJSONEncoder)
+
+    def store_report_selection(self, request, queryset):
+        """Store the keys of the selected positions in the session and return
+        the token of the selection. Only the latest selections are kept.
+        """
+        selections = request.session.get(REPORT_SELECTIONS_SESSION_KEY, {})
+        token = generate_uuid().hex
+        selections[token] = [str(pk) for pk in queryset.values_list("pk", flat=True)]
+        request.session[REPORT_SELECTIONS_SESSION_KEY] = dict(
+            list(selections.items())[-REPORT_SELECTIONS_LIMIT:]
+        )
 
-            while current_date <= end_date:
-                exchange_rate = None
-                lookout_date = current_date
+        return token
 
-                exchange_rate = get_rate(lookout_date)
+    def get_position_report_cursor(self, request):
+        opened_on = parse_date(request.GET.get("after_opened_on") or "")
 
-                if exchange_rate:
-                    current_date += timedelta(days=1)
-                    continue
+        if not opened_on:
+            return None
 
-                while not exchange_rate:
-                    # Mooving back in time until we find the rate
-                    lookout_date -= timedelta(days=1)
-                    exchange_rate = get_rate(lookout_date)
+        security = request.GET.get("after_security", "")
+        closed_on = parse_date(request.GET.get("after_closed_on") or "")
 
-                exchange_rates[current_date.isoformat()] = exchange_rate
-                current_date += timedelta(days=1)
+        # Rows are ordered by open date, security and close date, with the
+        # open positions (no close date) first.
+        return (
+            Q(opened_on__gt=opened_on)
+            | Q(opened_on=opened_on, security__name__gt=security)
+            | Q(
+                (
+                    Q(closed_on__gt=closed_on)
+                    if closed_on
+                    else Q(closed_on__isnull=False)
+                ),
+                opened_on=opened_on,
+                security__name=security,
+            )
+        )
 
-        return render(
-            request,
-            "admin/positions/position_report.html",
-            context={
-                **self.admin_site.each_context(request),
-                "opts": self.model._meta,
-                "data": data,
-                "exchange_rates": exchange_rates if is_in_local_currency else None,
-                "is_in_local_currency": is_in_local_currency,
-                "is_tax_report": is_tax_report,
+    def get_position_report_totals(self, queryset, report_type):
+        # The totals are the sums of the rounded amounts of the report rows,
+        # so they add up to the rows.
+        rows = self.get_position_report_queryset(
+            queryset, is_in_local_currency=report_type != USD_REPORT
+        )
+        fields = {
+            USD_REPORT: {
+                "open_amount": "total_open_amount",
+                "close_amount": "total_close_amount",
+                "unrealized_amount": "unrealized_amount",
+                "profit_or_loss": "profit_or_loss",
+            },
+            LOCAL_CURRENCY_REPORT: {
+                "open_amount_local": "open_amount_local",
+                "close_amount_local": "close_amount_local",
+                "unrealized_amount_local": "unrealized_amount_local",
+                "profit_or_loss_local": "profit_or_loss_local",
             },
+            TAX_REPORT: {
+                "unrealized_amount": "unrealized_amount",
+                "unrealized_amount_local": "unrealized_amount_local",
+            },
+        }[report_type]
+
+        # The aliases of the sums can't shadow the columns they sum.
+        totals = rows.order_by().aggregate(
+            sum_units=Sum("units"),
+            sum_position_count=Coalesce(Sum("position_count"), 0),
+            **{f"sum_{key}": Sum(field) for key, field in fields.items()},
         )
+        units = totals.pop("sum_units") or Decimal(0)
+
+        return {
+            "units": format_decimal(units.normalize()),
+            "position_count": totals.pop("sum_position_count"),
+            **{
+                key.removeprefix("sum_"): format_decimal(round_amount(value))
+                for key, value in totals.items()
+            },
+        }
+
+    @admin.action(description=_("Export report as CSV"))
+    def export_position_report_csv(self, request, queryset):
+        return stream_csv(
+            filename="position_report.csv",
+            header=self.get_position_report_header(),
+            rows=self.get_position_report_rows(queryset),
+        )
+
+    @admin.action(description=_("Export report as XLSX"))
+    def export_position_report_xlsx(self, request, queryset):
+        return stream_xlsx(
+            filename="position_report.xlsx",
+            header=self.get_position_report_header(),
+            rows=self.get_position_report_rows(queryset),
+        )
+
+    def get_position_report_queryset(self, queryset, is_in_local_currency=False):
+        rows = (
+            queryset.values("opened_on", "closed_on", "security__name")
+            .annotate(
+                total_open_amount=Sum("open_amount"),
+                total_close_amount=Sum("close_amount"),
+                unrealized_amount=Sum(
+                    "open_amount", filter=Q(close_amount__isnull=True)
+                ),
+                profit_or_loss=Sum("realized_pl"),
+                average_open_price=Avg("open_price"),
+                average_close_price=Avg("close_price"),
+                units=Sum("units"),
+                position_count=Count("uuid"),
+            )
+            .order_by(
+                "opened_on",
+                "security__name",
+                F("closed_on").asc(nulls_first=True),
+            )
+        )
+
+        if not is_in_local_currency:
+            return rows
+
+        # The amounts are converted with the rates of the open and the close
+        # dates of the rows and rounded as they are shown.
+        return rows.annotate(
+            exchange_rate_at_open=get_exchange_rate_subquery(
+                "USD", OuterRef("opened_on")
+            ),
+            exchange_rate_at_close=get_exchange_rate_subquery(
+                "USD", OuterRef("closed_on")
+            ),
+        ).annotate(
+            open_amount_local=Round(
+                F("total_open_amount") * F("exchange_rate_at_open"), 2
+            ),
+            close_amount_local=Round(
+                F("total_close_amount") * F("exchange_rate_at_close"), 2
+            ),
+            profit_or_loss_local=(
+                Round(F("total_close_amount") * F("exchange_rate_at_close"), 2)
+                - Round(F("total_open_amount") * F("exchange_rate_at_open"), 2)
+            ),
+            unrealized_amount_local=Round(
+                F("unrealized_amount") * F("exchange_rate_at_open"), 2
+            ),
+            average_open_price_local=Round(
+                F("average_open_price") * F("exchange_rate_at_open"), 2
+            ),
+            average_close_price_local=Round(
+                F("average_close_price") * F("exchange_rate_at_close"), 2
+            ),
+        )
+
+    def get_position_report_header(self):
+        return (
+            _("Open date"),
+            _("Close date"),
+            _("Security"),
+            _("Open amount"),
+            _("Close amount"),
+            _("Profit/Loss"),
+            _("Unrealized amount"),
+            _("Average open price"),
+            _("Average close price"),
+            _("Units"),
+            _("Positions"),
+            _("Exchange rate at open"),
+            _("Exchange rate at close"),
+            _("Open amount (BGN)"),
+            _("Close amount (BGN)"),
+            _("Profit/Loss (BGN)"),
+            _("Unrealized amount (BGN)"),
+        )
+
+    def get_position_report_rows(self, queryset):
+        data = self.get_position_report_queryset(queryset, is_in_local_currency=True)
+
+        # The rows are built a chunk at a time, so only the rows being
+        # written are kept in memory.
+        for chunk in chunked(data.iterator(chunk_size=EXPORT_CHUNK_SIZE)):
+            for row in build_position_report_rows(chunk, is_in_local_currency=True):
+                yield [
+                    row["opened_on"],
+                    row["closed_on"],
+                    row["security"],
+                    row["open_amount"],
+                    row["close_amount"],
+                    row["profit_or_loss"],
+                    row["unrealized_amount"],
+                    row["average_open_price"],
+                    row["average_close_price"],
+                    row["units"],
+                    row["position_count"],
+                    row["exchange_rate_at_open"],
+                    row["exchange_rate_at_close"],
+                    row["open_amount_local"],
+                    row["close_amount_local"],
+                    row["profit_or_loss_local"],
+                    row["unrealized_amount_local"],
+                ]
 
     def close_position(self, request, position, *args, **kwargs):
         if position.is_closed:
@@ -812,7 +1107,6 @@ class PositionsAdmin(DjangoObjectActions, admin.ModelAdmin):
                 "security",
                 "broker",
                 "security__user",
-                "security__bond",
                 "security__stock",
             )
             .prefetch_related(
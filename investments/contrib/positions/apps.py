@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class PositionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "investments.contrib.positions"
+
+    def ready(self):
+        from investments.contrib.rollups.utils import register_date_rollup
+        from investments.contrib.search.utils import register_search_index
+        from investments.contrib.securities.models import Security
+
+        from .models import Position
+
+        register_date_rollup(
+            Position,
+            "opened_on",
+            "security__user",
+            dependencies={Security: "security"},
+        )
+        register_search_index(
+            Position,
+            ("position_id", "notes", "security__name", "security__stock__symbol"),
+            dependencies={Security: "security"},
+        )
@@ -0,0 +1,74 @@
+from django.utils.translation import gettext_lazy as _
+
+USD_REPORT = "usd"
+LOCAL_CURRENCY_REPORT = "local"
+TAX_REPORT = "tax"
+
+# The securities with the largest amounts shown in the pie charts. The rest
+# are shown together.
+CHART_SECURITIES_LIMIT = 20
+
+REPORT_PAGE_SIZE = 100
+REPORT_MAX_PAGE_SIZE = 1000
+
+# The selected positions of the latest reports are kept in the session.
+REPORT_SELECTIONS_SESSION_KEY = "position_report_selections"
+REPORT_SELECTIONS_LIMIT = 10
+
+# Query parameters used by the report data endpoint. They are removed before
+# the rest of the parameters are applied as changelist filters.
+REPORT_QUERY_PARAMS = (
+    "report",
+    "selection",
+    "limit",
+    "after_opened_on",
+    "after_security",
+    "after_closed_on",
+)
+
+USD_REPORT_COLUMNS = (
+    ("opened_on", _("Open date")),
+    ("closed_on", _("Close date")),
+    ("security", _("Security")),
+    ("open_amount", _("Open amount")),
+    ("close_amount", _("Close amount")),
+    ("profit_or_loss", _("Profit/Loss")),
+    ("unrealized_amount", _("Unrealized amount")),
+    ("average_open_price", _("Average open price")),
+    ("average_close_price", _("Average close price")),
+    ("units", _("Units")),
+    ("position_count", _("Positions")),
+)
+
+LOCAL_CURRENCY_REPORT_COLUMNS = (
+    ("opened_on", _("Open date")),
+    ("closed_on", _("Close date")),
+    ("security", _("Security")),
+    ("open_amount_local", _("Open amount")),
+    ("close_amount_local", _("Close amount")),
+    ("profit_or_loss_local", _("Profit/Loss")),
+    ("unrealized_amount_local", _("Unrealized amount")),
+    ("average_open_price_local", _("Average open price")),
+    ("average_close_price_local", _("Average close price")),
+    ("exchange_rate_at_open", _("Exchange rate at open")),
+    ("exchange_rate_at_close", _("Exchange rate at close")),
+    ("units", _("Units")),
+    ("position_count", _("Positions")),
+)
+
+TAX_REPORT_COLUMNS = (
+    ("opened_on", _("Open date")),
+    ("closed_on", _("Close date")),
+    ("security", _("Security")),
+    ("unrealized_amount", _("Unrealized amount")),
+    ("unrealized_amount_local", _("Unrealized amount in BGN")),
+    ("exchange_rate_at_open", _("Exchange rate at open")),
+    ("units", _("Units")),
+    ("position_count", _("Positions")),
+)
+
+REPORT_COLUMNS = {
+    USD_REPORT: USD_REPORT_COLUMNS,
+    LOCAL_CURRENCY_REPORT: LOCAL_CURRENCY_REPORT_COLUMNS,
+    TAX_REPORT: TAX_REPORT_COLUMNS,
+}
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("positions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["-opened_at"], name="positions_p_opened__a777e6_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["security", "-opened_at"], name="positions_p_securit_cc171e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                condition=models.Q(("closed_at__isnull", True)),
+                fields=["security", "opened_at"],
+                name="positions_open_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                condition=models.Q(("closed_at__isnull", False)),
+                fields=["closed_at"],
+                name="positions_closed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def to_local_date(value):
+    if value is None:
+        return None
+
+    if timezone.is_aware(value):
+        value = timezone.localtime(value, timezone.get_default_timezone())
+
+    return value.date()
+
+
+def backfill_dates(apps, schema_editor):
+    Position = apps.get_model("positions", "Position")
+    positions = []
+
+    for position in Position.objects.only("opened_at", "closed_at").iterator():
+        position.opened_on = to_local_date(position.opened_at)
+        position.closed_on = to_local_date(position.closed_at)
+        positions.append(position)
+
+        if len(positions) == 1000:
+            Position.objects.bulk_update(positions, ["opened_on", "closed_on"])
+            positions = []
+
+    Position.objects.bulk_update(positions, ["opened_on", "closed_on"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("positions", "0002_position_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="position",
+            name="opened_on",
+            field=models.DateField(editable=False, null=True, verbose_name="Opened on"),
+        ),
+        migrations.AddField(
+            model_name="position",
+            name="closed_on",
+            field=models.DateField(editable=False, null=True, verbose_name="Closed on"),
+        ),
+        migrations.RunPython(backfill_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="position",
+            name="opened_on",
+            field=models.DateField(editable=False, verbose_name="Opened on"),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["opened_on", "security"], name="positions_p_opened__c3a1b1_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                condition=models.Q(("closed_on__isnull", False)),
+                fields=["closed_on", "security"],
+                name="positions_closed_on_idx",
+            ),
+        ),
+    ]
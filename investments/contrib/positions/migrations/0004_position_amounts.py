@@ -0,0 +1,113 @@
+from django.db import migrations, models
+
+
+def backfill_amounts(apps, schema_editor):
+    Position = apps.get_model("positions", "Position")
+    fields = ["open_amount", "close_amount", "realized_pl"]
+    positions = []
+
+    for position in Position.objects.only(
+        "units", "open_price", "close_price", "closed_at"
+    ).iterator():
+        is_closed = position.close_price and position.closed_at is not None
+        position.open_amount = round(position.units * position.open_price, 2)
+        position.close_amount = (
+            round(position.units * position.close_price, 2) if is_closed else None
+        )
+        position.realized_pl = (
+            position.close_amount - position.open_amount if is_closed else None
+        )
+        positions.append(position)
+
+        if len(positions) == 1000:
+            Position.objects.bulk_update(positions, fields)
+            positions = []
+
+    Position.objects.bulk_update(positions, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("positions", "0003_position_opened_on_closed_on"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="position",
+            name="open_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                editable=False,
+                max_digits=24,
+                null=True,
+                verbose_name="Open amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="position",
+            name="close_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                editable=False,
+                max_digits=24,
+                null=True,
+                verbose_name="Close amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="position",
+            name="realized_pl",
+            field=models.DecimalField(
+                decimal_places=2,
+                editable=False,
+                max_digits=24,
+                null=True,
+                verbose_name="P/L",
+            ),
+        ),
+        migrations.RunPython(backfill_amounts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="position",
+            name="open_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                editable=False,
+                max_digits=24,
+                verbose_name="Open amount",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["open_amount"], name="positions_p_open_am_5a9c40_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["close_amount"], name="positions_p_close_a_a167ae_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["realized_pl"], name="positions_p_realize_cd6def_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["security", "open_amount"],
+                name="positions_p_securit_e2c984_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                condition=models.Q(("realized_pl__isnull", False)),
+                fields=["security", "realized_pl"],
+                name="positions_realized_pl_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("positions", "0005_uuid_default"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="position",
+            name="positions_closed_on_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="position",
+            name="positions_p_open_am_5a9c40_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="position",
+            name="positions_p_close_a_a167ae_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="position",
+            name="positions_p_realize_cd6def_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="position",
+            name="positions_realized_pl_idx",
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("positions", "0006_remove_unused_position_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["open_amount"], name="positions_p_open_am_5a9c40_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["close_amount"], name="positions_p_close_a_a167ae_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["realized_pl"], name="positions_p_realize_cd6def_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                condition=models.Q(("realized_pl__isnull", False)),
+                fields=["security", "realized_pl"],
+                name="positions_realized_pl_idx",
+            ),
+        ),
+    ]
@@ -1,14 +1,151 @@
-import uuid
+from contextlib import contextmanager
 
 from django.core import validators
 from django.db import models
+from django.db.models import Case, When
+from django.db.models.functions import Round, TruncDate
+from django.db.models.lookups import GreaterThan, IsNull
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from investments.contrib.rollups.utils import (
+    date_count_updates,
+    get_date_count_keys,
+    refresh_date_counts,
+)
+from investments.contrib.search.utils import (
+    search_index_updates,
+    update_search_documents_by_pk,
+)
 from investments.models import TimestampedModel
+from investments.utils.uuid import generate_uuid
+
+
+def to_local_date(value):
+    """Return the date of `value` in the default time zone, as `__date` does."""
+    if value is None:
+        return None
+
+    if timezone.is_aware(value):
+        value = timezone.localtime(value, timezone.get_default_timezone())
+
+    return value.date()
+
+
+def get_amount_expressions(units, open_price, close_price, closed_at):
+    """Return the SQL counterparts of `Position.sync_derived_fields`."""
+    open_amount = Round(units * open_price, 2)
+    close_amount = Case(
+        When(
+            GreaterThan(close_price, 0) & IsNull(closed_at, False),
+            then=Round(units * close_price, 2),
+        ),
+        output_field=models.DecimalField(),
+    )
+
+    return {
+        "open_amount": open_amount,
+        "close_amount": close_amount,
+        "realized_pl": close_amount - open_amount,
+    }
+
+
+class PositionQuerySet(models.QuerySet):
+    """Keep the derived fields, the date counts, the search documents and the
+    payment cube in sync in bulk.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+
+        for obj in objs:
+            obj.sync_derived_fields()
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        pks = [obj.pk for obj in objs]
+        refresh_date_counts(
+            self.model, get_date_count_keys(self.model._base_manager.filter(pk__in=pks))
+        )
+        update_search_documents_by_pk(self.model, pks)
+
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = Position.get_fields_to_update(fields)
+
+        for obj in objs:
+            obj.sync_derived_fields()
+
+        queryset = self.filter(pk__in=[obj.pk for obj in objs])
+
+        with self._bulk_updates(queryset, fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        with self._bulk_updates(self, Position.get_fields_to_update(kwargs)):
+            return self._update_with_derived_fields(**kwargs)
+
+    update.alters_data = True
+
+    @contextmanager
+    def _bulk_updates(self, queryset, fields):
+        # The cube reads the positions, so it's imported when it's used.
+        from investments.contrib.payments.cube import payment_cube_updates
+
+        with date_count_updates(queryset, fields), search_index_updates(
+            queryset, fields
+        ), payment_cube_updates(queryset, fields):
+            yield
+
+    def _update_with_derived_fields(self, **kwargs):
+        derived_fields = Position.get_fields_to_update(kwargs) - set(kwargs)
+
+        for date_field_name in ("opened_on", "closed_on"):
+            if date_field_name not in derived_fields:
+                continue
+
+            value = kwargs[Position.DERIVED_FIELDS[date_field_name][0]]
+            kwargs[date_field_name] = (
+                TruncDate(value, tzinfo=timezone.get_default_timezone())
+                if hasattr(value, "resolve_expression")
+                else to_local_date(value)
+            )
+
+        if derived_fields & {"open_amount", "close_amount", "realized_pl"}:
+            # All the expressions of an UPDATE read the old values of the
+            # row, so the new ones are passed explicitly.
+            sources = {}
+
+            for field_name in ("units", "open_price", "close_price", "closed_at"):
+                value = kwargs.get(field_name, models.F(field_name))
+                sources[field_name] = (
+                    value
+                    if hasattr(value, "resolve_expression")
+                    else models.Value(
+                        value, output_field=Position._meta.get_field(field_name)
+                    )
+                )
+
+            for field_name, expression in get_amount_expressions(**sources).items():
+                if field_name in derived_fields:
+                    kwargs[field_name] = expression
+
+        return super().update(**kwargs)
 
 
 class Position(TimestampedModel):
-    uuid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    # The fields, which are stored so the reports, the sorting and the
+    # filters don't compute them for each row, and the fields they depend on.
+    DERIVED_FIELDS = {
+        "opened_on": ("opened_at",),
+        "closed_on": ("closed_at",),
+        "open_amount": ("units", "open_price"),
+        "close_amount": ("units", "close_price", "closed_at"),
+        "realized_pl": ("units", "open_price", "close_price", "closed_at"),
+    }
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
     position_id = models.CharField(
         _("ID"),
         max_length=254,
@@ -47,28 +184,87 @@ class Position(TimestampedModel):
     )
     opened_at = models.DateTimeField(_("Opened at"))
     closed_at = models.DateTimeField(_("Closed at"), blank=True, null=True)
+    opened_on = models.DateField(_("Opened on"), editable=False)
+    closed_on = models.DateField(_("Closed on"), editable=False, null=True)
+    open_amount = models.DecimalField(
+        _("Open amount"), max_digits=24, decimal_places=2, editable=False
+    )
+    close_amount = models.DecimalField(
+        _("Close amount"), max_digits=24, decimal_places=2, editable=False, null=True
+    )
+    realized_pl = models.DecimalField(
+        _("P/L"), max_digits=24, decimal_places=2, editable=False, null=True
+    )
     notes = models.CharField(_("Notes"), max_length=1024, blank=True)
 
+    objects = PositionQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Position")
         verbose_name_plural = _("Positions")
         unique_together = [["position_id", "broker"]]
+        indexes = [
+            models.Index(fields=["open_amount"]),
+            models.Index(fields=["close_amount"]),
+            models.Index(fields=["realized_pl"]),
+            models.Index(fields=["security", "open_amount"]),
+            models.Index(
+                fields=["security", "realized_pl"],
+                condition=models.Q(realized_pl__isnull=False),
+                name="positions_realized_pl_idx",
+            ),
+            models.Index(fields=["opened_on", "security"]),
+            models.Index(fields=["-opened_at"]),
+            models.Index(fields=["security", "-opened_at"]),
+            models.Index(
+                fields=["security", "opened_at"],
+                condition=models.Q(closed_at__isnull=True),
+                name="positions_open_idx",
+            ),
+            models.Index(
+                fields=["closed_at"],
+                condition=models.Q(closed_at__isnull=False),
+                name="positions_closed_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.position_id} - {self.security.name}"
 
-    @property
-    def is_closed(self):
-        return self.close_price and self.closed_at is not None
+    def save(self, *args, **kwargs):
+        self.sync_derived_fields()
 
-    @property
-    def open_amount(self):
-        return round(self.units * self.open_price, 2)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = self.get_fields_to_update(kwargs["update_fields"])
+
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def get_fields_to_update(cls, fields):
+        """Add the derived fields, which depend on `fields`."""
+        fields = set(fields)
+
+        for field_name, source_field_names in cls.DERIVED_FIELDS.items():
+            if fields.intersection(source_field_names):
+                fields.add(field_name)
+
+        return fields
+
+    def sync_derived_fields(self):
+        self.opened_on = to_local_date(self.opened_at)
+        self.closed_on = to_local_date(self.closed_at)
+        self.open_amount = round(self.units * self.open_price, 2)
+        self.close_amount = (
+            round(self.units * self.close_price, 2) if self.is_closed else None
+        )
+        self.realized_pl = (
+            self.close_amount - self.open_amount if self.is_closed else None
+        )
 
     @property
-    def close_amount(self):
-        return round(self.units * self.close_price, 2) if self.is_closed else None
+    def is_closed(self):
+        return self.close_price and self.closed_at is not None
 
     @property
     def profit_or_loss(self):
-        return self.close_amount - self.open_amount if self.is_closed else None
+        return self.realized_pl
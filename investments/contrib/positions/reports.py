@@ -0,0 +1,48 @@
+from investments.utils.exports import round_amount
+
+# The amounts in the local currency, which are converted and rounded in the
+# report query with the rates of the open and close dates.
+LOCAL_CURRENCY_FIELDS = (
+    "open_amount_local",
+    "close_amount_local",
+    "profit_or_loss_local",
+    "unrealized_amount_local",
+    "average_open_price_local",
+    "average_close_price_local",
+)
+
+
+def build_position_report_rows(rows, is_in_local_currency=False):
+    """Turn grouped position report rows into final rows.
+
+    The amounts in the local currency are converted in the query, so the
+    templates and the exports only format values, and the totals sum the
+    same rounded amounts.
+    """
+    report_rows = []
+
+    for row in rows:
+        report_row = {
+            "opened_on": row["opened_on"],
+            "closed_on": row["closed_on"],
+            "security": row["security__name"],
+            "open_amount": round_amount(row["total_open_amount"]),
+            "close_amount": round_amount(row["total_close_amount"]),
+            "profit_or_loss": round_amount(row["profit_or_loss"]),
+            "unrealized_amount": round_amount(row["unrealized_amount"]),
+            "average_open_price": round_amount(row["average_open_price"]),
+            "average_close_price": round_amount(row["average_close_price"]),
+            "units": row["units"].normalize(),
+            "position_count": row["position_count"],
+        }
+
+        if is_in_local_currency:
+            report_row.update(
+                exchange_rate_at_open=row["exchange_rate_at_open"],
+                exchange_rate_at_close=row["exchange_rate_at_close"],
+                **{field: round_amount(row[field]) for field in LOCAL_CURRENCY_FIELDS},
+            )
+
+        report_rows.append(report_row)
+
+    return report_rows
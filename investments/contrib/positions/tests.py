@@ -1 +1,372 @@
-# Create your tests here.
+import datetime
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+import openpyxl
+from django.contrib import admin
+from django.core.management import call_command
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import F, Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from investments.contrib.brokers.models import Broker
+from investments.contrib.currencies.models import Currency, ExchangeRate
+from investments.contrib.securities.constants import (
+    ENERGY,
+    MATERIALS,
+    SECTOR_CHOICES,
+    UTILITIES,
+)
+from investments.contrib.securities.models import Bond, Stock
+from investments.contrib.users.models import User
+from investments.utils import admin as admin_utils
+from investments.utils.pagination import EstimatedCountPaginator
+from investments.utils.ranking import get_top_chart_data
+
+from .admin import PositionsAdmin
+from .constants import REPORT_SELECTIONS_LIMIT
+from .models import Position
+
+
+class PositionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", password="x")
+        cls.broker = Broker.objects.create(name="Broker", user=cls.user)
+        cls.stock = Stock.objects.create(
+            name="Stock", symbol="STK", sector=ENERGY, user=cls.user
+        )
+
+    def create_positions(self, count):
+        Position.objects.bulk_create(
+            Position(
+                position_id=str(index),
+                units=Decimal(1),
+                open_price=Decimal(100),
+                security=self.stock,
+                broker=self.broker,
+                opened_at=timezone.make_aware(datetime.datetime(2020, 1, 1)),
+            )
+            for index in range(count)
+        )
+
+
+class EstimatedCountPaginatorTests(PositionTestCase):
+    def setUp(self):
+        self.create_positions(30)
+
+    def get_paginator(self, estimated_count):
+        paginator = EstimatedCountPaginator(Position.objects.order_by("pk"), 10)
+        paginator.threshold = 10
+
+        patcher = mock.patch(
+            "investments.utils.pagination.get_estimated_count",
+            return_value=estimated_count,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        return paginator
+
+    def test_counts_exactly_without_an_estimate(self):
+        paginator = self.get_paginator(None)
+
+        self.assertEqual(paginator.count, 30)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_counts_exactly_below_the_threshold(self):
+        paginator = self.get_paginator(5)
+
+        self.assertEqual(paginator.count, 30)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_reads_the_pages_past_the_estimate(self):
+        paginator = self.get_paginator(15)
+
+        self.assertEqual(paginator.count, 15)
+        self.assertTrue(paginator.is_estimated)
+        self.assertEqual(len(paginator.page(3).object_list), 10)
+
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+
+class EstimatedCountAdminTests(PositionTestCase):
+    def get_paginator(self):
+        return PositionsAdmin(Position, admin.site).get_paginator(
+            RequestFactory().get("/"), Position.objects.all(), 10
+        )
+
+    def test_counts_as_usual_by_default(self):
+        self.assertIs(type(self.get_paginator()), Paginator)
+
+    def test_orders_the_unordered_querysets(self):
+        self.assertEqual(self.get_paginator().object_list.query.order_by, ("-pk",))
+
+    @override_settings(ESTIMATED_COUNT_MODELS=["positions.Position"])
+    def test_estimates_the_count_of_the_opted_in_models(self):
+        self.assertIsInstance(self.get_paginator(), EstimatedCountPaginator)
+
+
+class ChangeURLCacheTests(PositionTestCase):
+    def test_resolves_the_links_once_per_changelist(self):
+        self.create_positions(3)
+        self.client.force_login(
+            User.objects.create_superuser(email="admin@example.com", password="x")
+        )
+
+        with mock.patch.object(
+            admin_utils, "reverse", wraps=admin_utils.reverse
+        ) as mock_reverse:
+            response = self.client.get(reverse("admin:positions_position_changelist"))
+
+        self.assertContains(
+            response, reverse("admin:users_user_change", args=(self.user.pk,)), 3
+        )
+        self.assertEqual(
+            [call.args[0] for call in mock_reverse.call_args_list],
+            ["admin:securities_stock_change", "admin:users_user_change"],
+        )
+        self.assertIsNone(admin_utils._url_templates.get())
+
+
+class TopChartTests(PositionTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        securities = [
+            cls.stock,
+            Stock.objects.create(
+                name="Utility", symbol="UTL", sector=UTILITIES, user=cls.user
+            ),
+            Stock.objects.create(
+                name="Mine", symbol="MIN", sector=MATERIALS, user=cls.user
+            ),
+            Bond.objects.create(name="Bond", user=cls.user),
+        ]
+
+        for index, (security, open_price) in enumerate(
+            zip(securities, (100, 50, 30, 20))
+        ):
+            Position.objects.create(
+                position_id=str(index),
+                units=Decimal(1),
+                open_price=Decimal(open_price),
+                security=security,
+                broker=cls.broker,
+                opened_at=timezone.make_aware(datetime.datetime(2020, 1, 1)),
+            )
+
+    def get_chart_data(self, limit, offset=0):
+        data = get_top_chart_data(
+            Position.objects.order_by()
+            .values("security__stock__sector")
+            .annotate(value=Sum("open_amount"), label=F("security__stock__sector")),
+            label="Positions",
+            colors=["red", "green", "blue"],
+            limit=limit,
+            offset=offset,
+            label_map=dict(SECTOR_CHOICES),
+        )
+
+        return list(zip(data["labels"], data["datasets"][0]["data"]))
+
+    def test_sums_the_groups_past_the_limit_as_other(self):
+        sectors = dict(SECTOR_CHOICES)
+
+        self.assertEqual(
+            self.get_chart_data(limit=2),
+            [
+                (sectors[ENERGY], Decimal(100)),
+                (sectors[UTILITIES], Decimal(50)),
+                ("Other", Decimal(50)),
+            ],
+        )
+        self.assertEqual(
+            self.get_chart_data(limit=1, offset=1),
+            [(sectors[UTILITIES], Decimal(50)), ("Other", Decimal(50))],
+        )
+
+    def test_labels_the_group_without_a_sector(self):
+        self.assertEqual(
+            self.get_chart_data(limit=2, offset=2),
+            [(dict(SECTOR_CHOICES)[MATERIALS], Decimal(30)), ("Unknown", Decimal(20))],
+        )
+
+
+class PositionQuerySetTests(PositionTestCase):
+    def test_bulk_create_syncs_the_derived_fields_of_an_iterable(self):
+        self.create_positions(2)
+
+        self.assertEqual(
+            list(Position.objects.values_list("open_amount", "opened_on")),
+            [(Decimal(100), datetime.date(2020, 1, 1))] * 2,
+        )
+
+
+class ExplainReportsTests(PositionTestCase):
+    def test_applies_the_params_to_the_selection_of_the_actions(self):
+        User.objects.create_superuser(email="admin@example.com", password="x")
+        self.create_positions(2)
+        selections = []
+
+        def action(model_admin, request, queryset):
+            selections.append([position.position_id for position in queryset])
+
+        with mock.patch.object(
+            PositionsAdmin,
+            "get_actions",
+            return_value={"action": (action, "action", "Action")},
+        ):
+            call_command(
+                "explain_reports",
+                model=["positions.Position"],
+                params="q=1",
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(selections, [["1"]])
+
+
+class PositionReportTests(PositionTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.other_stock = Stock.objects.create(
+            name="Other", symbol="OTH", sector=ENERGY, user=cls.user
+        )
+        currency = Currency.objects.create(name="US Dollar", code="USD")
+        ExchangeRate.objects.create(
+            currency=currency, date=datetime.date(2020, 1, 1), rate=Decimal("1.23456")
+        )
+        ExchangeRate.objects.create(
+            currency=currency, date=datetime.date(2020, 2, 1), rate=Decimal("1.34567")
+        )
+
+        for position_id, security, open_price, day in (
+            ("1", cls.stock, "10.01", 1),
+            ("2", cls.other_stock, "20.03", 1),
+            ("3", cls.stock, "33.33", 2),
+        ):
+            Position.objects.create(
+                position_id=position_id,
+                units=Decimal(1),
+                open_price=Decimal(open_price),
+                security=security,
+                broker=cls.broker,
+                opened_at=timezone.make_aware(datetime.datetime(2020, 1, day)),
+            )
+
+        Position.objects.filter(position_id="2").update(
+            close_price=Decimal("21.07"),
+            closed_at=timezone.make_aware(datetime.datetime(2020, 2, 3)),
+        )
+        Position.objects.get(position_id="2").save()
+
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser(email="admin@example.com", password="x")
+        )
+
+    def show_report(self, action, positions):
+        response = self.client.post(
+            reverse("admin:positions_position_changelist"),
+            {
+                "action": action,
+                "index": 0,
+                "_selected_action": [position.pk for position in positions],
+            },
+        )
+
+        return response.context["data_url"]
+
+    def get_rows(self, data_url):
+        rows = []
+        params = {"limit": 1}
+
+        while params is not None:
+            data = self.client.get(data_url, params).json()
+            rows += data["rows"]
+            params = data["next"] and {"limit": 1, **data["next"]}
+
+        return rows
+
+    def test_pages_follow_the_cursor(self):
+        data_url = self.show_report("show_position_report", Position.objects.all())
+
+        rows = self.get_rows(data_url)
+
+        self.assertEqual(
+            [(row["opened_on"], row["security"]) for row in rows],
+            [("2020-01-01", "Other"), ("2020-01-01", "Stock"), ("2020-01-02", "Stock")],
+        )
+        self.assertEqual(rows, self.client.get(data_url).json()["rows"])
+
+    def test_totals_add_up_the_rounded_rows(self):
+        data_url = self.show_report(
+            "show_local_currency_position_report", Position.objects.all()
+        )
+
+        data = self.client.get(data_url).json()
+
+        self.assertEqual(
+            [row["open_amount_local"] for row in data["rows"]],
+            ["24.73", "12.36", "41.15"],
+        )
+
+        for key in (
+            "open_amount_local",
+            "close_amount_local",
+            "unrealized_amount_local",
+            "profit_or_loss_local",
+        ):
+            with self.subTest(key=key):
+                self.assertEqual(
+                    Decimal(data["totals"][key]),
+                    sum(Decimal(row[key]) for row in data["rows"] if row[key]),
+                )
+
+    def test_exports_the_rows_to_xlsx(self):
+        response = self.client.post(
+            reverse("admin:positions_position_changelist"),
+            {
+                "action": "export_position_report_xlsx",
+                "index": 0,
+                "_selected_action": Position.objects.values_list("pk", flat=True),
+            },
+        )
+
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="position_report.xlsx"',
+        )
+
+        workbook = openpyxl.load_workbook(BytesIO(b"".join(response.streaming_content)))
+        header, *rows = workbook.active.iter_rows(values_only=True)
+
+        self.assertEqual(header[:3], ("Open date", "Close date", "Security"))
+        self.assertEqual(
+            [(row[2], row[3], row[13]) for row in rows],
+            [("Other", 20.03, 24.73), ("Stock", 10.01, 12.36), ("Stock", 33.33, 41.15)],
+        )
+
+    def test_selection_is_stored_in_the_session(self):
+        data_url = self.show_report(
+            "show_position_report", Position.objects.filter(position_id="3")
+        )
+
+        self.assertNotIn("ids", data_url)
+        self.assertEqual(
+            [row["security"] for row in self.client.get(data_url).json()["rows"]],
+            ["Stock"],
+        )
+
+        for _ in range(REPORT_SELECTIONS_LIMIT):
+            self.show_report("show_position_report", Position.objects.all())
+
+        self.assertEqual(self.client.get(data_url).status_code, 400)
@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from investments.contrib.rollups.utils import DATE_ROLLUPS, rebuild_date_counts
+
+
+class Command(BaseCommand):
+    help = "Recounts the rows per user and date of the models with a date rollup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            nargs="+",
+            default=[],
+            help="Only rebuild these models, e.g. positions.Position.",
+        )
+
+    def handle(self, *args, **options):
+        for label in DATE_ROLLUPS:
+            if options["model"] and label not in options["model"]:
+                continue
+
+            with transaction.atomic():
+                count = rebuild_date_counts(apps.get_model(label))
+
+            self.write_success(f"{label}: stored {count} date counts")
+
+    def write_success(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import investments.utils.uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DateCount",
+            fields=[
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=investments.utils.uuid.generate_uuid,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The model label, e.g. app.Model.",
+                        max_length=254,
+                        verbose_name="Model",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="Count")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="date_counts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Date count",
+                "verbose_name_plural": "Date counts",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="datecount",
+            constraint=models.UniqueConstraint(
+                fields=("model", "user", "date"), name="rollups_datecount_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import Count, F
+
+# The models with a date rollup, with their date and user field paths.
+DATE_ROLLUPS = (
+    ("positions", "Position", "opened_on", "security__user"),
+    ("payments", "DividendPayment", "recorded_on", "position__security__user"),
+    ("payments", "InterestPayment", "recorded_on", "position__security__user"),
+)
+
+
+def backfill_date_counts(apps, schema_editor):
+    DateCount = apps.get_model("rollups", "DateCount")
+
+    for app_label, model_name, date_field, user_field in DATE_ROLLUPS:
+        model = apps.get_model(app_label, model_name)
+        rows = (
+            model.objects.exclude(**{f"{date_field}__isnull": True})
+            .order_by()
+            .values(user_id=F(f"{user_field}__pk"), date=F(date_field))
+            .annotate(count=Count("pk"))
+        )
+
+        DateCount.objects.bulk_create(
+            (
+                DateCount(
+                    model=f"{app_label}.{model_name}",
+                    user_id=row["user_id"],
+                    date=row["date"],
+                    count=row["count"],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rollups", "0001_initial"),
+        ("positions", "0005_uuid_default"),
+        ("payments", "0004_uuid_default"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_date_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from investments.utils.uuid import generate_uuid
+
+UserModel = get_user_model()
+
+
+class DateCount(models.Model):
+    """The number of rows of a model, which fall on a date, per user.
+
+    The rows are kept current by the signals connected with
+    `register_date_rollup`, so the date hierarchy doesn't scan the model.
+    """
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
+    user = models.ForeignKey(
+        UserModel, related_name="date_counts", on_delete=models.CASCADE
+    )
+    model = models.CharField(
+        _("Model"), max_length=254, help_text=_("The model label, e.g. app.Model.")
+    )
+    date = models.DateField(_("Date"))
+    count = models.PositiveIntegerField(_("Count"), default=0)
+
+    class Meta:
+        verbose_name = _("Date count")
+        verbose_name_plural = _("Date counts")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "user", "date"], name="rollups_datecount_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.date}: {self.count}"
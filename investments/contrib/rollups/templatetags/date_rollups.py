@@ -0,0 +1,164 @@
+import datetime
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.contrib.auth import get_user_model
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext_lazy as _
+
+from investments.contrib.rollups.utils import (
+    DATE_ROLLUPS,
+    get_date_hierarchy_counts,
+    get_date_range,
+)
+
+register = template.Library()
+
+UserModel = get_user_model()
+
+
+def get_rollup_user_id(cl):
+    """Return whether the date counts apply to the changelist and for which user.
+
+    They do only when the changelist isn't searched or filtered by anything
+    but the user and the date hierarchy itself.
+    """
+    if cl.model._meta.label not in DATE_ROLLUPS:
+        return False, None
+
+    date_field, user_field = DATE_ROLLUPS[cl.model._meta.label]
+    user_param = f"{user_field}__{UserModel._meta.pk.name}__exact"
+    date_params = {f"{date_field}__{part}" for part in ("year", "month", "day")}
+
+    if cl.date_hierarchy != date_field or cl.query:
+        return False, None
+
+    if set(cl.get_filters_params()) - date_params - {user_param}:
+        return False, None
+
+    try:
+        return True, int(cl.params[user_param]) if user_param in cl.params else None
+    except ValueError:
+        return False, None
+
+
+def get_title(title, count):
+    return f"{title} ({count})"
+
+
+def date_rollup_hierarchy(cl):
+    """Render the date hierarchy from the date counts instead of the rows."""
+    is_applicable, user_id = get_rollup_user_id(cl)
+
+    if not is_applicable:
+        return date_hierarchy(cl)
+
+    field_name = cl.date_hierarchy
+    year_field = f"{field_name}__year"
+    month_field = f"{field_name}__month"
+    day_field = f"{field_name}__day"
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if not (year_lookup or month_lookup or day_lookup):
+        date_range = get_date_range(cl.model, user_id)
+
+        if date_range["first"] and date_range["last"]:
+            if date_range["first"].year == date_range["last"].year:
+                year_lookup = date_range["first"].year
+
+                if date_range["first"].month == date_range["last"].month:
+                    month_lookup = date_range["first"].month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [
+                {"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}
+            ],
+        }
+
+    if year_lookup and month_lookup:
+        days = get_date_hierarchy_counts(
+            cl.model, user_id, int(year_lookup), int(month_lookup)
+        )
+
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup}),
+                "title": str(year_lookup),
+            },
+            "choices": [
+                {
+                    "link": link(
+                        {
+                            year_field: year_lookup,
+                            month_field: month_lookup,
+                            day_field: day.day,
+                        }
+                    ),
+                    "title": get_title(
+                        capfirst(formats.date_format(day, "MONTH_DAY_FORMAT")), count
+                    ),
+                }
+                for day, count in days
+            ],
+        }
+
+    if year_lookup:
+        months = get_date_hierarchy_counts(cl.model, user_id, int(year_lookup))
+
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month}),
+                    "title": get_title(
+                        capfirst(
+                            formats.date_format(
+                                datetime.date(int(year_lookup), month, 1),
+                                "YEAR_MONTH_FORMAT",
+                            )
+                        ),
+                        count,
+                    ),
+                }
+                for month, count in months
+            ],
+        }
+
+    years = get_date_hierarchy_counts(cl.model, user_id)
+
+    return {
+        "show": True,
+        "back": None,
+        "choices": [
+            {"link": link({year_field: str(year)}), "title": get_title(year, count)}
+            for year, count in years
+        ],
+    }
+
+
+@register.tag(name="date_rollup_hierarchy")
+def date_rollup_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=date_rollup_hierarchy,
+        template_name="date_hierarchy.html",
+        takes_context=False,
+    )
@@ -0,0 +1,153 @@
+import datetime
+from decimal import Decimal
+
+from django.apps import apps
+from django.test import TestCase
+from django.utils import timezone
+
+from investments.contrib.brokers.models import Broker
+from investments.contrib.payments.models import DividendPayment, Payment
+from investments.contrib.positions.models import Position
+from investments.contrib.securities.constants import ENERGY
+from investments.contrib.securities.models import Stock
+from investments.contrib.users.models import User
+
+from .models import DateCount
+from .utils import DATE_ROLLUPS, rebuild_date_counts
+
+
+class DateCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", password="x")
+        cls.other_user = User.objects.create_user(
+            email="other@example.com", password="x"
+        )
+        cls.broker = Broker.objects.create(name="Broker", user=cls.user)
+        cls.stock = Stock.objects.create(
+            name="Stock", symbol="STK", sector=ENERGY, user=cls.user
+        )
+        cls.other_stock = Stock.objects.create(
+            name="Other", symbol="OTH", sector=ENERGY, user=cls.other_user
+        )
+
+    def build_position(self, position_id, day=1):
+        return Position(
+            position_id=position_id,
+            units=Decimal(1),
+            open_price=Decimal(100),
+            security=self.stock,
+            broker=self.broker,
+            opened_at=timezone.make_aware(datetime.datetime(2020, 1, day)),
+        )
+
+    def get_counts(self, model):
+        return {
+            (user_id, date): count
+            for user_id, date, count in DateCount.objects.filter(
+                model=model._meta.label
+            ).values_list("user", "date", "count")
+        }
+
+    def assertCountsAreCurrent(self):
+        stored = set(DateCount.objects.values_list("model", "user", "date", "count"))
+
+        for label in DATE_ROLLUPS:
+            rebuild_date_counts(apps.get_model(label))
+
+        self.assertEqual(
+            stored, set(DateCount.objects.values_list("model", "user", "date", "count"))
+        )
+
+    def test_bulk_create_counts_the_positions(self):
+        Position.objects.bulk_create(
+            self.build_position(str(index)) for index in range(2)
+        )
+
+        self.assertEqual(
+            self.get_counts(Position), {(self.user.pk, datetime.date(2020, 1, 1)): 2}
+        )
+        self.assertCountsAreCurrent()
+
+    def test_update_moves_the_counts_of_the_positions(self):
+        Position.objects.bulk_create(
+            self.build_position(str(index)) for index in range(2)
+        )
+
+        Position.objects.filter(position_id="1").update(
+            opened_at=timezone.make_aware(datetime.datetime(2020, 1, 2))
+        )
+
+        self.assertEqual(
+            self.get_counts(Position),
+            {
+                (self.user.pk, datetime.date(2020, 1, 1)): 1,
+                (self.user.pk, datetime.date(2020, 1, 2)): 1,
+            },
+        )
+        self.assertCountsAreCurrent()
+
+    def test_bulk_update_moves_the_counts_of_the_positions(self):
+        positions = Position.objects.bulk_create(
+            self.build_position(str(index)) for index in range(2)
+        )
+
+        for position in positions:
+            position.security = self.other_stock
+
+        Position.objects.bulk_update(positions, ["security"])
+
+        self.assertEqual(
+            self.get_counts(Position),
+            {(self.other_user.pk, datetime.date(2020, 1, 1)): 2},
+        )
+        self.assertCountsAreCurrent()
+
+    def test_changing_the_user_of_a_security_moves_its_counts(self):
+        position = self.build_position("1")
+        position.save()
+        DividendPayment.objects.create(
+            position=position, amount=Decimal(1), recorded_on=datetime.date(2020, 3, 1)
+        )
+
+        self.stock.user = self.other_user
+        self.stock.save()
+
+        self.assertEqual(
+            self.get_counts(DividendPayment),
+            {(self.other_user.pk, datetime.date(2020, 3, 1)): 1},
+        )
+        self.assertCountsAreCurrent()
+
+    def test_changing_the_security_of_a_position_moves_its_payment_counts(self):
+        position = self.build_position("1")
+        position.save()
+        DividendPayment.objects.create(
+            position=position, amount=Decimal(1), recorded_on=datetime.date(2020, 3, 1)
+        )
+
+        position.security = self.other_stock
+        position.save()
+
+        self.assertEqual(
+            self.get_counts(DividendPayment),
+            {(self.other_user.pk, datetime.date(2020, 3, 1)): 1},
+        )
+        self.assertCountsAreCurrent()
+
+    def test_update_of_the_parent_moves_the_counts_of_the_payments(self):
+        position = self.build_position("1")
+        position.save()
+        payment = DividendPayment.objects.create(
+            position=position, amount=Decimal(1), recorded_on=datetime.date(2020, 3, 1)
+        )
+
+        Payment.objects.filter(pk=payment.pk).update(
+            recorded_on=datetime.date(2020, 4, 1)
+        )
+
+        self.assertEqual(
+            self.get_counts(DividendPayment),
+            {(self.user.pk, datetime.date(2020, 4, 1)): 1},
+        )
+        self.assertCountsAreCurrent()
@@ -0,0 +1,289 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from investments.contrib.search.utils import get_models_with_subclasses
+
+from .models import DateCount
+
+# The date and the user field paths of each model with a date rollup.
+DATE_ROLLUPS = {}
+
+
+def register_date_rollup(model, date_field, user_field, dependencies=None):
+    """Count the rows of `model` per user and date in `DateCount`.
+
+    The counts of the old and the new date of each saved or deleted row are
+    recomputed, so they stay correct however often the signals are sent.
+
+    `dependencies` maps the models on the path to the user to the lookup
+    from `model` to them, so the counts follow the rows to their new user.
+    Their `QuerySet.update` sends no signals, so the counts are recounted
+    with the rebuild_date_counts command after it.
+    """
+    DATE_ROLLUPS[model._meta.label] = (date_field, user_field)
+
+    for signal, receiver in (
+        (pre_save, store_date_count_keys),
+        (pre_delete, store_date_count_keys),
+        (post_save, update_date_counts),
+        (post_delete, update_date_counts),
+    ):
+        signal.connect(
+            receiver,
+            sender=model,
+            dispatch_uid=f"{receiver.__name__}:{model._meta.label}",
+        )
+
+    for related_model, lookup in (dependencies or {}).items():
+        store_keys, update_dependent_date_counts = get_dependency_receivers(
+            model, lookup, user_field[len(lookup) + 2 :].split("__")[0]
+        )
+
+        for sender in get_models_with_subclasses(related_model):
+            pre_save.connect(
+                store_keys,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"store_dependent_date_count_keys:{model._meta.label}:{sender._meta.label}",
+            )
+            post_save.connect(
+                update_dependent_date_counts,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"update_dependent_date_counts:{model._meta.label}:{sender._meta.label}",
+            )
+
+
+def get_dependency_receivers(model, lookup, field_name):
+    """Return the receivers, which recount the rows of `model`, whose related
+    row of `lookup` changes its `field_name` on the path to the user.
+    """
+    label = model._meta.label
+
+    def get_keys(pk):
+        return get_date_count_keys(model._base_manager.filter(**{lookup: pk}))
+
+    def store_keys(sender, instance, update_fields=None, **kwargs):
+        keys = instance.__dict__.setdefault("_dependent_date_count_keys", {})
+        keys[label] = None
+
+        if instance._state.adding or (
+            update_fields is not None and field_name not in update_fields
+        ):
+            return
+
+        attname = sender._meta.get_field(field_name).attname
+        value = (
+            sender._base_manager.filter(pk=instance.pk)
+            .values_list(attname, flat=True)
+            .first()
+        )
+
+        # The keys are read from all rows of the instance, so only when they
+        # move to another user.
+        if value is not None and value != getattr(instance, attname):
+            keys[label] = get_keys(instance.pk)
+
+    def update_dependent_date_counts(sender, instance, **kwargs):
+        keys = instance.__dict__.get("_dependent_date_count_keys", {}).pop(label, None)
+
+        if keys is not None:
+            refresh_date_counts(model, keys | get_keys(instance.pk))
+
+    return store_keys, update_dependent_date_counts
+
+
+def get_date_count_keys(queryset):
+    """Return the pairs of a user and a date of the rows of `queryset`."""
+    date_field, user_field = DATE_ROLLUPS[queryset.model._meta.label]
+
+    return set(
+        queryset.order_by()
+        .values_list(f"{user_field}__pk", date_field)
+        .exclude(**{f"{date_field}__isnull": True})
+        .distinct()
+    )
+
+
+def get_date_rollup_models(model, fields):
+    """Return `model` and its subclasses, whose date counts depend on `fields`."""
+    fields = {model._meta.get_field(field).name for field in fields}
+
+    return [
+        candidate
+        for candidate in get_models_with_subclasses(model)
+        if candidate._meta.label in DATE_ROLLUPS
+        and fields
+        & {field.split("__")[0] for field in DATE_ROLLUPS[candidate._meta.label]}
+    ]
+
+
+@contextmanager
+def date_count_updates(queryset, fields):
+    """Recount the dates of the rows of `queryset`, whose `fields` the block
+    updates in bulk, before and after it, since it sends no signals.
+    """
+    rollup_models = get_date_rollup_models(queryset.model, fields)
+
+    if not rollup_models:
+        yield
+        return
+
+    pks = list(queryset.values_list("pk", flat=True))
+    keys = {
+        model: get_date_count_keys(model._base_manager.filter(pk__in=pks))
+        for model in rollup_models
+    }
+
+    yield
+
+    for model, model_keys in keys.items():
+        refresh_date_counts(
+            model,
+            model_keys | get_date_count_keys(model._base_manager.filter(pk__in=pks)),
+        )
+
+
+def store_date_count_keys(sender, instance, update_fields=None, **kwargs):
+    date_field, user_field = DATE_ROLLUPS[sender._meta.label]
+
+    if instance._state.adding or (
+        update_fields is not None
+        and date_field not in update_fields
+        and user_field.split("__")[0] not in update_fields
+    ):
+        instance._date_count_keys = set()
+        return
+
+    instance._date_count_keys = get_date_count_keys(
+        sender._base_manager.filter(pk=instance.pk)
+    )
+
+
+def update_date_counts(sender, instance, signal, **kwargs):
+    keys = getattr(instance, "_date_count_keys", set())
+
+    if signal is post_save:
+        keys = keys | get_date_count_keys(sender._base_manager.filter(pk=instance.pk))
+
+    for user_id, date in keys:
+        update_date_count(sender, user_id, date)
+
+    instance._date_count_keys = set()
+
+
+def update_date_count(model, user_id, date):
+    date_field, user_field = DATE_ROLLUPS[model._meta.label]
+    count = model._default_manager.filter(
+        **{date_field: date, f"{user_field}__pk": user_id}
+    ).count()
+
+    if count:
+        DateCount.objects.update_or_create(
+            model=model._meta.label,
+            user_id=user_id,
+            date=date,
+            defaults={"count": count},
+        )
+    else:
+        DateCount.objects.filter(
+            model=model._meta.label, user_id=user_id, date=date
+        ).delete()
+
+
+def refresh_date_counts(model, keys):
+    """Recount the rows of `model` of the pairs of a user and a date of `keys`.
+
+    The counts of all pairs are read with one grouped query, so it's meant
+    for the rows written in bulk, which send no signals.
+    """
+    if not keys:
+        return
+
+    date_field, user_field = DATE_ROLLUPS[model._meta.label]
+    user_ids = {user_id for user_id, date in keys}
+    dates = {date for user_id, date in keys}
+
+    counts = (
+        model._default_manager.filter(
+            **{f"{user_field}__pk__in": user_ids, f"{date_field}__in": dates}
+        )
+        .order_by()
+        .values(user_id=F(f"{user_field}__pk"), date=F(date_field))
+        .annotate(count=Count("pk"))
+    )
+
+    with transaction.atomic():
+        DateCount.objects.filter(
+            model=model._meta.label, user_id__in=user_ids, date__in=dates
+        ).delete()
+        DateCount.objects.bulk_create(
+            DateCount(
+                model=model._meta.label,
+                user_id=row["user_id"],
+                date=row["date"],
+                count=row["count"],
+            )
+            for row in counts
+        )
+
+
+def rebuild_date_counts(model):
+    """Recount all rows of `model` and return the number of stored counts."""
+    date_field, user_field = DATE_ROLLUPS[model._meta.label]
+
+    DateCount.objects.filter(model=model._meta.label).delete()
+
+    date_counts = DateCount.objects.bulk_create(
+        DateCount(
+            model=model._meta.label,
+            user_id=row["user_id"],
+            date=row["date"],
+            count=row["count"],
+        )
+        for row in model._default_manager.exclude(**{f"{date_field}__isnull": True})
+        .order_by()
+        .values(user_id=F(f"{user_field}__pk"), date=F(date_field))
+        .annotate(count=Count("pk"))
+    )
+
+    return len(date_counts)
+
+
+def get_date_hierarchy_counts(model, user_id=None, year=None, month=None):
+    """Return the counts per year, per month of `year` or per day of `month`."""
+    queryset = DateCount.objects.filter(model=model._meta.label)
+
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+
+    if year is None:
+        queryset = queryset.annotate(period=ExtractYear("date"))
+    elif month is None:
+        queryset = queryset.filter(date__year=year).annotate(
+            period=ExtractMonth("date")
+        )
+    else:
+        queryset = queryset.filter(date__year=year, date__month=month).annotate(
+            period=F("date")
+        )
+
+    return list(
+        queryset.order_by("period")
+        .values("period")
+        .annotate(total=Sum("count"))
+        .values_list("period", "total")
+    )
+
+
+def get_date_range(model, user_id=None):
+    queryset = DateCount.objects.filter(model=model._meta.label)
+
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+
+    return queryset.aggregate(first=Min("date"), last=Max("date"))
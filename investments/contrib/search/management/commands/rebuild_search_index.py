@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from investments.contrib.search.utils import SEARCH_INDEXES, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreates the search documents of the models with a search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            nargs="+",
+            default=[],
+            help="Only rebuild these models, e.g. positions.Position.",
+        )
+
+    def handle(self, *args, **options):
+        for label in SEARCH_INDEXES:
+            if options["model"] and label not in options["model"]:
+                continue
+
+            with transaction.atomic():
+                count = rebuild_search_index(apps.get_model(label))
+
+            self.write_success(f"{label}: stored {count} search documents")
+
+    def write_success(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:28
+
+from django.db import migrations, models
+
+import investments.utils.uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=investments.utils.uuid.generate_uuid,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The model label, e.g. app.Model.",
+                        max_length=254,
+                        verbose_name="Model",
+                    ),
+                ),
+                ("object_id", models.UUIDField(verbose_name="Object ID")),
+                ("content", models.TextField(verbose_name="Content")),
+            ],
+            options={
+                "verbose_name": "Search document",
+                "verbose_name_plural": "Search documents",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="searchdocument",
+            constraint=models.UniqueConstraint(
+                fields=("model", "object_id"), name="search_searchdocument_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+from django.db import migrations
+
+FTS_TABLE = "search_searchdocument_fts"
+
+# The SQLite FTS5 table keeps a copy of the documents, which the triggers
+# keep in sync with the inserts, updates and deletes of the documents table.
+SQLITE_FORWARDS = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "model UNINDEXED, object_id UNINDEXED, content)",
+    "CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, model, object_id, content) "
+    "VALUES (new.rowid, new.model, new.object_id, new.content); END",
+    "CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument "
+    f"BEGIN DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid; END",
+    "CREATE TRIGGER search_searchdocument_au AFTER UPDATE ON search_searchdocument "
+    f"BEGIN UPDATE {FTS_TABLE} SET model = new.model, object_id = new.object_id, "
+    "content = new.content WHERE rowid = old.rowid; END",
+)
+SQLITE_BACKWARDS = (
+    "DROP TRIGGER search_searchdocument_au",
+    "DROP TRIGGER search_searchdocument_ad",
+    "DROP TRIGGER search_searchdocument_ai",
+    f"DROP TABLE {FTS_TABLE}",
+)
+POSTGRESQL_FORWARDS = (
+    "CREATE INDEX search_searchdocument_content_idx ON search_searchdocument "
+    "USING GIN (to_tsvector('simple', content))",
+)
+POSTGRESQL_BACKWARDS = ("DROP INDEX search_searchdocument_content_idx",)
+
+# The indexed models with the fields their documents are made of.
+SEARCH_INDEXES = (
+    (
+        "positions",
+        "Position",
+        ("position_id", "notes", "security__name", "security__stock__symbol"),
+    ),
+    (
+        "payments",
+        "DividendPayment",
+        (
+            "notes",
+            "position__position_id",
+            "position__security__name",
+            "position__security__stock__symbol",
+        ),
+    ),
+    (
+        "payments",
+        "InterestPayment",
+        (
+            "notes",
+            "position__position_id",
+            "position__security__name",
+            "position__security__stock__symbol",
+        ),
+    ),
+    (
+        "securities",
+        "Security",
+        ("name", "stock__symbol", "stock__aliases", "stock__notes", "bond__notes"),
+    ),
+)
+
+
+def execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        execute(schema_editor, SQLITE_FORWARDS)
+    elif vendor == "postgresql":
+        execute(schema_editor, POSTGRESQL_FORWARDS)
+
+    SearchDocument = apps.get_model("search", "SearchDocument")
+
+    for app_label, model_name, fields in SEARCH_INDEXES:
+        model = apps.get_model(app_label, model_name)
+        rows = model.objects.order_by().values_list("pk", *fields)
+
+        SearchDocument.objects.bulk_create(
+            (
+                SearchDocument(
+                    model=f"{app_label}.{model_name}",
+                    object_id=pk,
+                    content=" ".join(
+                        str(value) for value in values if value not in (None, "")
+                    ),
+                )
+                for pk, *values in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        execute(schema_editor, SQLITE_BACKWARDS)
+    elif vendor == "postgresql":
+        execute(schema_editor, POSTGRESQL_BACKWARDS)
+
+    apps.get_model("search", "SearchDocument").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+        ("positions", "0005_uuid_default"),
+        ("payments", "0004_uuid_default"),
+        ("securities", "0004_security_kind"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from investments.utils.uuid import generate_uuid
+
+
+class SearchDocument(models.Model):
+    """The searchable text of a row of a model with a search index.
+
+    The full-text index over `content` is created by the migrations, since
+    it depends on the database: an FTS5 table on SQLite and a GIN index on
+    PostgreSQL.
+    """
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
+    model = models.CharField(
+        _("Model"), max_length=254, help_text=_("The model label, e.g. app.Model.")
+    )
+    object_id = models.UUIDField(_("Object ID"))
+    content = models.TextField(_("Content"))
+
+    class Meta:
+        verbose_name = _("Search document")
+        verbose_name_plural = _("Search documents")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "object_id"], name="search_searchdocument_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
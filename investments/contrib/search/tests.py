@@ -0,0 +1,179 @@
+import datetime
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from investments.contrib.brokers.models import Broker
+from investments.contrib.payments.models import DividendPayment
+from investments.contrib.positions.models import Position
+from investments.contrib.securities.constants import ENERGY
+from investments.contrib.securities.models import Security, Stock
+from investments.contrib.users.models import User
+
+from .models import SearchDocument
+from .utils import get_search_index, get_search_sql, search
+
+
+class SearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", password="x")
+        cls.broker = Broker.objects.create(name="Broker", user=cls.user)
+        cls.stock = Stock.objects.create(
+            name="Acme", symbol="ACM", sector=ENERGY, user=cls.user
+        )
+
+    def build_position(self, position_id):
+        return Position(
+            position_id=position_id,
+            units=Decimal(1),
+            open_price=Decimal(100),
+            security=self.stock,
+            broker=self.broker,
+            opened_at=timezone.make_aware(datetime.datetime(2020, 1, 1)),
+        )
+
+    def create_payment(self, position):
+        return DividendPayment.objects.create(
+            position=position, amount=Decimal(1), recorded_on=datetime.date(2020, 3, 1)
+        )
+
+    def get_content(self, obj):
+        return SearchDocument.objects.get(
+            model=get_search_index(type(obj)).model._meta.label, object_id=obj.pk
+        ).content
+
+
+class SearchDocumentTests(SearchTestCase):
+    def test_save_and_delete_sync_the_documents(self):
+        position = self.build_position("P1")
+        position.save()
+
+        self.assertEqual(self.get_content(position), "P1 Acme ACM")
+
+        position.delete()
+
+        self.assertFalse(SearchDocument.objects.filter(object_id=position.pk).exists())
+
+    def test_bulk_create_indexes_the_positions(self):
+        positions = Position.objects.bulk_create(
+            self.build_position(position_id) for position_id in ("P1", "P2")
+        )
+
+        self.assertEqual(
+            [self.get_content(position) for position in positions],
+            ["P1 Acme ACM", "P2 Acme ACM"],
+        )
+
+    def test_bulk_update_and_update_reindex_the_positions(self):
+        position = self.build_position("P1")
+        position.save()
+        payment = self.create_payment(position)
+
+        position.notes = "Hedge"
+        Position.objects.bulk_update([position], ["notes"])
+
+        self.assertEqual(self.get_content(position), "P1 Hedge Acme ACM")
+
+        Position.objects.filter(pk=position.pk).update(position_id="P2")
+
+        self.assertEqual(self.get_content(position), "P2 Hedge Acme ACM")
+        self.assertEqual(self.get_content(payment), "P2 Acme ACM")
+
+    def test_updates_reindex_the_payments(self):
+        position = self.build_position("P1")
+        position.save()
+        payment = self.create_payment(position)
+
+        DividendPayment.objects.filter(pk=payment.pk).update(notes="Special")
+
+        self.assertEqual(self.get_content(payment), "Special P1 Acme ACM")
+
+        other_position = self.build_position("P2")
+        other_position.save()
+        DividendPayment.objects.filter(pk=payment.pk).update(position=other_position)
+
+        self.assertEqual(self.get_content(payment), "Special P2 Acme ACM")
+
+        payment.notes = "Regular"
+        DividendPayment.objects.bulk_update([payment], ["notes"])
+
+        self.assertEqual(self.get_content(payment), "Regular P2 Acme ACM")
+
+    def test_renaming_a_security_updates_the_dependent_documents(self):
+        position = self.build_position("P1")
+        position.save()
+        payment = self.create_payment(position)
+
+        self.stock.name = "Globex"
+        self.stock.save()
+
+        self.assertEqual(self.get_content(position), "P1 Globex ACM")
+        self.assertEqual(self.get_content(payment), "P1 Globex ACM")
+
+    def test_bulk_updates_of_securities_update_the_dependent_documents(self):
+        position = self.build_position("P1")
+        position.save()
+        payment = self.create_payment(position)
+
+        Security.objects.filter(pk=self.stock.pk).update(name="Initech")
+        Stock.objects.filter(pk=self.stock.pk).update(symbol="INI")
+
+        self.assertEqual(self.get_content(self.stock), "Initech INI")
+        self.assertEqual(self.get_content(position), "P1 Initech INI")
+        self.assertEqual(self.get_content(payment), "P1 Initech INI")
+
+
+class SearchQueryTests(SearchTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.position = Position.objects.create(
+            position_id="P1",
+            units=Decimal(1),
+            open_price=Decimal(100),
+            security=cls.stock,
+            broker=cls.broker,
+            opened_at=timezone.make_aware(datetime.datetime(2020, 1, 1)),
+        )
+
+    def search(self, search_term):
+        return list(Position.objects.filter(pk__in=search(Position, search_term)))
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "Requires SQLite FTS5")
+    def test_matches_all_terms_as_prefixes(self):
+        self.assertEqual(self.search("ac p1"), [self.position])
+        self.assertEqual(self.search("acx"), [])
+        self.assertEqual(self.search("!"), [])
+
+    def test_searches_the_changelist_with_the_index(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        queryset, use_distinct = admin.site._registry[Position].get_search_results(
+            request, Position.objects.all(), "acme"
+        )
+
+        self.assertEqual(list(queryset), [self.position])
+        self.assertFalse(use_distinct)
+
+    def test_sqlite_query_matches_prefixes(self):
+        sql, params = get_search_sql(
+            mock.Mock(vendor="sqlite"), "positions.Position", ["acm", "p1"]
+        )
+
+        self.assertIn("MATCH %s", sql)
+        self.assertEqual(params, ('"acm"* "p1"*', "positions.Position"))
+
+    def test_postgresql_query_matches_prefixes(self):
+        sql, params = get_search_sql(
+            mock.Mock(vendor="postgresql"), "positions.Position", ["acm", "p1"]
+        )
+
+        self.assertIn("to_tsquery('simple', %s)", sql)
+        self.assertEqual(params, ("positions.Position", "acm:* & p1:*"))
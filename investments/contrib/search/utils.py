@@ -0,0 +1,282 @@
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from .models import SearchDocument
+
+INDEX_BATCH_SIZE = 1000
+FTS_TABLE = "search_searchdocument_fts"
+
+SearchIndex = namedtuple("SearchIndex", ("model", "fields", "dependencies"))
+
+# The search indexes by the label of the model they index.
+SEARCH_INDEXES = {}
+
+
+def get_models_with_subclasses(model):
+    """Return `model` and its subclasses, which send their own save signals."""
+    return [
+        candidate for candidate in apps.get_models() if issubclass(candidate, model)
+    ]
+
+
+def register_search_index(model, fields, dependencies=None):
+    """Keep a search document with the values of `fields` for each row of `model`.
+
+    `dependencies` maps the models the fields are read from to the lookup
+    from `model` to them, so their changes update the documents too.
+    """
+    index = SearchIndex(model, fields, dependencies or {})
+    SEARCH_INDEXES[model._meta.label] = index
+
+    for sender in get_models_with_subclasses(model):
+        post_save.connect(
+            update_search_document,
+            sender=sender,
+            dispatch_uid=f"update_search_document:{model._meta.label}:{sender._meta.label}",
+        )
+        post_delete.connect(
+            delete_search_document,
+            sender=sender,
+            dispatch_uid=f"delete_search_document:{model._meta.label}:{sender._meta.label}",
+        )
+
+    for related_model, lookup in index.dependencies.items():
+        receiver = get_dependency_receiver(model, lookup)
+
+        for sender in get_models_with_subclasses(related_model):
+            post_save.connect(
+                receiver,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"update_search_document:{model._meta.label}:{lookup}:{sender._meta.label}",
+            )
+
+
+def get_dependency_receiver(model, lookup):
+    def update_dependent_search_documents(sender, instance, **kwargs):
+        update_search_documents(model._default_manager.filter(**{lookup: instance.pk}))
+
+    return update_dependent_search_documents
+
+
+def get_search_index(model):
+    """Return the index of `model` or of the parent model it inherits it from."""
+    for candidate in (model, *model._meta.get_parent_list()):
+        if candidate._meta.label in SEARCH_INDEXES:
+            return SEARCH_INDEXES[candidate._meta.label]
+
+    return None
+
+
+def get_content(values):
+    return " ".join(str(value) for value in values if value not in (None, ""))
+
+
+def is_related_model(model, other_model):
+    return issubclass(model, other_model) or issubclass(other_model, model)
+
+
+def is_path_changed(model, path, fields):
+    """Return whether the value of `path` is read from the `fields` of `model`.
+
+    The paths of a parent model reach the fields of a child through its
+    name, e.g. stock__symbol.
+    """
+    name, __, rest = path.partition("__")
+
+    if name in fields:
+        return True
+
+    return name == model._meta.model_name and rest.split("__")[0] in fields
+
+
+def get_changed_search_indexes(model, fields):
+    """Return the indexed models with the lookups from them to the rows of
+    `model`, whose documents are read from the `fields` of the rows.
+    """
+    changed_indexes = []
+
+    for index in SEARCH_INDEXES.values():
+        lookups = {"pk": index.fields} if is_related_model(model, index.model) else {}
+
+        for related_model, lookup in index.dependencies.items():
+            if is_related_model(model, related_model):
+                lookups[lookup] = [
+                    path[len(lookup) + 2 :]
+                    for path in index.fields
+                    if path.startswith(f"{lookup}__")
+                ]
+
+        for lookup, paths in lookups.items():
+            if any(is_path_changed(model, path, fields) for path in paths):
+                changed_indexes.append((index.model, lookup))
+
+    return changed_indexes
+
+
+@contextmanager
+def search_index_updates(queryset, fields):
+    """Update the documents read from the `fields` of the rows of `queryset`,
+    after the block updates them in bulk, since it sends no signals.
+
+    These are the documents of the rows and of the rows of other models,
+    which depend on them, e.g. the payments of a renamed security.
+    """
+    model = queryset.model
+    changed_indexes = get_changed_search_indexes(
+        model, {model._meta.get_field(field).name for field in fields}
+    )
+
+    if not changed_indexes:
+        yield
+        return
+
+    pks = list(queryset.values_list("pk", flat=True))
+
+    yield
+
+    for index_model, lookup in changed_indexes:
+        for start in range(0, len(pks), INDEX_BATCH_SIZE):
+            update_search_documents(
+                index_model._default_manager.filter(
+                    **{f"{lookup}__in": pks[start : start + INDEX_BATCH_SIZE]}
+                )
+            )
+
+
+def update_search_documents(queryset):
+    """Store the documents of the rows of `queryset` in batches."""
+    index = get_search_index(queryset.model)
+
+    if index is None:
+        return
+
+    rows = queryset.order_by().values_list("pk", *index.fields)
+    documents = []
+
+    for pk, *values in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+        documents.append(
+            SearchDocument(
+                model=index.model._meta.label,
+                object_id=pk,
+                content=get_content(values),
+            )
+        )
+
+        if len(documents) == INDEX_BATCH_SIZE:
+            save_search_documents(documents)
+            documents = []
+
+    save_search_documents(documents)
+
+
+def save_search_documents(documents):
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=("model", "object_id"),
+            update_fields=("content",),
+        )
+
+
+def update_search_documents_by_pk(model, pks):
+    pks = list(pks)
+
+    for start in range(0, len(pks), INDEX_BATCH_SIZE):
+        update_search_documents(
+            model._default_manager.filter(pk__in=pks[start : start + INDEX_BATCH_SIZE])
+        )
+
+
+def delete_search_documents(model, pks):
+    index = get_search_index(model)
+    SearchDocument.objects.filter(
+        model=index.model._meta.label, object_id__in=pks
+    ).delete()
+
+
+def update_search_document(sender, instance, **kwargs):
+    index = get_search_index(sender)
+    update_search_documents(index.model._default_manager.filter(pk=instance.pk))
+
+
+def delete_search_document(sender, instance, **kwargs):
+    delete_search_documents(sender, [instance.pk])
+
+
+def rebuild_search_index(model):
+    """Recreate the documents of all rows of `model` and return their count."""
+    index = SEARCH_INDEXES[model._meta.label]
+
+    SearchDocument.objects.filter(model=model._meta.label).delete()
+    update_search_documents(index.model._default_manager.all())
+
+    return SearchDocument.objects.filter(model=model._meta.label).count()
+
+
+def get_search_terms(search_term):
+    return re.findall(r"\w+", search_term.lower())
+
+
+def get_search_sql(connection, label, terms):
+    """Return the query of the IDs of the documents, which have all `terms`.
+
+    Every term matches as a prefix, so the search works while typing.
+    """
+    if connection.vendor == "sqlite":
+        return (
+            f'SELECT "object_id" FROM "{FTS_TABLE}" '
+            f'WHERE "{FTS_TABLE}" MATCH %s AND "model" = %s',
+            (" ".join(f'"{term}"*' for term in terms), label),
+        )
+
+    if connection.vendor == "postgresql":
+        return (
+            'SELECT "object_id" FROM "search_searchdocument" '
+            'WHERE "model" = %s '
+            "AND to_tsvector('simple', \"content\") @@ to_tsquery('simple', %s)",
+            (label, " & ".join(f"{term}:*" for term in terms)),
+        )
+
+    return None
+
+
+def search(model, search_term):
+    """Return the IDs of the rows of `model`, whose documents match the term."""
+    label = get_search_index(model).model._meta.label
+    terms = get_search_terms(search_term)
+    documents = SearchDocument.objects.filter(model=label)
+
+    if not terms:
+        return documents.none().values("object_id")
+
+    search_sql = get_search_sql(connections[documents.db], label, terms)
+
+    if search_sql is None:
+        for term in terms:
+            documents = documents.filter(content__icontains=term)
+
+        return documents.values("object_id")
+
+    return RawSQL(*search_sql)
+
+
+class SearchIndexAdminMixin:
+    """Search the changelist and the autocomplete with the search index.
+
+    The `search_fields` are still needed for the search box and the
+    autocomplete, but they are only used for models without an index.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or get_search_index(queryset.model) is None:
+            return super().get_search_results(request, queryset, search_term)
+
+        return queryset.filter(pk__in=search(queryset.model, search_term)), False
@@ -1,21 +1,47 @@
 import json
+from decimal import Decimal
 
+from dateutil.relativedelta import relativedelta
 from django.contrib import admin
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Count, F
+from django.db.models import (
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Sum,
+    When,
+    Window,
+)
+from django.db.models.functions import Cast, Coalesce, ExtractYear, Lag, NullIf
+from django.db.models.lookups import Exact
 from django.shortcuts import render
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from investments import chart_constants
+from investments.contrib.payments.models import DividendPayment, InterestPayment
+from investments.contrib.positions.models import Position
+from investments.contrib.search.utils import SearchIndexAdminMixin
 from investments.utils.admin import get_chart_data
+from investments.utils.pivot import YEAR, build_pivot_chart_data
+from investments.utils.ranking import (
+    get_chart_offset,
+    get_top_chart_config,
+    get_top_chart_data,
+)
 
-from .constants import SECTOR_CHOICES
+from .constants import CHART_SECTORS_LIMIT, SECTOR_CHOICES
 from .models import Bond, Security, Stock
 
 
 @admin.register(Security)
-class SecuritiesAdmin(admin.ModelAdmin):
+class SecuritiesAdmin(SearchIndexAdminMixin, admin.ModelAdmin):
     search_fields = ("name",)
+    ordering = ("name",)
 
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
@@ -38,14 +64,141 @@ class SecuritiesAdmin(admin.ModelAdmin):
         return queryset, use_distinct
 
 
+def get_total_subquery(queryset, security_field, field_name, aggregate=Sum):
+    """Aggregate `field_name` of the rows related to the outer security.
+
+    Unlike joins, subqueries don't repeat the securities once per related
+    row, so the totals don't affect each other or the grouping in actions.
+    """
+    return Subquery(
+        queryset.filter(**{security_field: OuterRef("pk")})
+        .order_by()
+        .values(security_field)
+        .annotate(total=aggregate(field_name))
+        .values("total")
+    )
+
+
+def get_yearly_totals(queryset, security_field, date_field, field_name):
+    """Return the sums of `field_name` per security and year with their growth
+    over the sum of the year before, which is read with `LAG` over the years
+    of the security.
+    """
+    window = {"partition_by": F(security_field), "order_by": F("year").asc()}
+    # The zero sums are made null before `LAG`, and the previous row counts
+    # only when it is of the year before, so the growth over a year without
+    # payments is null too.
+    previous_total = Window(Lag(NullIf("total", Decimal(0))), **window)
+    previous_year = Window(Lag("year"), **window)
+
+    return (
+        queryset.order_by()
+        .annotate(year=ExtractYear(date_field))
+        .values(security_field, "year")
+        .annotate(total=Sum(field_name))
+        .annotate(
+            growth=Case(
+                When(
+                    Exact(previous_year, F("year") - 1),
+                    then=(Cast("total", FloatField()) / previous_total - 1) * 100,
+                ),
+                output_field=FloatField(),
+            )
+        )
+    )
+
+
+def get_growth_subquery(queryset, security_field, date_field, field_name, year):
+    """Return the growth of the sum of `field_name` of the rows related to the
+    outer security in `year` over the year before, in percent.
+
+    Only the rows of the two years are summed, so the last row is of `year`,
+    unless there are no rows in it.
+    """
+    return Subquery(
+        get_yearly_totals(
+            queryset.filter(
+                **{
+                    security_field: OuterRef("pk"),
+                    f"{date_field}__year__gte": year - 1,
+                    f"{date_field}__year__lte": year,
+                }
+            ),
+            security_field,
+            date_field,
+            field_name,
+        )
+        .annotate(year_growth=Case(When(year=year, then="growth")))
+        .order_by("-year")
+        .values("year_growth")[:1]
+    )
+
+
+class SecurityTotalsAdmin(SecuritiesAdmin):
+    """Show the totals of the positions and payments of each security.
+
+    They are annotated in the changelist query, so they can be sorted and
+    don't need queries per row.
+    """
+
+    payment_model = None
+
+    @admin.display(ordering="open_units", description=_("Units"))
+    def units(self, security):
+        return security.open_units.normalize() if security.open_units else None
+
+    @admin.display(ordering="open_cost", description=_("Cost basis"))
+    def cost_basis(self, security):
+        return round(security.open_cost, 2) if security.open_cost else None
+
+    @admin.display(ordering="position_count", description=_("Positions"))
+    def positions(self, security):
+        return security.position_count
+
+    @admin.display(ordering="received_amount", description=_("Received amount"))
+    def received_amount(self, security):
+        return round(security.received_amount, 2)
+
+    def get_queryset(self, request):
+        open_positions = Position.objects.filter(closed_at__isnull=True)
+
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                open_units=get_total_subquery(open_positions, "security", "units"),
+                open_cost=get_total_subquery(open_positions, "security", "open_amount"),
+                position_count=Coalesce(
+                    get_total_subquery(
+                        Position.objects.all(), "security", "uuid", Count
+                    ),
+                    0,
+                ),
+                received_amount=Coalesce(
+                    get_total_subquery(
+                        self.payment_model.objects.all(),
+                        "position__security",
+                        "amount",
+                    ),
+                    Decimal(0),
+                ),
+            )
+        )
+
+
 @admin.register(Stock)
-class StocksAdmin(SecuritiesAdmin):
-    list_filter = ("user", "sector", "created_at", "updated_at")
+class StocksAdmin(SecurityTotalsAdmin):
+    list_filter = ("user", "sector", "country", "created_at", "updated_at")
     list_display = (
         "name",
         "symbol",
         "aliases",
         "units",
+        "cost_basis",
+        "positions",
+        "received_amount",
+        "yield_on_cost_display",
+        "dividend_growth_display",
         "sector",
         "user",
         "created_at",
@@ -55,15 +208,70 @@ class StocksAdmin(SecuritiesAdmin):
     ordering = ("name",)
     date_hierarchy = "created_at"
     search_fields = ("name", "symbol", "notes")
-
-    @admin.display(description=_("Units"))
-    def units(self, stock):
-        return stock.units
+    payment_model = DividendPayment
 
     actions = [
         "get_sectors_by_number_of_companies",
+        "show_yield_on_cost",
+        "show_dividend_growth",
     ]
 
+    @admin.display(ordering="yield_on_cost", description=_("Yield on cost"))
+    def yield_on_cost_display(self, stock):
+        return (
+            f"{round(stock.yield_on_cost, 2)}%"
+            if stock.yield_on_cost is not None
+            else None
+        )
+
+    @admin.display(ordering="dividend_growth", description=_("Dividend growth"))
+    def dividend_growth_display(self, stock):
+        return (
+            f"{round(stock.dividend_growth, 2)}%"
+            if stock.dividend_growth is not None
+            else None
+        )
+
+    def get_queryset(self, request):
+        today = timezone.localdate()
+        # The yield is over the cost of the open positions, so only their
+        # dividends count.
+        trailing_payments = DividendPayment.objects.filter(
+            recorded_on__gt=today - relativedelta(years=1),
+            position__closed_at__isnull=True,
+        )
+
+        # The yield is of the last 12 months and the growth of the last
+        # complete year.
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                trailing_dividends=Subquery(
+                    trailing_payments.filter(position__security=OuterRef("pk"))
+                    .annotate(
+                        total=Window(
+                            Sum("amount"), partition_by=F("position__security")
+                        )
+                    )
+                    .values("total")[:1]
+                ),
+                yield_on_cost=ExpressionWrapper(
+                    Cast("trailing_dividends", FloatField())
+                    * 100
+                    / NullIf(F("open_cost"), Decimal(0)),
+                    output_field=FloatField(),
+                ),
+                dividend_growth=get_growth_subquery(
+                    DividendPayment.objects.all(),
+                    "position__security",
+                    "recorded_on",
+                    "amount",
+                    today.year - 1,
+                ),
+            )
+        )
+
     @admin.action(description=_("Show sectors grouped by number of companies"))
     def get_sectors_by_number_of_companies(self, request, queryset):
         queryset = (
@@ -74,10 +282,12 @@ class StocksAdmin(SecuritiesAdmin):
 
         label_map = {key: value for (key, value) in SECTOR_CHOICES}
 
-        chart_data = get_chart_data(
+        chart_data = get_top_chart_data(
             queryset=queryset,
             label=_("Received amount"),
             colors=chart_constants.COLORS,
+            limit=CHART_SECTORS_LIMIT,
+            offset=get_chart_offset(request),
             label_map=label_map,
         )
 
@@ -91,15 +301,82 @@ class StocksAdmin(SecuritiesAdmin):
                 "chart_name": _("Sectors grouped by number of companies"),
                 "chart_label": _("Sectors"),
                 "chart_type": "pie",
+                "chart_config": get_top_chart_config(
+                    request, chart_data, CHART_SECTORS_LIMIT
+                ),
+            },
+        )
+
+    @admin.action(description=_("Show yield on cost"))
+    def show_yield_on_cost(self, request, queryset):
+        queryset = (
+            queryset.filter(yield_on_cost__isnull=False)
+            .order_by("-yield_on_cost")
+            .annotate(value=F("yield_on_cost"), label=F("name"))
+            .values("label", "value")
+        )
+
+        chart_data = get_chart_data(
+            queryset=queryset,
+            label=_("Yield on cost"),
+            colors=[chart_constants.BASE_COLOR],
+        )
+
+        return render(
+            request,
+            "admin/chart.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "data": json.dumps(chart_data, cls=DjangoJSONEncoder),
+                "chart_name": _("Yield on cost of the last 12 months"),
+                "chart_type": chart_constants.BAR_CHART,
+            },
+        )
+
+    @admin.action(description=_("Show dividend growth"))
+    def show_dividend_growth(self, request, queryset):
+        rows = get_yearly_totals(
+            DividendPayment.objects.filter(position__security__in=queryset),
+            "position__security",
+            "recorded_on",
+            "amount",
+        ).values_list("position__security__name", "year", "growth")
+
+        # The growth is computed in the query, so the rows of the first year
+        # of each security, which have none, are left out only afterwards.
+        chart_data = build_pivot_chart_data(
+            (row for row in rows if row[2] is not None), YEAR
+        )
+
+        return render(
+            request,
+            "admin/chart.html",
+            context={
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "data": json.dumps(chart_data, cls=DjangoJSONEncoder),
+                "chart_name": _("Dividend growth per year"),
+                "chart_type": chart_constants.LINE_CHART,
             },
         )
 
 
 @admin.register(Bond)
-class BondsAdmin(SecuritiesAdmin):
-    list_filter = ("user", "created_at", "updated_at")
-    list_display = ("name", "user", "created_at", "updated_at")
+class BondsAdmin(SecurityTotalsAdmin):
+    list_filter = ("user", "country", "created_at", "updated_at")
+    list_display = (
+        "name",
+        "units",
+        "cost_basis",
+        "positions",
+        "received_amount",
+        "user",
+        "created_at",
+        "updated_at",
+    )
     list_per_page = 50
     date_hierarchy = "created_at"
     ordering = ("name",)
     search_fields = ("name", "notes")
+    payment_model = InterestPayment
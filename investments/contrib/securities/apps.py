@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class SecuritiesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "investments.contrib.securities"
+
+    def ready(self):
+        from investments.contrib.search.utils import register_search_index
+
+        from .models import Security
+
+        register_search_index(
+            Security,
+            ("name", "stock__symbol", "stock__aliases", "stock__notes", "bond__notes"),
+        )
@@ -42,3 +42,15 @@ BOND_TYPE_CHOICES = (
     (GOVERNMENT_BOND, _("Government bond")),
     (CORPORATE_BOND, _("Corporate bond")),
 )
+
+STOCK = "stock"
+BOND = "bond"
+
+KIND_CHOICES = (
+    (STOCK, _("Stock")),
+    (BOND, _("Bond")),
+)
+
+# The sectors with the largest values shown in the pie charts. The rest are
+# shown together.
+CHART_SECTORS_LIMIT = 10
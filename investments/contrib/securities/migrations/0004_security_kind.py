@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def backfill_kind(apps, schema_editor):
+    Security = apps.get_model("securities", "Security")
+
+    Security.objects.filter(stock__isnull=False).update(kind="stock")
+    Security.objects.filter(bond__isnull=False).update(kind="bond")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("securities", "0003_uuid_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="security",
+            name="kind",
+            field=models.CharField(
+                blank=True,
+                choices=[("stock", "Stock"), ("bond", "Bond")],
+                default="",
+                editable=False,
+                max_length=16,
+                verbose_name="Kind",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_kind, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("securities", "0004_security_kind"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="security",
+            name="country",
+            field=models.CharField(
+                blank=True,
+                help_text="The ISO 3166 code of the country of the issuer, whose tax rates apply to the payments.",
+                max_length=2,
+                verbose_name="Country",
+            ),
+        ),
+    ]
@@ -1,23 +1,72 @@
-import uuid
+from contextlib import contextmanager
 
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import Sum
 from django.utils.translation import gettext_lazy as _
 
+from investments.contrib.search.utils import search_index_updates
 from investments.models import TimestampedModel
+from investments.utils.uuid import generate_uuid
 
 from . import constants
 
 UserModel = get_user_model()
 
 
+class SecurityQuerySet(models.QuerySet):
+    """Keep the search documents and the payment cube in sync in bulk."""
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+
+        with self._bulk_updates(self.filter(pk__in=[obj.pk for obj in objs]), fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        with self._bulk_updates(self, kwargs):
+            return super().update(**kwargs)
+
+    update.alters_data = True
+
+    @contextmanager
+    def _bulk_updates(self, queryset, fields):
+        # The cube reads the securities, so it's imported when it's used.
+        from investments.contrib.payments.cube import payment_cube_updates
+
+        with search_index_updates(queryset, fields), payment_cube_updates(
+            queryset, fields
+        ):
+            yield
+
+
 class Security(TimestampedModel):
-    uuid = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    # The kind of the child model, so the security can be linked or
+    # displayed without querying the child tables.
+    KIND = ""
+
+    uuid = models.UUIDField(default=generate_uuid, primary_key=True)
     name = models.CharField(_("Name"), max_length=254)
     user = models.ForeignKey(
         UserModel, related_name="securities", on_delete=models.CASCADE
     )
+    kind = models.CharField(
+        _("Kind"),
+        max_length=16,
+        choices=constants.KIND_CHOICES,
+        editable=False,
+        blank=True,
+    )
+    country = models.CharField(
+        _("Country"),
+        max_length=2,
+        blank=True,
+        help_text=_(
+            "The ISO 3166 code of the country of the issuer, whose tax rates apply to the payments."
+        ),
+    )
+
+    objects = SecurityQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Security")
@@ -26,8 +75,18 @@ class Security(TimestampedModel):
     def __str__(self):
         return self.name
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # The kind is the default of the child models, so the rows written
+        # without `save`, in bulk or raw, have it too.
+        if self.KIND:
+            self.kind = self.KIND
+
 
 class Stock(Security):
+    KIND = constants.STOCK
+
     symbol = models.CharField(_("Symbol"), max_length=254)
     aliases = models.CharField(
         _("Aliases"),
@@ -65,6 +124,8 @@ class Stock(Security):
 
 
 class Bond(Security):
+    KIND = constants.BOND
+
     type = models.CharField(
         _("Type"),
         max_length=64,
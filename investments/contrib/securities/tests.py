@@ -1 +1,141 @@
-# Create your tests here.
+import datetime
+from decimal import Decimal
+
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from investments.contrib.brokers.models import Broker
+from investments.contrib.payments.models import DividendPayment
+from investments.contrib.positions.models import Position
+from investments.contrib.users.models import User
+
+from .admin import StocksAdmin, get_growth_subquery, get_yearly_totals
+from .constants import BOND, ENERGY, STOCK
+from .models import Bond, Security, Stock
+
+
+class SecurityKindTests(TestCase):
+    def test_child_models_default_to_their_kind(self):
+        self.assertEqual(Security(name="Security").kind, "")
+        self.assertEqual(Stock(name="Stock").kind, STOCK)
+        self.assertEqual(Bond(name="Bond").kind, BOND)
+
+    def test_loads_the_kind_of_deferred_rows_without_a_query(self):
+        user = User.objects.create_user(email="user@example.com", password="x")
+        Stock.objects.create(name="Stock", symbol="STK", sector=ENERGY, user=user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Stock.objects.only("name").get().kind, STOCK)
+
+
+class DividendMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email="user@example.com", password="x")
+        cls.stock = Stock.objects.create(
+            name="Stock", symbol="STK", sector=ENERGY, user=user
+        )
+        cls.position = Position.objects.create(
+            position_id="1",
+            units=Decimal(10),
+            open_price=Decimal(100),
+            security=cls.stock,
+            broker=Broker.objects.create(name="Broker", user=user),
+            opened_at=timezone.make_aware(datetime.datetime(2019, 1, 1)),
+        )
+
+    def create_payments(self, amounts):
+        for year, amount in amounts.items():
+            DividendPayment.objects.create(
+                position=self.position,
+                amount=amount,
+                recorded_on=datetime.date(year, 6, 1),
+            )
+
+    def get_growth(self):
+        return {
+            year: growth
+            for year, growth in get_yearly_totals(
+                DividendPayment.objects.all(),
+                "position__security",
+                "recorded_on",
+                "amount",
+            ).values_list("year", "growth")
+        }
+
+    def get_growth_of_year(self, year):
+        return (
+            Stock.objects.annotate(
+                growth=get_growth_subquery(
+                    DividendPayment.objects.all(),
+                    "position__security",
+                    "recorded_on",
+                    "amount",
+                    year,
+                )
+            )
+            .get()
+            .growth
+        )
+
+    def test_growth_over_the_year_before(self):
+        self.create_payments({2020: Decimal(10), 2021: Decimal(12)})
+
+        growth = self.get_growth()
+
+        self.assertIsNone(growth[2020])
+        self.assertAlmostEqual(growth[2021], 20)
+        self.assertAlmostEqual(self.get_growth_of_year(2021), 20)
+
+    def test_no_growth_over_a_year_without_payments(self):
+        self.create_payments({2020: Decimal(10), 2022: Decimal(3)})
+
+        self.assertEqual(self.get_growth(), {2020: None, 2022: None})
+        self.assertIsNone(self.get_growth_of_year(2022))
+
+    def test_yield_on_cost_of_the_last_12_months(self):
+        today = timezone.localdate()
+        DividendPayment.objects.create(
+            position=self.position,
+            amount=Decimal(25),
+            recorded_on=today - datetime.timedelta(days=30),
+        )
+        DividendPayment.objects.create(
+            position=self.position,
+            amount=Decimal(40),
+            recorded_on=today - datetime.timedelta(days=400),
+        )
+
+        stock = (
+            StocksAdmin(Stock, admin.site).get_queryset(RequestFactory().get("/")).get()
+        )
+
+        self.assertAlmostEqual(stock.yield_on_cost, 2.5)
+
+    def test_yield_on_cost_leaves_the_closed_positions_out(self):
+        today = timezone.localdate()
+        closed_position = Position.objects.create(
+            position_id="2",
+            units=Decimal(10),
+            open_price=Decimal(50),
+            close_price=Decimal(60),
+            security=self.stock,
+            broker=self.position.broker,
+            opened_at=timezone.make_aware(datetime.datetime(2019, 1, 1)),
+            closed_at=timezone.now() - datetime.timedelta(days=10),
+        )
+
+        for position, amount in ((self.position, 25), (closed_position, 15)):
+            DividendPayment.objects.create(
+                position=position,
+                amount=Decimal(amount),
+                recorded_on=today - datetime.timedelta(days=30),
+            )
+
+        stock = (
+            StocksAdmin(Stock, admin.site).get_queryset(RequestFactory().get("/")).get()
+        )
+
+        self.assertEqual(stock.open_cost, Decimal(1000))
+        self.assertAlmostEqual(stock.yield_on_cost, 2.5)
@@ -6,6 +6,7 @@ from django.shortcuts import render
 from django.utils.timezone import make_aware
 from decimal import Decimal
 from investments.contrib.currencies.models import ExchangeRate
+from investments.contrib.jobs.utils import run_in_background
 from datetime import timedelta
 
 from .models import Statement
@@ -23,6 +24,7 @@ class StatementsAdmin(admin.ModelAdmin):
     ]
 
     @admin.action(description=_("Show sales report"))
+    @run_in_background
     def show_sales_report(self, request, queryset):
         file = queryset.first().statement
         df = pandas.read_csv(file)
@@ -109,6 +111,7 @@ class StatementsAdmin(admin.ModelAdmin):
         )
 
     @admin.action(description=_("Show payment report"))
+    @run_in_background
     def show_payment_report(self, request, queryset):
         file = queryset.first().statement
         df = pandas.read_csv(file)
@@ -10,3 +10,4 @@ class TagAdmin(admin.ModelAdmin):
     list_per_page = 15
     date_hierarchy = "created_at"
     search_fields = ("name",)
+    ordering = ("name",)
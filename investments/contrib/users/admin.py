@@ -23,3 +23,13 @@ class UserAdmin(BaseUserAdmin):
             },
         ),
     )
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, use_distinct = super().get_search_results(
+            request, queryset, search_term
+        )
+
+        if "autocomplete/" in request.path and not request.user.is_superuser:
+            queryset = queryset.filter(pk=request.user.pk)
+
+        return queryset, use_distinct
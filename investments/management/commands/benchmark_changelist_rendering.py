@@ -0,0 +1,58 @@
+import time
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from investments.contrib.payments.models import DividendPayment
+from investments.contrib.positions.models import Position
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Measure the changelist render time and query count against the page size"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", nargs="+", type=int, default=[100, 1000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        user = UserModel.objects.filter(is_active=True, is_superuser=True).first()
+
+        if not user:
+            raise CommandError("There is no superuser to render the changelists as.")
+
+        self.stdout.write(f"{'Changelist':>20} {'Rows':>8} {'Time':>9} {'Queries':>8}")
+
+        for model in (Position, DividendPayment):
+            model_admin = admin.site._registry[model]
+            url = reverse(
+                f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+            )
+            list_per_page = model_admin.list_per_page
+
+            try:
+                for row_count in options["rows"]:
+                    model_admin.list_per_page = row_count
+                    timings = []
+
+                    for _ in range(options["repeat"]):
+                        request = RequestFactory().get(url)
+                        request.user = user
+
+                        with CaptureQueriesContext(connection) as context:
+                            start = time.perf_counter()
+                            model_admin.changelist_view(request).render()
+                            timings.append(time.perf_counter() - start)
+
+                    self.stdout.write(
+                        f"{model._meta.model_name:>20} {row_count:>8} "
+                        f"{min(timings):>8.3f}s {len(context.captured_queries):>8}"
+                    )
+            finally:
+                model_admin.list_per_page = list_per_page
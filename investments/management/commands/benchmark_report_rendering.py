@@ -0,0 +1,193 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from investments.contrib.currencies.models import ExchangeRate
+from investments.contrib.payments.models import DividendPayment
+from investments.contrib.payments.reports import build_payment_report_rows
+from investments.contrib.positions.reports import build_position_report_rows
+
+UserModel = get_user_model()
+
+# The row markup of the payment report before the computations were moved out
+# of the template. It is kept only as a baseline for the comparison.
+TEMPLATE_TAGS_PAYMENT_ROWS = Template("""{% load rates taxes %}{% for row in data %}
+{% get_local_currency_rate row.recorded_on exchange_rates as exchange_rate %}
+<tr>
+  <td>{{ forloop.counter }}</td>
+  <td>{{ row.recorded_on }}</td>
+  <td>{{ row.position__security__name }}</td>
+  <td>{{ row.total_received_amount|floatformat:2 }}</td>
+  <td>{{ row.total_withheld_tax|floatformat:2 }}</td>
+  <td>{{ row.gross_amount|floatformat:2 }}</td>
+  <td>{{ row|calculate_tax|floatformat:2 }}</td>
+  <td>{{ exchange_rate }}</td>
+  <td>{{ row.total_received_amount|to_local_currency:exchange_rate|floatformat:2 }}</td>
+  <td>{{ row.total_withheld_tax|to_local_currency:exchange_rate|floatformat:2 }}</td>
+  <td>{{ row.gross_amount|to_local_currency:exchange_rate|floatformat:2 }}</td>
+  <td>{{ row|calculate_tax|to_local_currency:exchange_rate|floatformat:2 }}</td>
+</tr>
+{% endfor %}""")
+
+
+class Command(BaseCommand):
+    help = "Measure the report computation and render time against the row count"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", nargs="+", type=int, default=[100, 1000, 10000, 50000]
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        request = RequestFactory().get("/")
+        request.user = UserModel(is_active=True, is_staff=True, is_superuser=True)
+        context = {
+            **admin.site.each_context(request),
+            "opts": DividendPayment._meta,
+        }
+
+        self.stdout.write(
+            f"{'Rows':>8} {'Payments build':>15} {'Payments render':>16} "
+            f"{'Template tags':>14} {'Positions build':>16} {'Positions JSON':>15}"
+        )
+
+        for row_count in options["rows"]:
+            payment_rows, position_rows, exchange_rates = self.get_rows(row_count)
+
+            payments_build = self.measure(
+                lambda: build_payment_report_rows(payment_rows, exchange_rates), repeat
+            )
+            report_rows = build_payment_report_rows(payment_rows, exchange_rates)
+            payments_render = self.measure(
+                lambda: render_to_string(
+                    "admin/payments/payment_report.html",
+                    {**context, "data": report_rows},
+                    request=request,
+                ),
+                repeat,
+            )
+            template_tags_render = self.measure(
+                lambda: TEMPLATE_TAGS_PAYMENT_ROWS.render(
+                    Context({"data": payment_rows, "exchange_rates": exchange_rates})
+                ),
+                repeat,
+            )
+            positions_build = self.measure(
+                lambda: build_position_report_rows(position_rows, True), repeat
+            )
+            position_report_rows = build_position_report_rows(position_rows, True)
+            positions_json = self.measure(
+                lambda: json.dumps(position_report_rows, cls=DjangoJSONEncoder),
+                repeat,
+            )
+
+            self.stdout.write(
+                f"{row_count:>8} {payments_build:>14.3f}s {payments_render:>15.3f}s "
+                f"{template_tags_render:>13.3f}s {positions_build:>15.3f}s "
+                f"{positions_json:>14.3f}s"
+            )
+
+    def measure(self, function, repeat):
+        timings = []
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+
+        return min(timings)
+
+    def get_rows(self, row_count):
+        random.seed(row_count)
+        start_date = date(2015, 1, 1)
+        days = max(row_count // 10, 1)
+
+        exchange_rates = {
+            (start_date + timedelta(days=day)).isoformat(): ExchangeRate(
+                date=start_date + timedelta(days=day),
+                rate=Decimal("1.7") + Decimal(day % 40) / 100,
+            )
+            for day in range(days + 365)
+        }
+
+        payment_rows = []
+        position_rows = []
+
+        for index in range(row_count):
+            recorded_on = start_date + timedelta(days=index * days // row_count)
+            amount = Decimal(random.randint(1, 10000)) / 100
+            withheld_tax = amount * Decimal("0.15") if index % 2 else Decimal(0)
+            units = Decimal(random.randint(1, 100))
+            open_price = Decimal(random.randint(100, 50000)) / 100
+            close_price = (
+                Decimal(random.randint(100, 50000)) / 100 if index % 3 else None
+            )
+            closed_on = (
+                recorded_on + timedelta(days=index % 365) if close_price else None
+            )
+            # The local amounts are converted by the report query.
+            open_rate = exchange_rates[recorded_on.isoformat()].rate
+            close_rate = (
+                exchange_rates[closed_on.isoformat()].rate if closed_on else None
+            )
+            open_amount = units * open_price
+            close_amount = units * close_price if close_price else None
+
+            payment_rows.append(
+                {
+                    "recorded_on": recorded_on,
+                    "position__security__name": f"Security {index % 300}",
+                    "total_received_amount": amount,
+                    "total_withheld_tax": withheld_tax,
+                    "gross_amount": amount + withheld_tax,
+                }
+            )
+            position_rows.append(
+                {
+                    "opened_on": recorded_on,
+                    "closed_on": closed_on,
+                    "security__name": f"Security {index % 300}",
+                    "total_open_amount": open_amount,
+                    "total_close_amount": close_amount,
+                    "unrealized_amount": None if close_price else open_amount,
+                    "profit_or_loss": (
+                        close_amount - open_amount if close_price else None
+                    ),
+                    "average_open_price": open_price,
+                    "average_close_price": close_price,
+                    "units": units,
+                    "position_count": 1,
+                    "exchange_rate_at_open": open_rate,
+                    "exchange_rate_at_close": close_rate,
+                    "open_amount_local": open_amount * open_rate,
+                    "close_amount_local": (
+                        close_amount * close_rate if close_price else None
+                    ),
+                    "profit_or_loss_local": (
+                        close_amount * close_rate - open_amount * open_rate
+                        if close_price
+                        else None
+                    ),
+                    "unrealized_amount_local": (
+                        None if close_price else open_amount * open_rate
+                    ),
+                    "average_open_price_local": open_price * open_rate,
+                    "average_close_price_local": (
+                        close_price * close_rate if close_price else None
+                    ),
+                }
+            )
+
+        return payment_rows, position_rows, exchange_rates
@@ -0,0 +1,114 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from investments.utils.uuid import uuid7
+
+TABLE_NAME = "benchmark_uuid_inserts"
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+class Command(BaseCommand):
+    help = "Compare the insert throughput and index size of random and time-ordered UUID keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"{connection.vendor} is not supported.")
+
+        self.stdout.write(
+            f"{'Key':>6} {'Rows':>9} {'Seconds':>9} {'Rows/s':>9} "
+            f"{'PK index':>10} {'FK index':>10}"
+        )
+
+        for name, generator in GENERATORS.items():
+            duration, pk_size, fk_size = self.measure(
+                generator, options["rows"], options["batch_size"]
+            )
+
+            self.stdout.write(
+                f"{name:>6} {options['rows']:>9} {duration:>9.2f} "
+                f"{options['rows'] / duration:>9.0f} "
+                f"{pk_size / 1024:>8.0f}KB {fk_size / 1024:>8.0f}KB"
+            )
+
+    def measure(self, generator, row_count, batch_size):
+        """Insert the rows into a table with the layout of the app tables.
+
+        The table has a UUID primary key and an indexed UUID column, which
+        plays the role of a foreign key to another table with the same keys.
+        """
+        uuid_type = models.UUIDField().db_type(connection)
+        quote = connection.ops.quote_name
+        table = quote(TABLE_NAME)
+        parent_keys = [generator() for _ in range(max(row_count // 100, 1))]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TABLE {table} (uuid {uuid_type} PRIMARY KEY, "
+                f"parent_id {uuid_type} NOT NULL, created_at "
+                f"{models.DateTimeField().db_type(connection)} NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX {quote(TABLE_NAME + '_parent')} "
+                f"ON {table} (parent_id)"
+            )
+
+            sql = (
+                f"INSERT INTO {table} (uuid, parent_id, created_at) VALUES (%s, %s, %s)"
+            )
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+            start = time.perf_counter()
+
+            for offset in range(0, row_count, batch_size):
+                rows = [
+                    (
+                        self.to_db(generator()),
+                        self.to_db(parent_keys[index % len(parent_keys)]),
+                        now,
+                    )
+                    for index in range(offset, min(offset + batch_size, row_count))
+                ]
+
+                # Each batch is committed, like the batches of an import.
+                with transaction.atomic():
+                    cursor.executemany(sql, rows)
+
+            duration = time.perf_counter() - start
+
+            pk_size, fk_size = self.get_index_sizes(cursor)
+            cursor.execute(f"DROP TABLE {table}")
+
+        return duration, pk_size, fk_size
+
+    def to_db(self, value):
+        return models.UUIDField().get_db_prep_value(value, connection)
+
+    def get_index_sizes(self, cursor):
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT pg_relation_size(%s), pg_relation_size(%s)",
+                (f"{TABLE_NAME}_pkey", f"{TABLE_NAME}_parent"),
+            )
+
+            return cursor.fetchone()
+
+        # The automatic index of the primary key is named after the table.
+        cursor.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN (%s, %s) GROUP BY name",
+            (f"sqlite_autoindex_{TABLE_NAME}_1", f"{TABLE_NAME}_parent"),
+        )
+        sizes = dict(cursor.fetchall())
+
+        return (
+            sizes.get(f"sqlite_autoindex_{TABLE_NAME}_1", 0),
+            sizes.get(f"{TABLE_NAME}_parent", 0),
+        )
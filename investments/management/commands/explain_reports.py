@@ -0,0 +1,204 @@
+import re
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from investments.utils.admin import get_changelist_queryset
+
+UserModel = get_user_model()
+
+# The lines of the query plan, which read a whole table instead of an index.
+# Scans of unfiltered queries are expected, so only filtered ones are flagged.
+FULL_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSCAN (?!.*\bUSING (?:COVERING )?INDEX\b)(\w+)"),
+    "postgresql": re.compile(r"\bSeq Scan on (\w+)"),
+}
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+
+class Command(BaseCommand):
+    help = "Explain the queries of the admin changelists and actions and flag full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            nargs="+",
+            default=[],
+            help="Only check these models, e.g. positions.Position.",
+        )
+        parser.add_argument(
+            "--params",
+            type=str,
+            default="",
+            help=(
+                "Changelist query string, which filters the selection of the "
+                "actions, e.g. security__user__id__exact=1."
+            ),
+        )
+        parser.add_argument(
+            "--user",
+            type=str,
+            help="Email of the user to run the actions as. Defaults to the first superuser.",
+        )
+        parser.add_argument(
+            "--ignore-table",
+            nargs="+",
+            default=[],
+            help="Tables, which are small enough to be scanned.",
+        )
+        parser.add_argument(
+            "--fail",
+            action="store_true",
+            help="Exit with an error when a full table scan is found.",
+        )
+        parser.add_argument(
+            "--verbose-plan",
+            action="store_true",
+            help="Print the whole query plans.",
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+
+        if vendor not in EXPLAIN_PREFIXES:
+            raise CommandError(f"EXPLAIN is not supported for {vendor}.")
+
+        user = self.get_user(options["user"])
+        self.ignored_tables = set(options["ignore_table"])
+        self.verbose_plan = options["verbose_plan"]
+        scan_count = 0
+
+        for model, model_admin in admin.site._registry.items():
+            if options["model"] and model._meta.label not in options["model"]:
+                continue
+
+            url = reverse(
+                f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+            )
+
+            request = RequestFactory().get(url, QueryDict(options["params"]))
+            request.user = user
+            request.is_report_worker = True
+
+            try:
+                queryset = get_changelist_queryset(model_admin, request)
+            except IncorrectLookupParameters:
+                self.write_warning(f"{model._meta.label}: the params don't apply")
+                continue
+
+            scan_count += self.explain(
+                f"{model._meta.label} changelist",
+                lambda: model_admin.changelist_view(request).render(),
+            )
+
+            actions = model_admin.get_actions(request)
+
+            for name, (function, *__) in actions.items():
+                if name == "delete_selected":
+                    continue
+
+                request.is_report_worker = True
+
+                # The actions get a copy of the selection of the changelist
+                # filters, so the queries of each of them are captured.
+                scan_count += self.explain(
+                    f"{model._meta.label} {name}",
+                    lambda: self.render(function(model_admin, request, queryset.all())),
+                )
+
+        if scan_count:
+            message = f"Found {scan_count} full table scans"
+
+            if options["fail"]:
+                raise CommandError(message)
+
+            self.write_warning(message)
+        else:
+            self.write_success("No full table scans found")
+
+    def get_user(self, email):
+        users = UserModel.objects.filter(is_active=True)
+        user = (
+            users.filter(email=email).first()
+            if email
+            else users.filter(is_superuser=True).first()
+        )
+
+        if not user:
+            raise CommandError("There is no user to run the actions as.")
+
+        return user
+
+    def render(self, response):
+        if hasattr(response, "render"):
+            response.render()
+
+        if getattr(response, "streaming", False):
+            b"".join(response.streaming_content)
+
+    def explain(self, name, function):
+        """Run `function` in a rolled back transaction and explain its queries."""
+        with transaction.atomic(), CaptureQueriesContext(connection) as context:
+            try:
+                function()
+            except Exception as error:
+                self.write_error(f"{name}: {error}")
+            finally:
+                transaction.set_rollback(True)
+
+        scan_count = 0
+
+        for query in context.captured_queries:
+            sql = query["sql"]
+
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+
+            if " WHERE " not in sql:
+                continue
+
+            plan = self.get_plan(sql)
+            scans = {
+                table
+                for table in FULL_SCAN_PATTERNS[connection.vendor].findall(plan)
+                if table not in self.ignored_tables
+            }
+
+            if self.verbose_plan:
+                self.stdout.write(f"{sql}\n{plan}\n")
+
+            if scans:
+                scan_count += 1
+                self.write_warning(
+                    f"{name}: full scan of {', '.join(sorted(scans))}\n  {sql}"
+                )
+
+        if not scan_count:
+            self.write_success(f"{name}: {len(context.captured_queries)} queries")
+
+        return scan_count
+
+    def get_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN_PREFIXES[connection.vendor] + sql)
+
+            return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+
+    def write_success(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def write_warning(self, message):
+        self.stdout.write(self.style.WARNING(message))
+
+    def write_error(self, message):
+        self.stdout.write(self.style.ERROR(message))
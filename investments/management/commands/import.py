@@ -8,6 +8,7 @@ from django.core.management.base import BaseCommand
 from django.utils.timezone import make_aware
 
 from investments.contrib.brokers.models import Broker
+from investments.contrib.payments.cube import deferred_payment_cube_updates
 from investments.contrib.payments.models import DividendPayment
 from investments.contrib.positions.models import Position
 from investments.contrib.securities.models import Stock
@@ -43,7 +44,9 @@ class Command(BaseCommand):
         )
 
         self.handle_positions(workbook, user, broker)
-        self.handle_dividends(workbook)
+
+        with deferred_payment_cube_updates():
+            self.handle_dividends(workbook)
 
         workbook.close()
 
@@ -89,52 +92,43 @@ class Command(BaseCommand):
 
     def handle_dividends(self, workbook):
         worksheet = workbook["Dividends"]
+        rows = list(worksheet.iter_rows(min_row=2, values_only=True))
+        # The cells of the numeric IDs are read as numbers, while the IDs are
+        # stored as strings, so both are compared as strings.
+        positions = {
+            position.position_id: position
+            for position in Position.objects.filter(
+                position_id__in={str(row[5]) for row in rows}
+            )
+        }
+        payments = []
 
-        for row in worksheet.iter_rows(min_row=2):
-            date = row[0]
-            aware_date = make_aware(datetime.strptime(date.value, "%d/%m/%Y"))
-
-            received_dividend = row[2]
-            withheld_tax_rate = Decimal(re.findall(r"\d+", row[3].value)[0])
-            withheld_tax = Decimal(str(row[4].value))
-
-            position_id = row[5]
-
-            position = Position.objects.filter(position_id=position_id.value).first()
+        for row in rows:
+            position = positions.get(str(row[5]))
 
             if not position:
-                self.write_error(f"Failed to find {position_id.value}. Skipping.")
+                self.write_error(f"Failed to find {row[5]}. Skipping.")
                 continue
 
-            payment, created = DividendPayment.objects.get_or_create(
-                position=position,
-                amount=received_dividend.value,
-                recorded_on=aware_date,
-                defaults={
-                    "withheld_tax": withheld_tax,
-                    "withheld_tax_rate": withheld_tax_rate,
-                },
+            payments.append(
+                DividendPayment(
+                    position=position,
+                    amount=Decimal(str(row[2])),
+                    recorded_on=datetime.strptime(row[0], "%d/%m/%Y").date(),
+                    withheld_tax=Decimal(str(row[4])),
+                    withheld_tax_rate=Decimal(re.findall(r"\d+", row[3])[0]),
+                )
             )
 
-            if created:
-                self.write_success(
-                    f"Successfully created payment for {position.position_id} ({position.security.name}) "
-                    f"with received amount {payment.amount} recorded on {payment.recorded_on} with id {payment.uuid}."
-                )
-            else:
-                self.write_warning(
-                    f"Found existing payment for {position.position_id} ({position.security.name}) with id {payment.uuid}"
-                )
+        # The payments, which were already imported, only get the tax data.
+        created, updated = DividendPayment.objects.bulk_upsert(payments)
 
-                if not payment.withheld_tax or not payment.withheld_tax_rate:
-                    payment.withheld_tax = withheld_tax
-                    payment.withheld_tax_rate = withheld_tax_rate
-                    payment.save(update_fields=("withheld_tax", "withheld_tax_rate"))
+        self.write_success(f"Successfully created {len(created)} payments.")
 
-                    self.write_success(
-                        f"The existing payment for {position.position_id} ({position.security.name}) with id {payment.uuid} "
-                        f"had no tax data. It was successfully updated with witheld tax {withheld_tax} and rate {withheld_tax_rate}%."
-                    )
+        if updated:
+            self.write_warning(
+                f"Found {len(updated)} existing payments. Their withheld tax was updated."
+            )
 
     def handle_positions(self, workbook, user, broker):
         worksheet = workbook["Account Activity"]
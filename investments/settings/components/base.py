@@ -43,6 +43,9 @@ INSTALLED_APPS = [
     "investments.contrib.payments.apps.PaymentsConfig",
     "investments.contrib.currencies.apps.CurrenciesConfig",
     "investments.contrib.statements.apps.StatementsConfig",
+    "investments.contrib.jobs.apps.JobsConfig",
+    "investments.contrib.rollups.apps.RollupsConfig",
+    "investments.contrib.search.apps.SearchConfig",
 ]
 
 ROOT_URLCONF = "investments.urls"
@@ -65,3 +68,13 @@ MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
+
+# Generate time-ordered (version 7) instead of random UUID primary keys for
+# the new rows. They keep the inserts at the end of the indexes.
+
+TIME_ORDERED_UUIDS = False
+
+# The labels of the models, whose changelists estimate the count of large
+# results instead of counting all the rows, e.g. "positions.Position".
+
+ESTIMATED_COUNT_MODELS = []
@@ -0,0 +1,43 @@
+document.addEventListener("DOMContentLoaded", function () {
+  "use strict";
+
+  const $ = window.jQuery;
+
+  $(".autocomplete-filter")
+    .not(".select2-hidden-accessible")
+    .each(function () {
+      const $select = $(this);
+
+      $select.select2({
+        width: "100%",
+        allowClear: true,
+        placeholder: $select.data("placeholder"),
+        ajax: {
+          url: $select.data("url"),
+          dataType: "json",
+          delay: 250,
+          data: function (params) {
+            return {
+              term: params.term,
+              page: params.page,
+              app_label: $select.data("appLabel"),
+              model_name: $select.data("modelName"),
+              field_name: $select.data("fieldName"),
+            };
+          },
+        },
+      });
+
+      // The search form submits every named field, so an empty filter has
+      // to be left without a name to not become an invalid lookup.
+      $select
+        .on("change", function () {
+          if ($select.val()) {
+            $select.attr("name", $select.data("name"));
+          } else {
+            $select.removeAttr("name");
+          }
+        })
+        .trigger("change");
+    });
+});
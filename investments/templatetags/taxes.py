@@ -1,14 +1,14 @@
 from django import template
 
+from investments.contrib.payments import reports
+
 register = template.Library()
 
 
 @register.filter
-def calculate_tax(value, percentage=10):
-    return (
-        value.get("gross_amount") * percentage / 100
-        if not value.get("total_withheld_tax")
-        else 0
+def calculate_tax(value, percentage=reports.TAX_PERCENTAGE):
+    return reports.calculate_tax(
+        value.get("gross_amount"), value.get("total_withheld_tax"), percentage
     )
 
 
@@ -1,97 +1,151 @@
-from datetime import datetime, timedelta
+import copy
+from contextvars import ContextVar
 
-from dateutil.relativedelta import relativedelta
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.urls import get_script_prefix, reverse
+from django.utils import translation
 
 from investments import chart_constants
 
+from .pagination import EXACT_COUNT_VAR
 
-def get_chart_data(queryset, label, colors, label_map=None):
-    if label_map:
-        labels = [label_map[report["label"]] for report in queryset]
-    else:
-        labels = [report["label"] for report in queryset]
 
-    datasets = [
-        {
-            "label": label,
-            "data": [report["value"] for report in queryset],
-            "backgroundColor": colors,
-        }
-    ]
+class FilteredChangeList(ChangeList):
+    def get_results(self, request):
+        # Only the filtered queryset is needed, so the count and page queries
+        # are skipped.
+        pass
+
+
+URL_PLACEHOLDER = "__pk__"
+
+# The URL templates of the changelist being rendered by the view, the
+# language and the script prefix.
+_url_templates = ContextVar("url_templates", default=None)
 
-    return {"labels": labels, "datasets": datasets}
 
+def get_change_url(viewname, pk):
+    """Return the URL of `viewname` for `pk`.
 
-def get_all_days(queryset):
-    first_date = datetime.strptime(queryset.first()["label"], "%d.%m.%Y").date()
-    last_date = datetime.strptime(queryset.last()["label"], "%d.%m.%Y").date()
+    Within the changelists of `ChangeURLCacheAdminMixin`, the URL is resolved
+    once per language and script prefix, which are the only parts of the
+    request it depends on, and then only formatted.
+    """
+    url_templates = _url_templates.get()
 
-    delta = last_date - first_date
+    if url_templates is None:
+        return reverse(viewname, args=(pk,))
 
-    days = {}
+    key = (viewname, translation.get_language(), get_script_prefix())
 
-    for i in range(delta.days + 1):
-        date = first_date + timedelta(days=i)
+    if key not in url_templates:
+        url_templates[key] = reverse(viewname, args=(URL_PLACEHOLDER,))
 
-        days[f"{date.day}.{date.month}.{date.year}"] = None
+    return url_templates[key].replace(URL_PLACEHOLDER, str(pk), 1)
 
-    return days
 
+def clear_url_templates(response=None):
+    _url_templates.set(None)
 
-def get_all_months(queryset):
-    first_date = datetime.strptime(queryset.first()["label"], "%m.%Y").date()
-    last_date = datetime.strptime(queryset.last()["label"], "%m.%Y").date()
 
-    delta = relativedelta(last_date, first_date)
+class ChangeURLCacheAdminMixin:
+    """Resolve the change URLs of the links of the changelist rows once per
+    view, while the changelist is rendered.
+    """
 
-    months_difference = (delta.years * 12) + delta.months
+    def changelist_view(self, request, extra_context=None):
+        _url_templates.set({})
 
-    months = {}
+        try:
+            response = super().changelist_view(request, extra_context=extra_context)
+        except Exception:
+            clear_url_templates()
+            raise
 
-    for i in range(months_difference + 1):
-        date = first_date + relativedelta(months=i)
+        if getattr(response, "is_rendered", True):
+            clear_url_templates()
+        else:
+            response.add_post_render_callback(clear_url_templates)
 
-        months[f"{date.month}.{date.year}"] = None
+        return response
 
-    return months
 
+def get_security_change_url(security):
+    # Securities without a kind aren't stocks or bonds, so they are linked to
+    # the generic security admin.
+    model_name = security.kind or "security"
 
-def get_all_quarters(queryset):
-    first_date_quarter, first_date_year = queryset.first()["label"].split("/")
-    first_date_string = f"{int(first_date_quarter) * 3}.{first_date_year}"
-    first_date = datetime.strptime(first_date_string, "%m.%Y").date()
+    return get_change_url(f"admin:securities_{model_name}_change", security.pk)
 
-    last_date_quarter, last_date_year = queryset.last()["label"].split("/")
-    last_date_string = f"{int(last_date_quarter) * 3}.{last_date_year}"
-    last_date = datetime.strptime(last_date_string, "%m.%Y").date()
 
-    delta = relativedelta(last_date, first_date)
+def get_changelist_queryset(model_admin, request, ignored_params=()):
+    """Return the queryset the changelist would show for the request filters.
 
-    months_difference = (delta.years * 12) + delta.months
-    quarters_difference = months_difference // 3
+    May raise `IncorrectLookupParameters`.
+    """
+    request = copy.copy(request)
+    request.GET = request.GET.copy()
 
-    quarters = {}
+    for param in (*ignored_params, EXACT_COUNT_VAR):
+        request.GET.pop(param, None)
 
-    for i in range(quarters_difference + 1):
-        date = first_date + relativedelta(months=i * 3)
+    list_display = model_admin.get_list_display(request)
+    changelist = FilteredChangeList(
+        request,
+        model_admin.model,
+        list_display,
+        model_admin.get_list_display_links(request, list_display),
+        model_admin.get_list_filter(request),
+        model_admin.date_hierarchy,
+        model_admin.get_search_fields(request),
+        model_admin.get_list_select_related(request),
+        model_admin.list_per_page,
+        model_admin.list_max_show_all,
+        model_admin.list_editable,
+        model_admin,
+        model_admin.get_sortable_by(request),
+        model_admin.search_help_text,
+    )
 
-        quarters[f"{date.month // 3}/{date.year}"] = None
+    return changelist.queryset
 
-    return quarters
 
+def get_data_version(queryset):
+    """Return a value, which changes whenever a row of `queryset` does.
 
-def get_all_years(queryset):
-    first_year = queryset.first()["label"]
-    last_year = queryset.last()["label"]
+    The count and the last update time change whenever a row is added,
+    changed or deleted, so they are used to invalidate stored results. The
+    rows without an update time, such as the many-to-many links, are only
+    added and deleted, so their last primary key is used instead.
+    """
+    aggregates = {"count": Count("pk")}
 
-    years_difference = last_year - first_year
+    try:
+        queryset.model._meta.get_field("updated_at")
+        aggregates["updated_at"] = Max("updated_at")
+    except FieldDoesNotExist:
+        aggregates["last_pk"] = Max("pk")
 
-    years = {}
+    return sorted(queryset.order_by().aggregate(**aggregates).items())
 
-    for i in range(years_difference + 1):
-        years[first_year + i] = None
 
-    return years
+def get_chart_data(queryset, label, colors, label_map=None):
+    if label_map:
+        labels = [label_map[report["label"]] for report in queryset]
+    else:
+        labels = [report["label"] for report in queryset]
+
+    datasets = [
+        {
+            "label": label,
+            "data": [report["value"] for report in queryset],
+            "backgroundColor": colors,
+        }
+    ]
+
+    return {"labels": labels, "datasets": datasets}
 
 
 def get_color(index):
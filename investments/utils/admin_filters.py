@@ -0,0 +1,126 @@
+import hashlib
+import time
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.utils import translation
+
+from investments.contrib.search.utils import get_models_with_subclasses
+
+CHOICES_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """Filter by a related object, which is searched for with the autocomplete.
+
+    Only the selected object is loaded with the changelist. The rest are
+    requested a page at a time from the admin autocomplete view, which uses
+    the search and the scoping of the admin of the related model.
+    """
+
+    template = "admin/autocomplete_filter.html"
+
+    def has_output(self):
+        return True
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+
+        try:
+            return [
+                (obj.pk, str(obj))
+                for obj in field.related_model._default_manager.filter(
+                    **{field.target_field.name: self.lookup_val}
+                )
+            ]
+        except (ValidationError, ValueError):
+            return []
+
+    @property
+    def autocomplete_params(self):
+        # The autocomplete view looks the related model up by the field,
+        # which points to it.
+        return {
+            "app_label": self.field.model._meta.app_label,
+            "model_name": self.field.model._meta.model_name,
+            "field_name": self.field.name,
+        }
+
+
+def get_choices_version_key(model):
+    return f"list-filter-choices-version:{model._meta.label}"
+
+
+def get_choices_version(model):
+    # A lost version restarts from the clock, so it doesn't revive the
+    # choices cached with the earlier versions.
+    return cache.get_or_set(get_choices_version_key(model), time.time_ns, None)
+
+
+def invalidate_cached_choices(model):
+    """Expire the cached filter choices of the rows of `model` and its
+    subclasses. Meant for the bulk writes, which send no signals.
+    """
+    for candidate in get_models_with_subclasses(model):
+        try:
+            cache.incr(get_choices_version_key(candidate))
+        except ValueError:
+            pass
+
+
+def invalidate_cached_choices_on_change(sender, **kwargs):
+    invalidate_cached_choices(sender)
+
+
+def register_cached_choices(model):
+    """Expire the cached filter choices of `model`, when its rows are saved
+    or deleted.
+    """
+    for signal in (post_save, post_delete):
+        signal.connect(
+            invalidate_cached_choices_on_change,
+            sender=model,
+            dispatch_uid=f"invalidate_cached_choices:{model._meta.label}",
+        )
+
+
+class CachedChoicesMixin:
+    """Cache the choices of a filter until the rows they come from change.
+
+    The models of the rows are registered with `register_cached_choices`.
+    """
+
+    def get_cached_choices(self, queryset, get_choices):
+        sql, params = queryset.query.sql_with_params()
+        key = "|".join(
+            str(part)
+            for part in (
+                sql,
+                params,
+                translation.get_language(),
+                get_choices_version(queryset.model),
+            )
+        )
+        key = f"list-filter-choices:{hashlib.sha256(key.encode()).hexdigest()}"
+
+        choices = cache.get(key)
+
+        if choices is None:
+            choices = list(get_choices())
+            cache.set(key, choices, CHOICES_CACHE_TIMEOUT)
+
+        return choices
+
+
+class CachedAllValuesFieldListFilter(
+    CachedChoicesMixin, admin.AllValuesFieldListFilter
+):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # The distinct values are loaded only when the table has changed.
+        queryset = self.lookup_choices
+        self.lookup_choices = self.get_cached_choices(queryset, lambda: queryset)
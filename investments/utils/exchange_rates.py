@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.db.models import Subquery
+
+from investments.contrib.currencies.models import ExchangeRate
+
+
+def convert(value, rate):
+    return round(value * rate, 2) if value is not None and rate else None
+
+
+def get_exchange_rates(currency, start_date, end_date):
+    exchange_rates_queryset = ExchangeRate.objects.filter(
+        currency__code=currency,
+        # In case there is no rate for the start rate.
+        # There should be more than 7 days without rates
+        date__gte=start_date - timedelta(days=7),
+        date__lte=end_date,
+    )
+
+    exchange_rates = {rate.date.isoformat(): rate for rate in exchange_rates_queryset}
+
+    current_date = start_date
+
+    def get_rate(date):
+        key = date.isoformat()
+        return exchange_rates.get(key)
+
+    while current_date <= end_date:
+        exchange_rate = None
+        lookout_date = current_date
+
+        exchange_rate = get_rate(lookout_date)
+
+        if exchange_rate:
+            current_date += timedelta(days=1)
+            continue
+
+        while not exchange_rate:
+            # Mooving back in time until we find the rate
+            lookout_date -= timedelta(days=1)
+            exchange_rate = get_rate(lookout_date)
+
+        exchange_rates[current_date.isoformat()] = exchange_rate
+        current_date += timedelta(days=1)
+
+    return exchange_rates
+
+
+def get_exchange_rate_subquery(currency, date):
+    """Return the latest rate known on `date`, which may be an outer reference."""
+    return Subquery(
+        ExchangeRate.objects.filter(currency__code=currency, date__lte=date)
+        .order_by("-date")
+        .values("rate")[:1]
+    )
@@ -0,0 +1,68 @@
+import csv
+import tempfile
+from decimal import Decimal
+from itertools import islice
+
+import openpyxl
+from django.http import FileResponse, StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class Echo:
+    """A file-like object which returns the written value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def chunked(iterable, size=EXPORT_CHUNK_SIZE):
+    iterator = iter(iterable)
+
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def round_amount(value):
+    return round(value, 2) if value is not None else None
+
+
+def format_decimal(value):
+    # Avoids the exponent notation of normalized decimals, e.g. 1E+1.
+    return f"{value:f}" if isinstance(value, Decimal) else value
+
+
+def stream_csv(filename, header, rows):
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow([str(column) for column in header])
+
+        for row in rows:
+            yield writer.writerow([format_decimal(value) for value in row])
+
+    response = StreamingHttpResponse(generate(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    return response
+
+
+def stream_xlsx(filename, header, rows):
+    # In write-only mode openpyxl flushes every appended row to a temporary
+    # file, so the memory usage doesn't depend on the number of rows.
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append([str(column) for column in header])
+
+    for row in rows:
+        worksheet.append(row)
+
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+
+    return FileResponse(
+        file, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE
+    )
@@ -0,0 +1,151 @@
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+EXACT_COUNT_VAR = "exact_count"
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def get_estimated_count(queryset):
+    """Return the number of rows the PostgreSQL planner expects `queryset` to
+    have, or `None` on the other databases, which don't estimate it.
+
+    The estimate comes from the table statistics, so it doesn't read the rows.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_ordered_queryset(object_list):
+    """Order `object_list` by the latest keys first, unless it's ordered
+    already, so the rows of the pages don't overlap.
+    """
+    if getattr(object_list, "ordered", True):
+        return object_list
+
+    return object_list.order_by("-pk")
+
+
+class EstimatedCountPaginator(Paginator):
+    """Avoid counting all rows of large querysets.
+
+    The planner estimate is used, when the database has one and it's above
+    the threshold. Then `is_estimated` is set, so the exact count can be
+    requested instead. The estimate only sets the number of the page links:
+    the pages past it are still read, until one is empty.
+    """
+
+    threshold = ESTIMATED_COUNT_THRESHOLD
+
+    def __init__(self, object_list, *args, exact=False, **kwargs):
+        super().__init__(get_ordered_queryset(object_list), *args, **kwargs)
+
+        self.exact = exact
+        self.is_estimated = False
+
+    @cached_property
+    def count(self):
+        if self.exact or not hasattr(self.object_list, "query"):
+            return super().count
+
+        queryset = self.object_list.order_by().values("pk")
+        count = get_estimated_count(queryset)
+
+        if count is not None and count > self.threshold:
+            self.is_estimated = True
+            return count
+
+        return queryset.count()
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.is_estimated or int(number) < 1:
+                raise
+
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+
+        if not self.is_estimated:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom : bottom + self.per_page])
+
+        if number > 1 and not object_list:
+            raise EmptyPage(_("That page contains no results"))
+
+        return self._get_page(object_list, number, self)
+
+
+class EstimatedCountChangeList(ChangeList):
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(EXACT_COUNT_VAR, None)
+
+        return params
+
+    @property
+    def exact_count_url(self):
+        return self.get_query_string({EXACT_COUNT_VAR: "1"})
+
+
+class EstimatedCountAdminMixin:
+    """Show approximate counts in the changelist of a large table.
+
+    The admins opt in with the label of their model in the
+    `ESTIMATED_COUNT_MODELS` setting, and count as usual otherwise. Then the
+    unfiltered count is skipped too, and the "exact_count" parameter brings
+    back the exact count of the filtered rows.
+    """
+
+    paginator = EstimatedCountPaginator
+
+    @property
+    def estimates_count(self):
+        return self.opts.label in settings.ESTIMATED_COUNT_MODELS
+
+    @property
+    def show_full_result_count(self):
+        return not self.estimates_count
+
+    def get_changelist(self, request, **kwargs):
+        if not self.estimates_count:
+            return super().get_changelist(request, **kwargs)
+
+        return EstimatedCountChangeList
+
+    def get_paginator(
+        self, request, queryset, per_page, orphans=0, allow_empty_first_page=True
+    ):
+        queryset = get_ordered_queryset(queryset)
+
+        if not self.estimates_count:
+            return Paginator(queryset, per_page, orphans, allow_empty_first_page)
+
+        return self.paginator(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            exact=EXACT_COUNT_VAR in request.GET,
+        )
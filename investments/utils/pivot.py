@@ -0,0 +1,160 @@
+import numpy
+from django.db.models import F, Sum
+from django.db.models.functions import (
+    ExtractDay,
+    ExtractMonth,
+    ExtractQuarter,
+    ExtractYear,
+)
+from django.utils.translation import gettext_lazy as _
+
+from .admin import get_color
+
+DAY = "day"
+MONTH = "month"
+QUARTER = "quarter"
+YEAR = "year"
+
+PERIOD_PARTS = {
+    DAY: (("year", ExtractYear), ("month", ExtractMonth), ("day", ExtractDay)),
+    MONTH: (("year", ExtractYear), ("month", ExtractMonth)),
+    QUARTER: (("year", ExtractYear), ("quarter", ExtractQuarter)),
+    YEAR: (("year", ExtractYear),),
+}
+
+
+def get_period_keys(period, parts):
+    """Return consecutive integer keys of the periods of the extracted parts.
+
+    Days are numbered from the epoch, months and quarters from year zero,
+    so the index of a period is its key minus the key of the first one.
+    """
+    years = parts[0]
+
+    if period == DAY:
+        months = (years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+        days = (months + (parts[1] - 1).astype("timedelta64[M]")).astype(
+            "datetime64[D]"
+        )
+
+        return (days + (parts[2] - 1).astype("timedelta64[D]")).astype(numpy.int64)
+
+    if period == MONTH:
+        return years * 12 + parts[1] - 1
+
+    if period == QUARTER:
+        return years * 4 + parts[1] - 1
+
+    return years
+
+
+def get_period_label(period, key):
+    if period == DAY:
+        date = numpy.datetime64(key, "D").item()
+        return f"{date.day}.{date.month}.{date.year}"
+
+    if period == MONTH:
+        return f"{key % 12 + 1}.{key // 12}"
+
+    if period == QUARTER:
+        return f"{key % 4 + 1}/{key // 4}"
+
+    return key
+
+
+def get_period_expressions(period, date_field):
+    """Return the integer parts of the `period` of `date_field` by alias."""
+    return {
+        f"period_{name}": extract(date_field) for name, extract in PERIOD_PARTS[period]
+    }
+
+
+def get_pivot_chart_data(
+    queryset, date_field, group_field, value_field, period, limit=None
+):
+    """Return the stacked chart data of the sums of `value_field` per group and period.
+
+    The sums are read with a single grouped query.
+    """
+    expressions = get_period_expressions(period, date_field)
+    rows = (
+        queryset.order_by()
+        .annotate(**expressions, pivot_group=F(group_field))
+        .values(*expressions, "pivot_group")
+        .annotate(pivot_value=Sum(value_field))
+        .values_list("pivot_group", *expressions, "pivot_value")
+    )
+
+    return build_pivot_chart_data(rows, period, limit)
+
+
+def build_pivot_chart_data(rows, period, limit=None):
+    """Return the stacked chart data of rows of a group, the period parts and a sum.
+
+    The sums are placed in a groups by periods matrix, whose rows become
+    the datasets. With `limit` only the groups with the largest totals are
+    kept and the rest are summed as "Other".
+    """
+    rows = list(rows)
+
+    if not rows:
+        return {"labels": [], "datasets": []}
+
+    groups, *period_parts, values = zip(*rows)
+    keys = get_period_keys(
+        period, [numpy.array(part, dtype=numpy.int64) for part in period_parts]
+    )
+    first_key = int(keys.min())
+    period_indexes = keys - first_key
+    periods_count = int(keys.max()) - first_key + 1
+
+    # The groups are ordered by their first period, like the rows they come from.
+    labels, group_indexes = numpy.unique(
+        numpy.array(groups, dtype=object), return_inverse=True
+    )
+    first_periods = numpy.full(len(labels), periods_count)
+    numpy.minimum.at(first_periods, group_indexes, period_indexes)
+    order = numpy.lexsort((numpy.arange(len(labels)), first_periods))
+    positions = numpy.empty_like(order)
+    positions[order] = numpy.arange(len(order))
+    labels = labels[order]
+    group_indexes = positions[group_indexes]
+
+    matrix = numpy.zeros((len(labels), periods_count))
+    filled = numpy.zeros((len(labels), periods_count), dtype=bool)
+    numpy.add.at(
+        matrix,
+        (group_indexes, period_indexes),
+        numpy.array(values, dtype=numpy.float64),
+    )
+    filled[group_indexes, period_indexes] = True
+
+    if limit is not None and len(labels) > limit:
+        kept = numpy.zeros(len(labels), dtype=bool)
+        kept[numpy.argsort(-matrix.sum(axis=1), kind="stable")[:limit]] = True
+
+        labels = numpy.append(labels[kept], [str(_("Other"))])
+        matrix = numpy.vstack((matrix[kept], matrix[~kept].sum(axis=0)))
+        filled = numpy.vstack((filled[kept], filled[~kept].any(axis=0)))
+
+    matrix = matrix.round(2)
+
+    return {
+        "labels": [
+            get_period_label(period, key)
+            for key in range(first_key, first_key + periods_count)
+        ],
+        "datasets": [
+            {
+                "label": label,
+                "data": [
+                    value if is_filled else None
+                    for value, is_filled in zip(row.tolist(), filled_row.tolist())
+                ],
+                "backgroundColor": get_color(index),
+            }
+            for index, (label, row, filled_row) in enumerate(
+                zip(labels.tolist(), matrix, filled)
+            )
+        ],
+    }
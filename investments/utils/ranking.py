@@ -0,0 +1,86 @@
+from django.db.models import F, RowRange, Value, Window
+from django.db.models.functions import RowNumber
+from django.utils.translation import gettext_lazy as _
+
+from investments import chart_constants
+
+from .series import WindowSum
+
+
+def get_chart_offset(request):
+    """Return the number of the largest groups, which a drill-down skips."""
+    try:
+        return max(int(request.POST.get(chart_constants.CHART_OFFSET_VAR, 0)), 0)
+    except ValueError:
+        return 0
+
+
+def get_top_chart_data(
+    queryset, label, colors, limit, offset=0, label_map=None, empty_label=_("Unknown")
+):
+    """Return the pie chart data of the `limit` groups with the largest values
+    after the first `offset`, and an "Other" slice with the sum of the rest.
+
+    `queryset` has a `value` and a `label` per group. The groups are ranked
+    and the rest is summed with window functions in the same query, so only
+    the shown slices are read. The group without a label, e.g. the bonds in a
+    chart of sectors, is shown as `empty_label`.
+    """
+    order_by = (F("value").desc(), F("label").asc())
+    rows = list(
+        queryset.annotate(
+            rank=Window(RowNumber(), order_by=order_by),
+            running_total=Window(
+                WindowSum("value"),
+                order_by=order_by,
+                frame=RowRange(start=None, end=0),
+            ),
+            total=Window(WindowSum("value")),
+            group_count=Window(WindowSum(Value(1))),
+        )
+        .filter(rank__gt=offset, rank__lte=offset + limit)
+        .order_by("rank")
+        .values("label", "value", "running_total", "total", "group_count")
+    )
+
+    label_map = {None: str(empty_label), **(label_map or {})}
+    labels = [label_map.get(row["label"], row["label"]) for row in rows]
+    values = [row["value"] for row in rows]
+
+    if rows and rows[-1]["group_count"] > offset + limit:
+        labels.append(str(_("Other")))
+        values.append(round(rows[-1]["total"] - rows[-1]["running_total"], 2))
+
+    return {
+        "labels": labels,
+        "datasets": [
+            {"label": label, "data": values, "backgroundColor": colors[: len(values)]}
+        ],
+    }
+
+
+def get_top_chart_config(request, chart_data, limit):
+    """Return the chart config, which opens the "Other" slice of a top chart.
+
+    The slice posts the action again with the same selection and the next
+    offset, so the drill-down shows the groups it is made of.
+    """
+    if len(chart_data["labels"]) <= limit:
+        return {}
+
+    params = [
+        (name, value)
+        for name in request.POST
+        if name not in ("csrfmiddlewaretoken", chart_constants.CHART_OFFSET_VAR)
+        for value in request.POST.getlist(name)
+    ]
+
+    return {
+        "drilldown": {
+            "index": limit,
+            "params": [
+                *params,
+                (chart_constants.CHART_OFFSET_VAR, get_chart_offset(request) + limit),
+            ],
+        }
+    }
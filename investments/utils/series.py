@@ -0,0 +1,110 @@
+import numpy
+from django.db.models import F, Func, RowRange, Sum, Window
+from django.db.models.functions import ExtractMonth, ExtractQuarter, ExtractYear
+
+from investments import chart_constants
+
+from .pivot import MONTH, QUARTER, YEAR, get_period_label
+
+CUMULATIVE = "cumulative"
+MOVING_AVERAGE = "moving_average"
+CHANGE = "change"
+
+
+class WindowSum(Func):
+    """The sum of the aggregated rows in a window, which `Sum` refuses to nest."""
+
+    function = "SUM"
+    window_compatible = True
+
+
+def get_period_key_expression(period, date_field):
+    """Return the SQL counterpart of `get_period_keys` for months, quarters and
+    years, so the periods are consecutive integers in the query.
+    """
+    year = ExtractYear(date_field)
+
+    if period == MONTH:
+        return year * 12 + ExtractMonth(date_field) - 1
+
+    if period == QUARTER:
+        return year * 4 + ExtractQuarter(date_field) - 1
+
+    if period == YEAR:
+        return year
+
+    raise ValueError(f"Unsupported period {period}.")
+
+
+def get_series_chart_data(
+    queryset, date_field, value_field, period, metric, label, size=1
+):
+    """Return the line chart data of a metric of the sums of `value_field` per period.
+
+    The sums and their running totals are computed in one query, so only
+    two numbers per period are read. The periods without rows sum to zero,
+    so their running totals are the ones of the periods before them, and
+    each metric is a difference of the running totals: the cumulative sum
+    is the running total, the moving average is the sum of the window over
+    its size and the change is the sum of the period minus the one before.
+    """
+    if metric not in (CUMULATIVE, MOVING_AVERAGE, CHANGE):
+        raise ValueError(f"Unsupported metric {metric}.")
+
+    rows = list(
+        queryset.order_by()
+        .annotate(period_key=get_period_key_expression(period, date_field))
+        .values("period_key")
+        .annotate(period_total=Sum(value_field))
+        .annotate(
+            running_total=Window(
+                WindowSum("period_total"),
+                order_by=F("period_key").asc(),
+                frame=RowRange(start=None, end=0),
+            )
+        )
+        .order_by("period_key")
+        .values_list("period_key", "running_total")
+    )
+
+    if not rows:
+        return {"labels": [], "datasets": []}
+
+    keys, running_totals = (
+        numpy.array(column, dtype=numpy.float64) for column in zip(*rows)
+    )
+    keys = keys.astype(numpy.int64)
+
+    first_key = int(keys[0])
+    indexes = keys - first_key
+    period_count = int(keys[-1]) - first_key + 1
+
+    # The rows of the last periods with rows up to each period, whose
+    # running totals carry over.
+    row_indexes = (
+        numpy.searchsorted(indexes, numpy.arange(period_count), side="right") - 1
+    )
+    # The running totals before the first period and after each period.
+    all_running_totals = numpy.concatenate(([0], running_totals[row_indexes]))
+
+    if metric == CUMULATIVE:
+        values = all_running_totals[1:]
+    elif metric == MOVING_AVERAGE:
+        starts = numpy.maximum(numpy.arange(period_count) - size + 1, 0)
+        values = (all_running_totals[1:] - all_running_totals[starts]) / size
+    else:
+        values = numpy.diff(numpy.diff(all_running_totals), prepend=0)
+
+    return {
+        "labels": [
+            get_period_label(period, key) for key in range(first_key, int(keys[-1]) + 1)
+        ],
+        "datasets": [
+            {
+                "label": label,
+                "data": values.round(2).tolist(),
+                "borderColor": chart_constants.BASE_COLOR,
+                "backgroundColor": chart_constants.BASE_COLOR,
+            }
+        ],
+    }
@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_last_timestamp = 0
+_counter = 0
+
+
+def uuid7():
+    """Return a time-ordered UUID as described by RFC 9562 (version 7).
+
+    The first 48 bits are the Unix time in milliseconds, so new keys are
+    appended to the end of the primary key index instead of being scattered
+    across it. The 12 bits after the version hold a counter, which keeps
+    the keys generated within the same millisecond in order.
+    """
+    global _last_timestamp, _counter
+
+    with _lock:
+        timestamp = time.time_ns() // 1_000_000
+
+        if timestamp > _last_timestamp:
+            _last_timestamp = timestamp
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            # Clock went back or the same millisecond, continue the sequence.
+            _counter += 1
+
+            if _counter > 0xFFF:
+                _last_timestamp += 1
+                _counter = 0
+
+        timestamp = _last_timestamp
+        counter = _counter
+
+    value = (timestamp & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+
+    return uuid.UUID(int=value)
+
+
+def generate_uuid():
+    """Default of the UUID primary keys.
+
+    Returns a time-ordered UUID when the `TIME_ORDERED_UUIDS` setting is
+    enabled and a random one otherwise. Both are valid keys, so the setting
+    can be switched at any time and only affects the new rows.
+    """
+    if getattr(settings, "TIME_ORDERED_UUIDS", False):
+        return uuid7()
+
+    return uuid.uuid4()